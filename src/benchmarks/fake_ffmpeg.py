@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Заглушка ffmpeg для нагрузочных тестов: принимает команды compile_cmd / compile_split_cmd /
+compile_concat_cmd, выводит реалистичный прогресс с заданной частотой и пишет выходной файл
+заданного размера. Может завершаться с ошибкой или зависать.
+
+Подключение вместо FFMPEG_BIN (Linux/macOS, файл должен быть исполняемым):
+    VIDEOGYMNAST_FFMPEG_BIN=src/benchmarks/fake_ffmpeg.py python src/main.py
+
+Параметры задаются переменными окружения:
+    FAKE_FFMPEG_DURATION   длительность «исходника», сек (60)
+    FAKE_FFMPEG_SPEED      скорость кодирования, × реального времени (50)
+    FAKE_FFMPEG_RATE       строк прогресса в секунду (2)
+    FAKE_FFMPEG_SIZE       размер выходного файла, байт (1000000)
+    FAKE_FFMPEG_SIZE_RATIO размер выходного файла относительно входного (если задан — вместо SIZE)
+    FAKE_FFMPEG_FAIL       вероятность ошибки 0..1 (0)
+    FAKE_FFMPEG_HANG       вероятность зависания 0..1 (0)
+    FAKE_FFMPEG_FAIL_AT    процент, на котором происходит ошибка или зависание (50)
+
+Модуль не импортирует код приложения, чтобы запуск процесса был максимально дешёвым.
+"""
+
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+# Запись выходного файла блоками, пропорционально прогрессу
+WRITE_BLOCK = 64 * 1024
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def option(args: List[str], name: str) -> Optional[str]:
+    """
+    Значение опции командной строки (первое вхождение)
+    """
+    try:
+        return args[args.index(name) + 1]
+    except (ValueError, IndexError):
+        return None
+
+
+def format_time(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, sec = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{sec:09.6f}"
+
+
+def print_banner(input_file: str, duration: float) -> None:
+    """
+    Заголовок как у ffmpeg: строка Duration нужна для расчёта процента по выводу stderr
+    """
+    err = sys.stderr
+    err.write("ffmpeg version fake Copyright (c) VideoGymnast load test\n")
+    err.write(f"Input #0, mov,mp4,m4a,3gp,3g2,mj2, from '{input_file}':\n")
+    err.write(f"  Duration: {format_time(duration)[:11]}, start: 0.000000, bitrate: 8000 kb/s\n")
+    err.write("  Stream #0:0: Video: h264, yuv420p, 1920x1080, 30 fps\n")
+    err.write("  Stream #0:1: Audio: aac, 48000 Hz, stereo, 128 kb/s\n")
+    err.flush()
+
+
+def progress_block(frame: int, fps: float, size: int, out_time: float, speed: float, end: bool) -> str:
+    us = int(out_time * 1_000_000)
+    bitrate = size * 8 / out_time / 1000 if out_time > 0 else 0.0
+    return (
+        f"frame={frame}\nfps={fps:.2f}\nbitrate={bitrate:.1f}kbits/s\n"
+        f"total_size={size}\nout_time_us={us}\nout_time_ms={us}\n"
+        f"out_time={format_time(out_time)}\nspeed={speed:.3g}x\n"
+        f"progress={'end' if end else 'continue'}\n"
+    )
+
+
+def write_segments(pattern: str, count: int, size: int) -> None:
+    """
+    Режим деления на сегменты (-f segment): несколько файлов по шаблону
+    """
+    for i in range(count):
+        with open(pattern % i, "wb") as f:
+            f.write(b"\0" * max(1, size // count))
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if "-version" in args:
+        print("ffmpeg version fake (VideoGymnast load test stub)")
+        return 0
+    if not args:
+        print("fake ffmpeg: no output file", file=sys.stderr)
+        return 1
+
+    duration = env_float("FAKE_FFMPEG_DURATION", 60.0)
+    speed = max(1e-3, env_float("FAKE_FFMPEG_SPEED", 50.0))
+    rate = max(0.1, env_float("FAKE_FFMPEG_RATE", 2.0))
+    fail_at = env_float("FAKE_FFMPEG_FAIL_AT", 50.0)
+    fail = random.random() < env_float("FAKE_FFMPEG_FAIL", 0.0)
+    hang = not fail and random.random() < env_float("FAKE_FFMPEG_HANG", 0.0)
+
+    input_file = option(args, "-i") or ""
+    output = args[-1]
+    size = int(env_float("FAKE_FFMPEG_SIZE", 1_000_000))
+    if "FAKE_FFMPEG_SIZE_RATIO" in os.environ and os.path.isfile(input_file):
+        size = int(os.path.getsize(input_file) * env_float("FAKE_FFMPEG_SIZE_RATIO", 1.0))
+
+    # -progress pipe:1 / - (stdout) или pipe:2 (stderr); без -progress — только stderr
+    target = option(args, "-progress")
+    progress_out = sys.stderr if target == "pipe:2" else sys.stdout if target else None
+
+    print_banner(input_file, duration)
+
+    if option(args, "-f") == "segment" and "%" in output:
+        write_segments(output, max(1, int(duration // 30)), size)
+        return 0
+
+    fps = 30.0
+    wall = duration / speed
+    steps = max(1, int(wall * rate))
+    interval = wall / steps
+    written = 0
+    started = time.monotonic()
+    with open(output, "wb") as f:
+        for step in range(1, steps + 1):
+            time.sleep(max(0.0, started + step * interval - time.monotonic()))
+            percent = step / steps * 100.0
+            if (fail or hang) and percent >= fail_at:
+                if hang:
+                    # Процесс висит до принудительной остановки
+                    while True:
+                        time.sleep(3600)
+                f.close()
+                sys.stderr.write(f"[out#0] Error while encoding {output}: Invalid data found\n")
+                sys.stderr.flush()
+                return 1
+
+            target_size = size * step // steps
+            while written < target_size:
+                block = min(WRITE_BLOCK, target_size - written)
+                f.write(b"\0" * block)
+                written += block
+            f.flush()
+
+            out_time = duration * step / steps
+            if progress_out is not None:
+                elapsed = max(1e-6, time.monotonic() - started)
+                progress_out.write(
+                    progress_block(
+                        int(out_time * fps),
+                        out_time * fps / elapsed,
+                        written,
+                        out_time,
+                        out_time / elapsed,
+                        step == steps,
+                    )
+                )
+                progress_out.flush()
+            else:
+                sys.stderr.write(f"frame={int(out_time * fps)} time={format_time(out_time)[:11]}\n")
+                sys.stderr.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Нагрузочный тест пайплайна на заглушке ffmpeg (benchmarks/fake_ffmpeg.py):
+MainService → MessageBus → TranscoderService (+ RichService) на тысячах файлов без реального кодирования.
+
+Замеры:
+- накладные расходы планировщика: время сверх идеального (файлы × время задания / заданий)
+  и процессорное время основного процесса на задание;
+- задержка шины под нагрузкой: служебное событие публикуется с заданным интервалом,
+  измеряется время до обработчика;
+- стоимость интерфейса: разница процессорного времени прогонов с RichService и без;
+- рост памяти на задание в очереди: пик tracemalloc / количество файлов (отдельный прогон).
+
+Запуск (из папки src, Linux/macOS):
+    python -m benchmarks.loadtest [--files 10000] [--jobs 8] [--fail 0.01] [--json результат.json]
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+from typing import Callable
+
+from components.loguru_settings import logger_settings
+from core.events import Event
+
+FAKE_FFMPEG = Path(__file__).resolve().with_name("fake_ffmpeg.py")
+# Размер «исходника» (разреженный файл) и результата заглушки, байт
+SOURCE_SIZE = 10 * 1024 * 1024
+OUTPUT_SIZE = 4096
+
+
+@dataclass
+class LatencyProbe(Event):
+    published_ns: int
+
+
+def configure_fake_ffmpeg(duration: float, speed: float, rate: float, fail: float) -> None:
+    """
+    Переменные окружения заглушки; должны быть заданы до импорта core.config
+    """
+    os.environ.setdefault("VIDEOGYMNAST_FFMPEG_BIN", str(FAKE_FFMPEG))
+    os.environ["FAKE_FFMPEG_DURATION"] = str(duration)
+    os.environ["FAKE_FFMPEG_SPEED"] = str(speed)
+    os.environ["FAKE_FFMPEG_RATE"] = str(rate)
+    os.environ["FAKE_FFMPEG_FAIL"] = str(fail)
+    os.environ.setdefault("FAKE_FFMPEG_SIZE", str(OUTPUT_SIZE))
+
+
+def make_inputs(input_dir: Path, count: int) -> None:
+    """
+    Разреженные файлы-«исходники»: место на диске не занимают, размер для сравнения с результатом есть
+    """
+    input_dir.mkdir(parents=True, exist_ok=True)
+    existing = {p.name for p in input_dir.iterdir()}
+    for i in range(count):
+        name = f"clip_{i:06d}.mp4"
+        if name not in existing:
+            with open(input_dir / name, "wb") as f:
+                f.truncate(SOURCE_SIZE)
+
+
+def synthetic_probe(duration: float) -> Callable:
+    """
+    Анализ без MediaInfo: все файлы — 1080p30 с высоким битрейтом (путь перекодирования)
+    """
+    from services.main.models import SrcMediaInfo
+
+    def _probe(_: Path) -> SrcMediaInfo:
+        return SrcMediaInfo(1920, 1080, 30.0, 8_000_000, "aac", 128_000, duration)
+
+    return _probe
+
+
+class LatencySampler:
+    """
+    Публикует служебное событие с заданным интервалом и собирает задержку до обработчика
+    """
+
+    def __init__(self, bus, interval: float) -> None:
+        self.bus = bus
+        self.interval = interval
+        self.latencies: list[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="latency-sampler", daemon=True)
+        bus.subscribe_event(LatencyProbe, self._on_probe)
+
+    def _on_probe(self, e: LatencyProbe) -> None:
+        self.latencies.append(perf_counter_ns() - e.published_ns)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.bus.publish(LatencyProbe(perf_counter_ns()))
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        values = sorted(self.latencies)
+        if not values:
+            return {}
+        return {
+            "bus_latency_p50_us": values[len(values) // 2] / 1000,
+            "bus_latency_p99_us": values[int(len(values) * 0.99)] / 1000,
+            "bus_latency_max_us": values[-1] / 1000,
+            "bus_latency_samples": len(values),
+        }
+
+
+def run_pass(
+    work_dir: Path,
+    files: int,
+    jobs: int,
+    job_time: float,
+    duration: float,
+    ui: bool,
+    trace_memory: bool,
+    latency_interval: float,
+) -> dict:
+    """
+    Один прогон пакета из files файлов
+    """
+    from rich.console import Console
+
+    from core.messagebus import MessageBus
+    from services.main.entry import MainService
+    from services.rich.entry import RichService
+    from services.transcoder.entry import TranscoderService
+
+    input_dir, output_dir = work_dir / "input", work_dir / "output"
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+
+    bus = MessageBus()
+    sampler = LatencySampler(bus, latency_interval)
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    if ui:
+        # Терминал эмулируется, чтобы Live действительно перерисовывал панель
+        RichService(bus, console=Console(file=devnull, force_terminal=True, width=120))
+    TranscoderService(bus, abort_ratio=0, output_dir=output_dir)
+
+    if trace_memory:
+        tracemalloc.start()
+    sampler.start()
+    cpu_started, started = time.process_time(), perf_counter()
+    MainService(
+        bus,
+        jobs=jobs,
+        input_dir=input_dir,
+        output_dir=output_dir,
+        probe=synthetic_probe(duration),
+    )
+    bus.close()
+    wall, cpu = perf_counter() - started, time.process_time() - cpu_started
+    result = sampler.stop()
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.update({"mem_peak_bytes": peak, "mem_bytes_per_job": peak / files})
+    devnull.close()
+
+    ideal = files * job_time / jobs
+    result.update(
+        {
+            "wall_s": wall,
+            "files_per_sec": files / wall,
+            "ideal_wall_s": ideal,
+            "scheduler_overhead_s": wall - ideal,
+            "overhead_ms_per_job": (wall - ideal) * jobs / files * 1000,
+            "parent_cpu_s": cpu,
+            "parent_cpu_ms_per_job": cpu / files * 1000,
+        }
+    )
+    return result
+
+
+def print_results(results: dict) -> None:
+    for name, metrics in results.items():
+        values = ", ".join(
+            f"{k}={v:,.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items()
+        )
+        print(f"{name:10} {values}")
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Нагрузочный тест пайплайна на заглушке ffmpeg")
+    parser.add_argument("--files", type=int, default=10_000, help="Файлов в пакете")
+    parser.add_argument("--jobs", type=int, default=8, help="Одновременных заданий")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность «исходника», сек")
+    parser.add_argument("--speed", type=float, default=200.0, help="Скорость заглушки, × реального времени")
+    parser.add_argument("--rate", type=float, default=20.0, help="Строк прогресса в секунду на задание")
+    parser.add_argument("--fail", type=float, default=0.0, help="Доля заданий, завершающихся ошибкой")
+    parser.add_argument("--latency-interval", type=float, default=0.01, help="Интервал замера задержки шины, сек")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Рабочая папка (по умолчанию bench/load)")
+    parser.add_argument("--skip-memory", action="store_true", help="Без прогона с tracemalloc")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+    if sys.platform == "win32":
+        raise SystemExit("Заглушка ffmpeg запускается как исполняемый скрипт: только Linux/macOS")
+    logger_settings("WARNING")
+
+    configure_fake_ffmpeg(args.duration, args.speed, args.rate, args.fail)
+    from core.config import BASE_DIR
+
+    work_dir = args.work_dir or BASE_DIR / "bench" / "load"
+    make_inputs(work_dir / "input", args.files)
+    job_time = args.duration / args.speed
+    common = dict(
+        work_dir=work_dir,
+        files=args.files,
+        jobs=args.jobs,
+        job_time=job_time,
+        duration=args.duration,
+        latency_interval=args.latency_interval,
+    )
+
+    results = {
+        "headless": run_pass(ui=False, trace_memory=False, **common),
+        "ui": run_pass(ui=True, trace_memory=False, **common),
+    }
+    if not args.skip_memory:
+        results["memory"] = run_pass(ui=False, trace_memory=True, **common)
+    results["ui_cost"] = {
+        "parent_cpu_ms_per_job": results["ui"]["parent_cpu_ms_per_job"]
+        - results["headless"]["parent_cpu_ms_per_job"],
+        "wall_s": results["ui"]["wall_s"] - results["headless"]["wall_s"],
+    }
+    print_results(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
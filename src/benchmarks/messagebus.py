@@ -0,0 +1,183 @@
+"""
+Микробенчмарк MessageBus: задержка publish → обработчик и пропускная способность
+для команд и событий.
+
+Запуск (из папки src):
+    python -m benchmarks.messagebus [--count N] [--json путь]
+"""
+
+import json
+import statistics
+import threading
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+from typing import Callable
+
+from components.loguru_settings import logger_settings
+from core.commands import Command
+from core.events import Event
+from core.messagebus import AbstractMessageBus, EventPolicy, MessageBus
+
+
+@dataclass
+class BenchCommand(Command):
+    value: int
+
+
+@dataclass
+class BenchEvent(Event):
+    published_ns: int
+
+
+@dataclass
+class BenchProgressEvent(Event):
+    job_id: int
+    progress_value: float
+
+
+def bench_command(bus_factory: Callable[[], AbstractMessageBus], count: int) -> dict:
+    """
+    Синхронные команды: накладные расходы publish относительно прямого вызова
+    """
+    bus = bus_factory()
+
+    def handler(cmd: BenchCommand) -> int:
+        return cmd.value
+
+    bus.subscribe_command(BenchCommand, handler)
+    cmd = BenchCommand(1)
+
+    started = perf_counter()
+    for _ in range(count):
+        handler(cmd)
+    direct = perf_counter() - started
+
+    started = perf_counter()
+    for _ in range(count):
+        bus.publish(cmd)
+    via_bus = perf_counter() - started
+    bus.close()
+
+    return {
+        "ops_per_sec": count / via_bus,
+        "ns_per_op": via_bus / count * 1e9,
+        "overhead_ns_per_op": (via_bus - direct) / count * 1e9,
+    }
+
+
+def bench_event_throughput(
+    bus_factory: Callable[[], AbstractMessageBus], count: int, batch: int = 0
+) -> dict:
+    """
+    События: от первой публикации до доставки последнего события (publish + drain)
+    """
+    bus = bus_factory()
+    delivered = 0
+
+    def handler(_: BenchEvent) -> None:
+        nonlocal delivered
+        delivered += 1
+
+    bus.subscribe_event(BenchEvent, handler)
+    events = [BenchEvent(0) for _ in range(count)]
+
+    started = perf_counter()
+    if batch > 0:
+        for i in range(0, count, batch):
+            bus.publish_many(events[i : i + batch])
+    else:
+        for e in events:
+            bus.publish(e)
+    bus.drain()
+    elapsed = perf_counter() - started
+    bus.close()
+
+    return {"events_per_sec": delivered / elapsed, "delivered": delivered}
+
+
+def bench_event_latency(bus_factory: Callable[[], AbstractMessageBus], count: int) -> dict:
+    """
+    События: задержка publish → обработчик для одиночных событий (шина простаивает)
+    """
+    bus = bus_factory()
+    latencies: list[int] = []
+    handled = threading.Event()
+
+    def handler(e: BenchEvent) -> None:
+        latencies.append(perf_counter_ns() - e.published_ns)
+        handled.set()
+
+    bus.subscribe_event(BenchEvent, handler)
+    for _ in range(count):
+        handled.clear()
+        bus.publish(BenchEvent(perf_counter_ns()))
+        handled.wait()
+    bus.close()
+
+    latencies.sort()
+    return {
+        "p50_us": latencies[len(latencies) // 2] / 1000,
+        "p99_us": latencies[int(len(latencies) * 0.99)] / 1000,
+        "mean_us": statistics.fmean(latencies) / 1000,
+    }
+
+
+def bench_coalesced_progress(
+    bus_factory: Callable[[], AbstractMessageBus], count: int, jobs: int = 8
+) -> dict:
+    """
+    Прогресс с политикой слияния по job_id: сколько событий реально доставлено
+    """
+    bus = bus_factory()
+    delivered = 0
+
+    def handler(_: BenchProgressEvent) -> None:
+        nonlocal delivered
+        delivered += 1
+
+    bus.subscribe_event(BenchProgressEvent, handler)
+    bus.set_event_policy(BenchProgressEvent, EventPolicy(coalesce_key=lambda e: e.job_id))
+
+    started = perf_counter()
+    for i in range(count):
+        bus.publish(BenchProgressEvent(i % jobs, i / count * 100))
+    bus.drain()
+    elapsed = perf_counter() - started
+    bus.close()
+
+    return {"published_per_sec": count / elapsed, "delivered": delivered}
+
+
+def run(count: int, bus_factory: Callable[[], AbstractMessageBus] = MessageBus) -> dict:
+    return {
+        "command": bench_command(bus_factory, count),
+        "event_throughput": bench_event_throughput(bus_factory, count),
+        "event_throughput_publish_many": bench_event_throughput(bus_factory, count, 100),
+        "event_latency": bench_event_latency(bus_factory, min(count, 5_000)),
+        "coalesced_progress": bench_coalesced_progress(bus_factory, count),
+    }
+
+
+def print_results(results: dict) -> None:
+    for name, metrics in results.items():
+        values = ", ".join(f"{k}={v:,.1f}" for k, v in metrics.items())
+        print(f"{name:32} {values}")
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Микробенчмарк MessageBus")
+    parser.add_argument("--count", type=int, default=100_000, help="Сообщений на замер")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+    logger_settings("WARNING")
+
+    results = run(args.count)
+    print_results(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
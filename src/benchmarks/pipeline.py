@@ -0,0 +1,323 @@
+"""
+Сквозной бенчмарк пайплайна на синтетических исходниках (lavfi testsrc2/noise):
+get_media_info → build_media_params → TranscoderService, время каждой стадии и пропускная способность.
+
+Исходники генерируются ffmpeg из core.config.FFMPEG_BIN (переопределяется переменной окружения
+VIDEOGYMNAST_FFMPEG_BIN или ключом --ffmpeg) и кэшируются в папке бенчмарка, сеть не нужна.
+
+Запуск (из папки src):
+    python -m benchmarks.pipeline [--duration сек] [--repeat N] [--only имя ...] [--save baseline.json]
+    python -m benchmarks.pipeline --compare baseline.json [--tolerance 0.1]
+"""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+
+from components.loguru_settings import logger_settings
+
+# Метрики «меньше — лучше» и «больше — лучше» для сравнения с базовой линией
+LOWER_IS_BETTER = ("probe_s", "plan_s", "encode_s", "total_s", "cpu_time")
+HIGHER_IS_BETTER = ("speed", "encode_fps")
+# Разница по времени меньше этой величины (сек) не считается регрессией (шум таймера)
+MIN_ABS_DELTA_S = 0.005
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    name: str
+    # Источник lavfi: testsrc2 — простая картинка, noise — testsrc2 с шумом (тяжело сжимается)
+    pattern: str
+    width: int
+    height: int
+    fps: float
+    # Аудиокодер ffmpeg и контейнер исходника
+    audio_encoder: str
+    container: str
+
+
+SUITE: list[ClipSpec] = [
+    ClipSpec("sd_testsrc2_25_aac", "testsrc2", 640, 480, 25, "aac", "mp4"),
+    ClipSpec("sd_noise_30_mp3", "noise", 720, 576, 30, "libmp3lame", "mkv"),
+    ClipSpec("720p_testsrc2_50_opus", "testsrc2", 1280, 720, 50, "libopus", "mkv"),
+    ClipSpec("720p_noise_30_aac", "noise", 1280, 720, 30, "aac", "mp4"),
+    ClipSpec("1080p_testsrc2_30_ac3", "testsrc2", 1920, 1080, 30, "ac3", "mkv"),
+    ClipSpec("1080p_noise_60_aac", "noise", 1920, 1080, 60, "aac", "mp4"),
+    ClipSpec("4k_testsrc2_30_aac", "testsrc2", 3840, 2160, 30, "aac", "mp4"),
+]
+
+
+def compile_lavfi_cmd(ffmpeg: Path, spec: ClipSpec, duration: float, output: Path) -> list[str]:
+    """
+    Команда генерации исходника: видео lavfi + синус, кодирование с высоким битрейтом,
+    чтобы пайплайн выбирал путь перекодирования
+    """
+    video = f"testsrc2=size={spec.width}x{spec.height}:rate={spec.fps}:duration={duration}"
+    if spec.pattern == "noise":
+        video += ",noise=alls=40:allf=t+u"
+    return [
+        str(ffmpeg),
+        "-hide_banner",
+        "-loglevel", "error",
+        "-y",
+        "-f", "lavfi", "-i", video,
+        "-f", "lavfi", "-i", f"sine=frequency=1000:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "14", "-pix_fmt", "yuv420p",
+        "-c:a", spec.audio_encoder, "-b:a", "192k",
+        "-shortest",
+        str(output),
+    ]
+
+
+def generate_clip(ffmpeg: Path, spec: ClipSpec, duration: float, clips_dir: Path) -> Path:
+    """
+    Синтетический исходник; уже сгенерированный (та же длительность) используется повторно
+    """
+    path = clips_dir / f"{spec.name}_{duration:g}s.{spec.container}"
+    if not path.exists():
+        clips_dir.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.stem + ".tmp" + path.suffix)
+        subprocess.run(compile_lavfi_cmd(ffmpeg, spec, duration, temp), check=True)
+        temp.replace(path)
+    return path
+
+
+def ffmpeg_version(ffmpeg: Path) -> str:
+    try:
+        out = subprocess.run(
+            [str(ffmpeg), "-version"], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return out.splitlines()[0] if out else "unknown"
+
+
+def run_clip(source: Path, output_dir: Path, threads: int, job_id: int) -> dict:
+    """
+    Один прогон исходника через стадии пайплайна
+    """
+    from core.messagebus import MessageBus
+    from components.build_media_params import build_media_params
+    from components.get_media_info import get_media_info
+    from services.transcoder.commands import OnTranscoderRun
+    from services.transcoder.entry import TranscoderService
+    from services.transcoder.events import OnJobMetrics
+
+    bus = MessageBus()
+    metrics: list[OnJobMetrics] = []
+    bus.subscribe_event(OnJobMetrics, metrics.append)
+    # Бенчмарк измеряет кодирование целиком — досрочная остановка выключена
+    service = TranscoderService(bus, abort_ratio=0, output_dir=output_dir)
+
+    started = perf_counter()
+    info = get_media_info(source)
+    probed = perf_counter()
+    params = build_media_params(**asdict(info))
+    planned = perf_counter()
+    result = service.run(OnTranscoderRun(source, params, job_id, threads))
+    encoded = perf_counter()
+    bus.close()
+
+    if not result.ok and not result.out_size:
+        raise RuntimeError(f"{source.name}: {result.msg}")
+    m = metrics[0]
+    for path in output_dir.iterdir():
+        path.unlink()
+
+    return {
+        "probe_s": probed - started,
+        "plan_s": planned - probed,
+        "encode_s": encoded - planned,
+        "total_s": encoded - started,
+        "src_duration": info.src_duration,
+        "speed": m.speed,
+        "encode_fps": m.encode_fps,
+        "cpu_time": m.cpu_time,
+        "ratio": m.ratio,
+        "mode": m.mode,
+        "outcome": m.outcome,
+    }
+
+
+def median_run(runs: list[dict]) -> dict:
+    """
+    Медиана по повторам для числовых метрик, остальные — из первого прогона
+    """
+    merged = dict(runs[0])
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)):
+            merged[key] = statistics.median(r[key] for r in runs)
+    return merged
+
+
+def run_suite(
+    ffmpeg: Path,
+    work_dir: Path,
+    suite: list[ClipSpec],
+    duration: float,
+    repeat: int,
+    threads: int,
+) -> dict:
+    clips_dir = work_dir / "clips"
+    output_dir = work_dir / "out"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results: dict = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "ffmpeg": ffmpeg_version(ffmpeg),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration": duration,
+            "repeat": repeat,
+            "threads": threads,
+        },
+        "clips": {},
+    }
+
+    for job_id, spec in enumerate(suite, start=1):
+        started = perf_counter()
+        source = generate_clip(ffmpeg, spec, duration, clips_dir)
+        generate_s = perf_counter() - started
+        runs = [run_clip(source, output_dir, threads, job_id) for _ in range(repeat)]
+        results["clips"][spec.name] = {**median_run(runs), "generate_s": generate_s}
+        print(f"{spec.name:28} {format_clip(results['clips'][spec.name])}", flush=True)
+
+    clips = results["clips"].values()
+    wall = sum(c["total_s"] for c in clips)
+    src_seconds = sum(c["src_duration"] for c in clips)
+    results["totals"] = {
+        "total_s": wall,
+        "src_seconds": src_seconds,
+        "src_seconds_per_wall_second": src_seconds / wall if wall else 0.0,
+    }
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Регрессии относительно базовой линии: время выросло или скорость упала больше чем на tolerance
+    """
+    regressions: list[str] = []
+    for name, cur in current["clips"].items():
+        base = baseline.get("clips", {}).get(name)
+        if base is None:
+            continue
+        for key in LOWER_IS_BETTER:
+            if key not in base or key not in cur:
+                continue
+            if (
+                cur[key] > base[key] * (1 + tolerance)
+                and cur[key] - base[key] > MIN_ABS_DELTA_S
+            ):
+                regressions.append(f"{name}.{key}: {base[key]:.3f} → {cur[key]:.3f}")
+        for key in HIGHER_IS_BETTER:
+            if key in base and key in cur and cur[key] < base[key] * (1 - tolerance):
+                regressions.append(f"{name}.{key}: {base[key]:.2f} → {cur[key]:.2f}")
+        if cur.get("mode") != base.get("mode"):
+            regressions.append(f"{name}.mode: {base.get('mode')} → {cur.get('mode')}")
+
+    base_total = baseline.get("totals", {}).get("src_seconds_per_wall_second", 0.0)
+    cur_total = current["totals"]["src_seconds_per_wall_second"]
+    if base_total and cur_total < base_total * (1 - tolerance):
+        regressions.append(f"totals.src_seconds_per_wall_second: {base_total:.2f} → {cur_total:.2f}")
+    return regressions
+
+
+def compare_meta(current: dict, baseline: dict) -> list[str]:
+    """
+    Отличия условий замера, при которых сравнение может быть некорректным
+    """
+    keys = ("ffmpeg", "cpu_count", "duration", "threads")
+    cur, base = current["meta"], baseline.get("meta", {})
+    return [f"{k}: {base.get(k)} → {cur.get(k)}" for k in keys if base.get(k) != cur.get(k)]
+
+
+def format_clip(clip: dict) -> str:
+    return (
+        f"probe={clip['probe_s'] * 1000:7.1f}ms plan={clip['plan_s'] * 1000:6.2f}ms "
+        f"encode={clip['encode_s']:7.2f}s speed=×{clip['speed']:6.2f} "
+        f"fps={clip['encode_fps']:7.1f} cpu={clip['cpu_time']:6.1f}s {clip['mode']}/{clip['outcome']}"
+    )
+
+
+def resolve_ffmpeg(override: Optional[str]) -> Path:
+    """
+    ffmpeg для генерации и кодирования: --ffmpeg, иначе FFMPEG_BIN из настроек
+    """
+    if override:
+        # Настройки читают переменную при импорте — кодирование использует тот же ffmpeg
+        os.environ["VIDEOGYMNAST_FFMPEG_BIN"] = override
+    from core.config import FFMPEG_BIN
+
+    ffmpeg = Path(shutil.which(str(FFMPEG_BIN)) or FFMPEG_BIN)
+    if not ffmpeg.is_file():
+        raise SystemExit(
+            f"ffmpeg не найден: {FFMPEG_BIN} (укажите --ffmpeg или VIDEOGYMNAST_FFMPEG_BIN)"
+        )
+    return ffmpeg
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Сквозной бенчмарк пайплайна на синтетических исходниках")
+    parser.add_argument("--ffmpeg", default=None, help="Путь к ffmpeg (по умолчанию FFMPEG_BIN)")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Папка исходников и результатов")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность исходников (сек)")
+    parser.add_argument("--repeat", type=int, default=1, help="Повторов на исходник (берётся медиана)")
+    parser.add_argument("--threads", type=int, default=0, help="-threads для ffmpeg (0 — авто)")
+    parser.add_argument("--only", nargs="*", default=None, help="Только указанные исходники")
+    parser.add_argument("--save", type=Path, default=None, help="Сохранить результаты как базовую линию")
+    parser.add_argument("--compare", type=Path, default=None, help="Сравнить с базовой линией")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Допуск регрессии (доля)")
+    args = parser.parse_args()
+    logger_settings("WARNING")
+
+    ffmpeg = resolve_ffmpeg(args.ffmpeg)
+    from core.config import BASE_DIR
+
+    suite = [s for s in SUITE if not args.only or s.name in args.only]
+    if not suite:
+        raise SystemExit(f"Нет исходников: {', '.join(args.only)}")
+
+    results = run_suite(
+        ffmpeg,
+        args.work_dir or BASE_DIR / "bench",
+        suite,
+        args.duration,
+        max(1, args.repeat),
+        args.threads,
+    )
+    totals = results["totals"]
+    print(
+        f"Итого: {totals['src_seconds']:.1f} сек видео за {totals['total_s']:.2f} сек "
+        f"(×{totals['src_seconds_per_wall_second']:.2f})"
+    )
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        for diff in compare_meta(results, baseline):
+            print(f"Условия замера отличаются: {diff}")
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"РЕГРЕССИЯ {r}")
+        if regressions:
+            sys.exit(1)
+        print(f"Регрессий нет (допуск {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
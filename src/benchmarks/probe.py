@@ -0,0 +1,126 @@
+"""
+Бенчмарк анализа исходников: анализов в секунду для каждого способа из PROBE_BACKENDS
+(auto — заголовки с откатом на MediaInfo, container — только заголовки, mediainfo — libmediainfo)
+и сверка результатов заголовков с MediaInfo.
+
+Исходники — синтетические из набора benchmarks.pipeline (генерируются ffmpeg и кэшируются)
+или видеофайлы из указанной папки (--dir, рекурсивно).
+
+Запуск (из папки src):
+    python -m benchmarks.probe [--dir папка] [--rounds N] [--backends auto mediainfo ...]
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+from benchmarks.pipeline import SUITE, generate_clip, resolve_ffmpeg
+from components.loguru_settings import logger_settings
+
+# Допустимое отличие битрейта от MediaInfo (доля)
+BITRATE_TOLERANCE = 0.01
+
+
+def collect_sources(args) -> list[Path]:
+    if args.dir:
+        from components.scanner import scan_tree
+        from core.config import VIDEO_EXTS
+
+        return list(scan_tree(args.dir, VIDEO_EXTS))
+    # До импорта настроек: resolve_ffmpeg задаёт VIDEOGYMNAST_FFMPEG_BIN
+    ffmpeg = resolve_ffmpeg(args.ffmpeg)
+    from core.config import BASE_DIR
+
+    clips_dir = (args.work_dir or BASE_DIR / "bench") / "clips"
+    return [generate_clip(ffmpeg, spec, args.duration, clips_dir) for spec in SUITE]
+
+
+def run_backend(name: str, sources: list[Path], rounds: int) -> tuple[float, int]:
+    """
+    Анализов в секунду (все исходники × rounds) и количество исходников с ошибкой
+    """
+    from components.container_probe import UnsupportedContainer
+    from components.get_media_info import PROBE_BACKENDS
+
+    probe = PROBE_BACKENDS[name]
+    failed = 0
+    started = perf_counter()
+    for _ in range(rounds):
+        for path in sources:
+            try:
+                probe(path)
+            except (UnsupportedContainer, ValueError):
+                failed += 1
+    elapsed = perf_counter() - started
+    return len(sources) * rounds / elapsed, failed // rounds
+
+
+def check_parity(sources: list[Path]) -> tuple[int, list[str]]:
+    """
+    Сверка заголовков с MediaInfo: количество разобранных по заголовкам и отличия
+    """
+    from components.container_probe import UnsupportedContainer, probe_container
+    from components.get_media_info import parse_mediainfo
+
+    parsed = 0
+    diffs: list[str] = []
+    for path in sources:
+        try:
+            fast = probe_container(path)
+        except UnsupportedContainer:
+            continue
+        parsed += 1
+        reference = parse_mediainfo(path)
+        for field, value in vars(fast).items():
+            expected = getattr(reference, field)
+            if value == expected:
+                continue
+            # MediaInfo округляет битрейт (близкий к стандартному — до него): отличие до 1% — не ошибка
+            if field.endswith("bitrate") or field.endswith("bitrate_avg"):
+                if abs(value - expected) <= max(1, expected * BITRATE_TOLERANCE):
+                    continue
+            diffs.append(f"{path.name}.{field}: {expected} → {value}")
+    return parsed, diffs
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Бенчмарк анализа исходников по способам анализа")
+    parser.add_argument(
+        "--dir", type=Path, default=None, help="Папка с видеофайлами (вместо синтетических)"
+    )
+    parser.add_argument("--ffmpeg", default=None, help="Путь к ffmpeg (по умолчанию FFMPEG_BIN)")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Папка синтетических исходников")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность исходников (сек)")
+    parser.add_argument("--rounds", type=int, default=20, help="Проходов по всем исходникам")
+    parser.add_argument(
+        "--backends",
+        nargs="*",
+        default=["auto", "container", "mediainfo"],
+        help="Способы анализа (PROBE_BACKENDS)",
+    )
+    args = parser.parse_args()
+    logger_settings("WARNING")
+
+    sources = collect_sources(args)
+    if not sources:
+        raise SystemExit("Нет исходников")
+    print(f"Исходников: {len(sources)}, проходов: {args.rounds}")
+
+    rates = {}
+    for name in args.backends:
+        rates[name], failed = run_backend(name, sources, max(1, args.rounds))
+        note = f" (не разобрано: {failed})" if failed else ""
+        print(f"{name:12} {rates[name]:9.1f} анализов/сек{note}")
+    if "mediainfo" in rates:
+        for name, rate in rates.items():
+            if name != "mediainfo":
+                print(f"{name} / mediainfo: ×{rate / rates['mediainfo']:.1f}")
+
+    parsed, diffs = check_parity(sources)
+    print(f"По заголовкам: {parsed} из {len(sources)}, отличий от MediaInfo: {len(diffs)}")
+    for diff in diffs:
+        print(f"  {diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Бенчмарк шины между процессами (core/process_bus.py) в сравнении с MessageBus в одном процессе:
+- команды: задержка вызова (p50/p99) и пропускная способность при нескольких вызывающих потоках;
+- события воркер → основной процесс: пропускная способность и задержка доставки;
+- события основной процесс → воркер: пропускная способность.
+
+Одни и те же обработчики (setup_bench) подключаются к шине напрямую (local)
+или в процессе-воркере (process).
+
+Запуск (из папки src):
+    python -m benchmarks.process_bus [--count N] [--threads K] [--json путь]
+"""
+
+import json
+import statistics
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+from typing import Callable
+
+from benchmarks.messagebus import BenchCommand, BenchEvent
+from components.loguru_settings import logger_settings
+from core.commands import Command
+from core.messagebus import AbstractMessageBus, MessageBus
+
+
+@dataclass
+class BenchBurst(Command):
+    """
+    Опубликовать count событий BenchEvent
+    """
+
+    count: int
+
+
+@dataclass
+class BenchCollect(Command):
+    """
+    Дождаться count доставленных обработчикам setup_bench событий BenchEvent
+    """
+
+    count: int
+
+
+def setup_bench(bus: AbstractMessageBus) -> None:
+    """
+    Обработчики бенчмарка (в основном процессе или в процессе-воркере)
+    """
+    received = 0
+    cond = threading.Condition()
+
+    def on_event(_: BenchEvent) -> None:
+        nonlocal received
+        with cond:
+            received += 1
+            cond.notify_all()
+
+    def on_collect(cmd: BenchCollect) -> int:
+        nonlocal received
+        with cond:
+            cond.wait_for(lambda: received >= cmd.count)
+            received -= cmd.count
+        return cmd.count
+
+    def on_burst(cmd: BenchBurst) -> int:
+        for _ in range(cmd.count):
+            bus.publish(BenchEvent(perf_counter_ns()))
+        return cmd.count
+
+    bus.subscribe_command(BenchCommand, lambda cmd: cmd.value)
+    bus.subscribe_command(BenchBurst, on_burst)
+    bus.subscribe_command(BenchCollect, on_collect)
+    # Подписка на собственные события: для замера «основной процесс → воркер»
+    bus.subscribe_event(BenchEvent, on_event)
+
+
+def _percentiles(latencies_ns: list[int]) -> dict:
+    latencies_ns.sort()
+    return {
+        "p50_us": latencies_ns[len(latencies_ns) // 2] / 1000,
+        "p99_us": latencies_ns[int(len(latencies_ns) * 0.99)] / 1000,
+        "mean_us": statistics.fmean(latencies_ns) / 1000,
+    }
+
+
+def bench_command_latency(bus: MessageBus, count: int) -> dict:
+    latencies: list[int] = []
+    for i in range(count):
+        started = perf_counter_ns()
+        bus.publish(BenchCommand(i))
+        latencies.append(perf_counter_ns() - started)
+    return _percentiles(latencies)
+
+
+def bench_command_throughput(bus: MessageBus, count: int, threads: int) -> dict:
+    per_thread = max(1, count // threads)
+
+    def _calls() -> None:
+        for i in range(per_thread):
+            bus.publish(BenchCommand(i))
+
+    started = perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for f in [pool.submit(_calls) for _ in range(threads)]:
+            f.result()
+    elapsed = perf_counter() - started
+    return {"commands_per_sec": per_thread * threads / elapsed}
+
+
+def bench_events_to_host(bus: MessageBus, count: int) -> dict:
+    """
+    События из обработчика команды (в воркере) до обработчика в основном процессе
+    """
+    latencies: list[int] = []
+    done = threading.Event()
+
+    def on_event(e: BenchEvent) -> None:
+        latencies.append(perf_counter_ns() - e.published_ns)
+        if len(latencies) >= count:
+            done.set()
+
+    bus.subscribe_event(BenchEvent, on_event)
+    started = perf_counter()
+    bus.publish(BenchBurst(count))
+    done.wait()
+    elapsed = perf_counter() - started
+    # Подписчик setup_bench тоже получил события — сбросить его счётчик
+    bus.publish(BenchCollect(count))
+    return {"events_per_sec": count / elapsed, **_percentiles(latencies)}
+
+
+def bench_events_to_worker(bus: MessageBus, count: int) -> dict:
+    """
+    События из основного процесса до обработчика setup_bench
+    """
+    started = perf_counter()
+    for _ in range(count):
+        bus.publish(BenchEvent(0))
+    bus.publish(BenchCollect(count))
+    elapsed = perf_counter() - started
+    return {"events_per_sec": count / elapsed}
+
+
+def run_mode(connect: Callable[[MessageBus], Callable[[], None]], count: int, threads: int) -> dict:
+    """
+    Замеры на шине с обработчиками, подключёнными connect (возвращает функцию отключения).
+    Для каждого замера — новая шина (подписки замеров не накапливаются)
+    """
+    results = {}
+    benches = {
+        "command_latency": lambda bus: bench_command_latency(bus, min(count, 5_000)),
+        "command_throughput": lambda bus: bench_command_throughput(bus, count, threads),
+        "events_to_host": lambda bus: bench_events_to_host(bus, count),
+        "events_to_worker": lambda bus: bench_events_to_worker(bus, count),
+    }
+    for name, bench in benches.items():
+        bus = MessageBus()
+        disconnect = connect(bus)
+        try:
+            results[name] = bench(bus)
+        finally:
+            disconnect()
+            bus.close()
+    return results
+
+
+def connect_local(bus: MessageBus) -> Callable[[], None]:
+    setup_bench(bus)
+    return lambda: None
+
+
+def connect_process(bus: MessageBus) -> Callable[[], None]:
+    from core.process_bus import ProcessBusHost
+
+    host = ProcessBusHost(bus)
+    host.start_worker("benchmarks.process_bus:setup_bench")
+    return host.close
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Бенчмарк шины между процессами")
+    parser.add_argument("--count", type=int, default=20_000, help="Сообщений на замер")
+    parser.add_argument("--threads", type=int, default=4, help="Потоков, вызывающих команды")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+    logger_settings("WARNING")
+
+    results = {
+        "local": run_mode(connect_local, args.count, args.threads),
+        "process": run_mode(connect_process, args.count, args.threads),
+    }
+    for mode, benches in results.items():
+        for name, metrics in benches.items():
+            values = ", ".join(f"{k}={v:,.1f}" for k, v in metrics.items())
+            print(f"{mode:8} {name:20} {values}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    # Запуск из модуля benchmarks.process_bus, а не __main__: типы сообщений
+    # должны совпадать с импортируемыми в процессе-воркере
+    from benchmarks.process_bus import main as _main
+
+    _main()
@@ -0,0 +1,113 @@
+import threading
+from dataclasses import dataclass
+from time import monotonic
+from typing import Optional
+
+from loguru import logger
+
+from components.concurrency import cpu_count
+from components.utils.proc import load_average, max_temperature, mem_available
+
+
+@dataclass
+class _Slot:
+    threads: int
+    memory: int
+    started: float
+
+
+class AdaptiveLimiter:
+    """
+    Допуск заданий по состоянию системы (вместо фиксированного количества):
+    новое задание запускается, только если хватает ресурсов, и получает столько потоков ffmpeg,
+    сколько ядер свободно в пределах бюджета.
+
+    - CPU: бюджет cpu_budget × ядер; чужая нагрузка — средняя загрузка за 1 минуту
+      за вычетом потоков своих заданий (средняя загрузка запаздывает, поэтому оценка грубая).
+    - Память: MemAvailable за вычетом резерва и оценок памяти заданий, запущенных недавно
+      (в первые ramp_time сек задание ещё не заняло память и MemAvailable его не учитывает).
+    - Температура: при thermal_limit °C и выше новые задания не запускаются (0 — не проверять).
+
+    Если не выполняется ни одно задание, следующее запускается всегда (хотя бы с 1 потоком),
+    чтобы пакет не остановился. Недоступные на платформе показатели не учитываются.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int,
+        threads_per_job: int,
+        cpu_budget: float,
+        mem_reserve: int,
+        ramp_time: float,
+        thermal_limit: float,
+        cpus: Optional[int] = None,
+    ) -> None:
+        self.max_jobs = max(1, max_jobs)
+        self.threads_per_job = max(1, threads_per_job)
+        self.budget = max(1.0, (cpus or cpu_count()) * cpu_budget)
+        self.mem_reserve = mem_reserve
+        self.ramp_time = ramp_time
+        self.thermal_limit = thermal_limit
+        self._slots: dict[int, _Slot] = {}
+        self._lock = threading.Lock()
+        self._held_by: Optional[str] = None
+
+    def admit(self, job_id: int, memory: int) -> Optional[int]:
+        """
+        Допустить задание: количество потоков ffmpeg или None (ресурсов нет, повторить позже)
+        """
+        with self._lock:
+            own_threads = sum(s.threads for s in self._slots.values())
+            load = load_average()
+            foreign = max(0.0, load - own_threads) if load is not None else 0.0
+            # Свободных ядер (округление: доли загрузки не отнимают целое ядро)
+            cpu_free = round(self.budget - foreign - own_threads)
+            reason = None
+            if self._slots:
+                reason = self._hold_reason(cpu_free, memory)
+            if reason is not None:
+                if reason != self._held_by:
+                    logger.debug(
+                        "<Допуск заданий>: ожидание ({0}), выполняется {1}",
+                        reason,
+                        len(self._slots),
+                    )
+                self._held_by = reason
+                return None
+            self._held_by = None
+            threads = max(1, min(self.threads_per_job, cpu_free))
+            self._slots[job_id] = _Slot(threads, memory, monotonic())
+            logger.debug(
+                "<Допуск заданий>: задание {0}, потоков {1}, загрузка {2}, выполняется {3}",
+                job_id,
+                threads,
+                "н/д" if load is None else f"{load:.1f}",
+                len(self._slots),
+            )
+            return threads
+
+    def release(self, job_id: int) -> None:
+        with self._lock:
+            self._slots.pop(job_id, None)
+
+    def _hold_reason(self, cpu_free: int, memory: int) -> Optional[str]:
+        """
+        Причина отложить запуск (вызывается под блокировкой) или None
+        """
+        if len(self._slots) >= self.max_jobs:
+            return "лимит заданий"
+        if cpu_free < 1:
+            return "процессор"
+        available = mem_available()
+        if available is not None:
+            now = monotonic()
+            ramping = sum(
+                s.memory for s in self._slots.values() if now - s.started < self.ramp_time
+            )
+            if available - ramping - self.mem_reserve < memory:
+                return "память"
+        if self.thermal_limit > 0:
+            temp = max_temperature()
+            if temp is not None and temp >= self.thermal_limit:
+                return f"температура {temp:.0f}°C"
+        return None
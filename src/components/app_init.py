@@ -1,10 +1,24 @@
-from components.utils.fs import fs_delete_files_with_suffix_before_ext, fs_create_dirs
+from pathlib import Path
+from typing import Collection, Optional
+
+from components.claims import FileClaims
+from components.utils.fs import (fs_create_dirs, fs_delete_dirs_with_suffix,
+                                 fs_delete_files_with_suffix_before_ext)
 from core.config import INPUT_PATH, OUTPUT_PATH
 
 
-def app_init():
+def app_init(
+    input_dir: Path = INPUT_PATH,
+    output_dir: Path = OUTPUT_PATH,
+    keep_chunks: Collection[Path] = (),
+    claims: Optional[FileClaims] = None,
+):
     """
-    Инициализация окружение приложения
+    Инициализация окружение приложения.
+    keep_chunks: папки сегментов, которые нужно сохранить для продолжения кодирования
+    claims: временные файлы и сегменты заданий, захваченных другими экземплярами, не удаляются
     """
-    fs_create_dirs([INPUT_PATH, OUTPUT_PATH])
-    fs_delete_files_with_suffix_before_ext(OUTPUT_PATH, ".tmp")
+    in_use = claims.in_use if claims else None
+    fs_create_dirs([input_dir, output_dir])
+    fs_delete_files_with_suffix_before_ext(output_dir, ".tmp", skip=in_use)
+    fs_delete_dirs_with_suffix(output_dir, ".chunks", keep_chunks, skip=in_use)
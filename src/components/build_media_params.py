@@ -1,7 +1,8 @@
 from core.config import (DEFAULT_AAC_BITRATE, DEFAULT_AUDIO_CODEC,
                          DEFAULT_BPP_720P, DEFAULT_BPP_1080P, DEFAULT_BPP_SD,
+                         FAST_PATH_BPP_RATIO, FAST_PATH_ENABLED,
                          RESOLUTION_MAX_HEIGHT, RESOLUTION_MAX_WIDTH)
-from services.main.models import OutputMediaParams
+from services.main.models import OutputMediaParams, SrcMediaInfo, TranscodeMode
 
 
 def build_media_params(
@@ -11,6 +12,7 @@ def build_media_params(
     src_video_bitrate_avg: int,
     src_audio_codec: str,
     src_audio_bitrate: int,
+    src_duration: float = 0.0,
 ) -> OutputMediaParams:
     width, height = choose_target_resolution(src_width, src_height)
     video_avg_bps = choose_target_video_avg_bitrate(
@@ -21,6 +23,9 @@ def build_media_params(
     src_audio_codec, src_audio_bitrate = choose_audio_params(
         src_audio_codec, src_audio_bitrate
     )
+    mode = choose_mode(
+        src_width, src_height, src_fps, src_video_bitrate_avg, width, height, src_audio_codec
+    )
 
     return OutputMediaParams(
         width=width,
@@ -30,9 +35,56 @@ def build_media_params(
         video_bitrate_max=video_maxrate_bps,
         audio_codec=src_audio_codec,
         audio_bitrate_bps=src_audio_bitrate,
+        duration=src_duration,
+        fps=src_fps,
+        mode=mode,
     )
 
 
+def choose_mode(
+    src_w: int,
+    src_h: int,
+    src_fps: float,
+    src_video_bitrate_avg: int,
+    w: int,
+    h: int,
+    audio_codec: str,
+) -> TranscodeMode:
+    """
+    Выбор пути обработки: перекодирование видео бессмысленно, если разрешение не меняется,
+    а исходный bpp не превышает рекомендуемый (с допуском FAST_PATH_BPP_RATIO).
+    Тогда при копируемом аудио — skip, иначе — remux.
+    """
+    if not FAST_PATH_ENABLED or src_video_bitrate_avg <= 0 or src_fps <= 0:
+        return "encode"
+    if (src_w, src_h) != (w, h):
+        return "encode"
+    src_bpp = src_video_bitrate_avg / (w * h * src_fps)
+    if src_bpp > default_bpp_for(w, h) * FAST_PATH_BPP_RATIO:
+        return "encode"
+    return "skip" if audio_codec == "copy" else "remux"
+
+
+def near_decision_threshold(info: SrcMediaInfo, margin: float) -> bool:
+    """
+    Битрейт видео или аудио ближе доли margin к порогу choose_mode / choose_audio_params:
+    при неточном битрейте решение может отличаться от MediaInfo
+    """
+    if (
+        info.src_audio_codec == DEFAULT_AUDIO_CODEC
+        and abs(info.src_audio_bitrate - DEFAULT_AAC_BITRATE) <= DEFAULT_AAC_BITRATE * margin
+    ):
+        return True
+    if not FAST_PATH_ENABLED or info.src_video_bitrate_avg <= 0 or info.src_fps <= 0:
+        return False
+    w, h = info.src_width, info.src_height
+    if choose_target_resolution(w, h) != (w, h):
+        return False
+    src_bpp = info.src_video_bitrate_avg / (w * h * info.src_fps)
+    threshold = default_bpp_for(w, h) * FAST_PATH_BPP_RATIO
+    return abs(src_bpp - threshold) <= threshold * margin
+
+
 def choose_audio_params(audio_codec: str, audio_bitrate_bps: int) -> tuple[str, int]:
     if not audio_codec or audio_codec == "":
         return "copy", 0
@@ -71,16 +123,7 @@ def choose_target_video_avg_bitrate(
 ) -> int:
 
     def recommended_bitrate() -> int:
-        def _default_bpp_for() -> float:
-            # Рекомендация битрейта в зависимости от количества пикселей
-            pixels = w * h
-            if pixels <= 640 * 480:
-                return DEFAULT_BPP_SD
-            if pixels <= 1280 * 720:
-                return DEFAULT_BPP_720P
-            return DEFAULT_BPP_1080P
-
-        default_bpp = _default_bpp_for()
+        default_bpp = default_bpp_for(w, h)
         rec_video_avg_bitrate = w * h * fps * default_bpp
         return int(rec_video_avg_bitrate)
 
@@ -88,3 +131,15 @@ def choose_target_video_avg_bitrate(
     if video_avg_bitrate > 0:
         return int(min(rec_bps, video_avg_bitrate))
     return int(rec_bps)
+
+
+def default_bpp_for(w: int, h: int) -> float:
+    """
+    Рекомендация битрейта (бит на пиксель) в зависимости от количества пикселей
+    """
+    pixels = w * h
+    if pixels <= 640 * 480:
+        return DEFAULT_BPP_SD
+    if pixels <= 1280 * 720:
+        return DEFAULT_BPP_720P
+    return DEFAULT_BPP_1080P
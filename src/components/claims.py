@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import suppress
+from pathlib import Path
+
+from loguru import logger
+
+from components.utils.proc import process_alive
+
+CLAIM_SUFFIX = ".claim"
+
+
+def build_claim_path(output_temp: Path) -> Path:
+    """
+    Отметка задания рядом с временным файлом: name.tmp.claim
+    """
+    return output_temp.with_name(output_temp.stem + CLAIM_SUFFIX)
+
+
+class FileClaims:
+    """
+    Разделение файлов между экземплярами программы на общих папках input/output без координатора.
+
+    - Файл берётся в работу созданием отметки (build_claim_path) с O_CREAT | O_EXCL:
+      из нескольких экземпляров отметку создаёт ровно один, остальные файл пропускают.
+    - В отметке — компьютер и pid владельца; пока задание выполняется, время изменения отметки
+      обновляется каждые ttl / 4 сек.
+    - Отметка истекла — не обновлялась ttl сек или её процесс на этом компьютере завершён:
+      файл захватывается заново. Истёкшая отметка сначала переименовывается в уникальное имя
+      (это удаётся только одному экземпляру) и проверяется повторно, поэтому отметку,
+      обновлённую в этот момент владельцем, не удалить.
+    - Временные файлы и папки сегментов при запуске удаляются, только если отметки нет
+      или она истекла (in_use).
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        # Отметки, захваченные этим процессом
+        self._held: set[Path] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._refresh_loop, name="claims", daemon=True)
+        self._thread.start()
+
+    def acquire(self, claim: Path) -> bool:
+        """
+        Захватить файл; False — действует отметка другого экземпляра
+        """
+        # Отметка — первый файл задания в подпапке output
+        claim.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self.break_stale(claim):
+                    return False
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"host": self.host, "pid": self.pid, "time": time.time()}, f)
+            with self._lock:
+                self._held.add(claim)
+            return True
+        return False
+
+    def release(self, claim: Path) -> None:
+        with self._lock:
+            self._held.discard(claim)
+        # Отметка могла быть перехвачена, пока процесс не обновлял её (например, был приостановлен)
+        if self._owned(claim):
+            with suppress(FileNotFoundError):
+                claim.unlink()
+
+    def is_live(self, claim: Path) -> bool:
+        return self._is_live(claim, claim)
+
+    def break_stale(self, claim: Path) -> bool:
+        """
+        Удалить истёкшую отметку; True — отметки больше нет
+        """
+        if self.is_live(claim):
+            return False
+        stale = claim.with_name(f"{claim.name}.{uuid.uuid4().hex[:8]}.stale")
+        try:
+            os.rename(claim, stale)
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logger.warning("Не удалось снять истёкшую отметку {0}: {1}", claim, e)
+            return False
+        if self._is_live(stale, claim):
+            # Отметку обновили или захватили заново между проверкой и переименованием — вернуть
+            self._restore(stale, claim)
+            return False
+        with suppress(FileNotFoundError):
+            stale.unlink()
+        return True
+
+    def in_use(self, path: Path) -> bool:
+        """
+        Временный файл или папка сегментов (name.tmp.*) относится к действующей отметке —
+        не удалять. Истёкшие отметки снимаются; сами отметки удаляются только здесь
+        """
+        if CLAIM_SUFFIX not in path.suffixes:
+            return self.is_live(build_claim_path(path))
+        if path.suffix == CLAIM_SUFFIX:
+            self.break_stale(path)
+            return True
+        # Отметка, переименованная при снятии другим экземпляром (name.tmp.claim.<id>.stale)
+        return self._fresh(path)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            held = list(self._held)
+        for claim in held:
+            self.release(claim)
+
+    def _is_live(self, path: Path, claim: Path) -> bool:
+        if not self._fresh(path):
+            return False
+        owner = self._owner(path)
+        pid = owner.get("pid")
+        if owner.get("host") != self.host or not isinstance(pid, int):
+            return True
+        if pid == self.pid:
+            # pid совпадает и у отметки прежнего запуска в том же контейнере
+            with self._lock:
+                return claim in self._held
+        return process_alive(pid) is not False
+
+    def _fresh(self, path: Path) -> bool:
+        try:
+            return time.time() - path.stat().st_mtime <= self.ttl
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _owner(path: Path) -> dict:
+        # Отметка, которую владелец ещё не дописал, — пустая
+        try:
+            owner = json.loads(path.read_text(encoding="utf-8") or "{}")
+        except (OSError, ValueError):
+            return {}
+        return owner if isinstance(owner, dict) else {}
+
+    def _owned(self, claim: Path) -> bool:
+        owner = self._owner(claim)
+        return owner.get("host") == self.host and owner.get("pid") == self.pid
+
+    @staticmethod
+    def _restore(stale: Path, claim: Path) -> None:
+        try:
+            # Жёсткая ссылка не заменяет отметку, созданную за это время третьим экземпляром
+            os.link(stale, claim)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Файловая система без жёстких ссылок
+            with suppress(OSError):
+                os.rename(stale, claim)
+                return
+        with suppress(FileNotFoundError):
+            stale.unlink()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 4):
+            with self._lock:
+                held = list(self._held)
+            for claim in held:
+                try:
+                    os.utime(claim)
+                except FileNotFoundError:
+                    self._reclaim(claim)
+                except OSError as e:
+                    logger.warning("Не удалось обновить отметку {0}: {1}", claim, e)
+
+    def _reclaim(self, claim: Path) -> None:
+        """
+        Отметка выполняемого задания пропала (удалена вручную или снята другим экземпляром
+        как истёкшая) — создать заново, если файл ещё никем не захвачен
+        """
+        with self._lock:
+            if claim not in self._held:
+                return
+            self._held.discard(claim)
+        if not self.acquire(claim):
+            logger.warning("{0}: отметка захвачена другим экземпляром", claim.name)
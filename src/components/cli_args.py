@@ -1,8 +1,51 @@
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
+
+import humanfriendly as hf
 
 LOGURU_LEVELS = ["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"]
 
 
+def jobs_type(value: str) -> int:
+    """
+    Количество заданий: целое число >= 1 или "auto" (0)
+    """
+    if value.lower() == "auto":
+        return 0
+    try:
+        jobs = int(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(f"Ожидается число или \"auto\": {value}") from exc
+    if jobs < 1:
+        raise ArgumentTypeError(f"Количество заданий должно быть >= 1: {value}")
+    return jobs
+
+
+def workers_type(value: str) -> int:
+    """
+    Количество процессов-воркеров: целое число >= 0 (0 — в основном процессе)
+    """
+    try:
+        workers = int(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(f"Ожидается число: {value}") from exc
+    if workers < 0:
+        raise ArgumentTypeError(f"Количество процессов должно быть >= 0: {value}")
+    return workers
+
+
+def timespan_type(value: str) -> float:
+    """
+    Промежуток времени: секунды или с единицами ("90m", "2h")
+    """
+    try:
+        seconds = hf.parse_timespan(value)
+    except hf.InvalidTimespan as exc:
+        raise ArgumentTypeError(f"Ожидается время, например \"90m\" или \"2h\": {value}") from exc
+    if seconds <= 0:
+        raise ArgumentTypeError(f"Время должно быть больше нуля: {value}")
+    return seconds
+
+
 def args_parser():
     parser = ArgumentParser()
     parser.add_argument(
@@ -13,4 +56,147 @@ def args_parser():
         choices=LOGURU_LEVELS,
         help="Уровень логирования для консоли (по умолчанию \"WARNING\")",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        default=None,
+        type=jobs_type,
+        help="Количество одновременных перекодирований: число или \"auto\" (по умолчанию из настроек)",
+    )
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        default=None,
+        help="Делить длинные файлы на сегменты и кодировать их параллельно",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Только анализ файлов и расчёт параметров, без перекодирования",
+    )
+    parser.add_argument(
+        "--no-probe-cache",
+        action="store_true",
+        help="Не использовать кэш анализа медиафайлов",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Не вести журнал заданий (без пропуска завершённых и продолжения прерванных файлов)",
+    )
+    parser.add_argument(
+        "--no-output-store",
+        action="store_true",
+        help="Не использовать хранилище результатов (дубликаты и повторные запуски кодируются заново)",
+    )
+    parser.add_argument(
+        "--no-claims",
+        action="store_true",
+        help="Не создавать отметки захвата файлов (папки input/output используются одним экземпляром)",
+    )
+    parser.add_argument(
+        "--process-workers",
+        default=None,
+        type=workers_type,
+        help="Выполнять перекодирование в N отдельных процессах (0 — в основном процессе)",
+    )
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="HOST:PORT",
+        help="Координатор: задания выполняют воркеры (--worker), адрес по умолчанию из настроек; "
+        "--jobs — сколько заданий выдано воркерам или ждёт выдачи",
+    )
+    parser.add_argument(
+        "--worker",
+        default=None,
+        metavar="HOST:PORT",
+        help="Воркер: брать задания у координатора (--serve) и перекодировать их "
+        "(--jobs — одновременных заданий на этом компьютере)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        default=None,
+        help="Адаптивный допуск: количество заданий и потоков по загрузке, памяти и температуре "
+        "(--jobs — верхний предел)",
+    )
+    parser.add_argument(
+        "--nice",
+        default=None,
+        type=int,
+        help="Приоритет (nice) программы и процессов ffmpeg, Linux/macOS",
+    )
+    parser.add_argument(
+        "--order",
+        default=None,
+        choices=["fifo", "longest", "shortest"],
+        help="Порядок запуска заданий: fifo — как найдены, longest — сначала долгие "
+        "(меньше общее время), shortest — сначала быстрые (раньше первые результаты)",
+    )
+    parser.add_argument(
+        "--deadline",
+        default=None,
+        type=timespan_type,
+        help="Срок пакета (\"90m\", \"2h\"): пресет x264 каждого файла выбирается так, "
+        "чтобы уложиться в срок с наилучшим качеством",
+    )
+    parser.add_argument(
+        "--abort-ratio",
+        default=None,
+        type=float,
+        help="Остановить кодирование, если прогноз размера больше исходного в N раз (0 — выкл.)",
+    )
+    parser.add_argument(
+        "--abort-min-progress",
+        default=None,
+        type=float,
+        help="Минимальный прогресс (%%) для принятия решения о досрочной остановке",
+    )
+    parser.add_argument(
+        "--no-report",
+        action="store_true",
+        help="Не сохранять отчёт с метриками заданий",
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Асинхронный режим: шина и перекодирование на asyncio (без потока на задание)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Не завершаться: обрабатывать новые файлы в папке input по мере появления (Ctrl+C — выход)",
+    )
+    args = parser.parse_args()
+    if args.watch and args.asyncio:
+        parser.error("--watch не поддерживается в режиме --asyncio")
+    if args.process_workers and args.asyncio:
+        parser.error("--process-workers не поддерживается в режиме --asyncio")
+    if args.asyncio:
+        for option, value in (
+            ("--dry-run", args.dry_run),
+            ("--chunked", args.chunked),
+            ("--order", args.order is not None),
+            ("--adaptive", args.adaptive),
+        ):
+            if value:
+                parser.error(f"{option} не поддерживается в режиме --asyncio")
+    if args.deadline is not None and (args.watch or args.asyncio):
+        parser.error("--deadline не поддерживается в режимах --watch и --asyncio")
+    if args.serve is not None and args.worker:
+        parser.error("--serve и --worker — разные режимы, запускаются отдельными процессами")
+    if args.serve is not None or args.worker:
+        for option, value in (
+            ("--asyncio", args.asyncio),
+            ("--process-workers", args.process_workers),
+            ("--adaptive", args.adaptive),
+            ("--deadline", args.deadline is not None),
+        ):
+            if value:
+                parser.error(f"{option} не поддерживается в режимах --serve и --worker")
+    if args.worker and (args.watch or args.dry_run):
+        parser.error("--watch и --dry-run задаются координатору (--serve), а не воркеру")
+    return args
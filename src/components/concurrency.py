@@ -0,0 +1,40 @@
+import os
+
+
+def cpu_count() -> int:
+    """
+    Количество доступных процессору ядер (с учётом affinity, если поддерживается)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def resolve_concurrency(
+    jobs: int, threads_per_job: int, cpus: int | None = None
+) -> tuple[int, int]:
+    """
+    Рассчитать количество одновременных заданий и потоков ffmpeg на задание.
+
+    Параметры:
+      - jobs: запрошенное количество заданий (0 — авто).
+      - threads_per_job: ориентир потоков на задание при автоматическом расчёте.
+      - cpus: количество ядер (по умолчанию — определяется автоматически).
+
+    Возвращает:
+      (jobs, threads) — ядра делятся между заданиями поровну, минимум 1 поток.
+    """
+    if jobs < 0:
+        raise ValueError("Количество заданий не может быть отрицательным")
+    cpus = cpus or cpu_count()
+    if jobs == 0:
+        jobs = max(1, cpus // max(1, threads_per_job))
+    threads = max(1, cpus // jobs)
+    return jobs, threads
+
+
+def resolve_segment_workers(threads: int, threads_per_worker: int) -> int:
+    """
+    Количество параллельных сегментных воркеров в пределах бюджета потоков задания
+    """
+    return max(1, threads // max(1, threads_per_worker))
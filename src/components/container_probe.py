@@ -0,0 +1,489 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterator, Optional
+
+from services.main.models import SrcMediaInfo
+
+# Кодеки аудио → название формата, как его возвращает MediaInfo (в нижнем регистре)
+_MP4_AUDIO_FOURCC = {
+    b"ac-3": "ac-3",
+    b"ec-3": "e-ac-3",
+    b"Opus": "opus",
+    b"fLaC": "flac",
+    b"alac": "alac",
+    b"lpcm": "pcm",
+    b"sowt": "pcm",
+    b"twos": "pcm",
+    b"ipcm": "pcm",
+}
+# objectTypeIndication из esds для mp4a
+_MP4_AUDIO_OTI = {
+    0x40: "aac",
+    0x66: "aac",
+    0x67: "aac",
+    0x68: "aac",
+    0x69: "mpeg audio",
+    0x6B: "mpeg audio",
+    0xA5: "ac-3",
+    0xA6: "e-ac-3",
+}
+_MKV_AUDIO_CODECS = {
+    "A_AAC": "aac",
+    "A_AC3": "ac-3",
+    "A_EAC3": "e-ac-3",
+    "A_DTS": "dts",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_FLAC": "flac",
+    "A_MPEG/L3": "mpeg audio",
+    "A_MPEG/L2": "mpeg audio",
+    "A_PCM": "pcm",
+}
+
+# Идентификаторы элементов EBML (Matroska / WebM)
+_DOC_TYPE = 0x4282
+_SEGMENT = 0x18538067
+_SEEK_HEAD = 0x114D9B74
+_SEEK = 0x4DBB
+_SEEK_ID = 0x53AB
+_SEEK_POSITION = 0x53AC
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_UID = 0x73C5
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_DEFAULT_DURATION = 0x23E383
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_TAGS = 0x1254C367
+_TAG = 0x7373
+_TARGETS = 0x63C0
+_TAG_TRACK_UID = 0x63C5
+_SIMPLE_TAG = 0x67C8
+_TAG_NAME = 0x45A3
+_TAG_STRING = 0x4487
+_CLUSTER = 0x1F43B675
+
+
+class UnsupportedContainer(Exception):
+    """
+    Файл нельзя разобрать по заголовкам: другой контейнер или нужных данных в заголовках нет
+    """
+
+
+def probe_container(path: Path) -> SrcMediaInfo:
+    """
+    Информация о файле по заголовкам контейнера, без libmediainfo: MP4/MOV (moov)
+    и Matroska/WebM (EBML). Файл отображается в память, читаются только заголовки.
+    Значения те же, что у MediaInfo: битрейт видео — размер потока / длительность (MP4)
+    или статистика BPS из тегов (Matroska); битрейт аудио MP4 — средний из esds
+    (MediaInfo округляет близкие к стандартным значения и читает заголовки кадров MP3,
+    поэтому битрейт аудио может отличаться в пределах ~1%). Вблизи порогов решения
+    parse_auto перепроверяет такие файлы через MediaInfo (PROBE_THRESHOLD_MARGIN).
+    Нет нужных данных — UnsupportedContainer.
+    """
+    with path.open("rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            # Пустой файл
+            raise UnsupportedContainer("пустой файл") from exc
+    with data:
+        try:
+            if data[:4] == b"\x1a\x45\xdf\xa3":  # EBML
+                return _probe_matroska(data)
+            if data[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip"):
+                return _probe_mp4(data)
+        except (struct.error, IndexError, KeyError, ValueError, ZeroDivisionError) as exc:
+            raise UnsupportedContainer(f"повреждённый заголовок: {exc!r}") from exc
+    raise UnsupportedContainer("неизвестный контейнер")
+
+
+# --- MP4 / MOV ---
+
+
+def _boxes(data: mmap.mmap, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Боксы ISO BMFF в диапазоне: (тип, начало содержимого, конец бокса)
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise ValueError(f"бокс {kind!r} выходит за границы")
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _child(data: mmap.mmap, start: int, end: int, kind: bytes) -> tuple[int, int]:
+    for k, s, e in _boxes(data, start, end):
+        if k == kind:
+            return s, e
+    raise UnsupportedContainer(f"нет бокса {kind.decode('latin-1')}")
+
+
+def _probe_mp4(data: mmap.mmap) -> SrcMediaInfo:
+    moov = next(((s, e) for k, s, e in _boxes(data, 0, len(data)) if k == b"moov"), None)
+    if moov is None:
+        raise UnsupportedContainer("нет moov")
+    if any(k == b"mvex" for k, _, _ in _boxes(data, *moov)):
+        # Фрагментированный MP4: таблицы семплов в moof, а не в moov
+        raise UnsupportedContainer("фрагментированный MP4")
+
+    mvhd = _child(data, *moov, b"mvhd")
+    timescale, duration = _full_box_times(data, mvhd[0])
+
+    video: Optional[dict] = None
+    audio: Optional[dict] = None
+    for kind, start, end in _boxes(data, *moov):
+        if kind != b"trak":
+            continue
+        track = _mp4_track(data, start, end)
+        if track["handler"] == b"vide" and video is None:
+            video = track
+        elif track["handler"] == b"soun" and audio is None:
+            audio = track
+    if video is None or audio is None:
+        raise UnsupportedContainer("нет видео- или аудиодорожки")
+
+    if not video["frames"] or not video["seconds"]:
+        raise UnsupportedContainer("нет таблицы семплов видео")
+    audio_codec = _mp4_audio_codec(audio)
+    audio_bitrate = audio["avg_bitrate"] or _bitrate(audio["bytes"], audio["seconds"])
+    return SrcMediaInfo(
+        src_width=video["width"],
+        src_height=video["height"],
+        src_fps=round(video["frames"] / video["seconds"], 3),
+        src_video_bitrate_avg=_bitrate(video["bytes"], video["seconds"]),
+        src_audio_codec=audio_codec,
+        src_audio_bitrate=audio_bitrate,
+        src_duration=round(duration / timescale, 3) if timescale else 0.0,
+    )
+
+
+def _full_box_times(data: mmap.mmap, start: int) -> tuple[int, int]:
+    """
+    timescale и duration из mvhd / mdhd (версии 0 и 1)
+    """
+    version = data[start]
+    if version == 1:
+        return struct.unpack_from(">IQ", data, start + 20)
+    return struct.unpack_from(">II", data, start + 12)
+
+
+def _mp4_track(data: mmap.mmap, start: int, end: int) -> dict:
+    mdia = _child(data, start, end, b"mdia")
+    timescale, duration = _full_box_times(data, _child(data, *mdia, b"mdhd")[0])
+    hdlr = _child(data, *mdia, b"hdlr")
+    stbl = _child(data, *_child(data, *mdia, b"minf"), b"stbl")
+
+    track = {
+        "handler": bytes(data[hdlr[0] + 8 : hdlr[0] + 12]),
+        "seconds": duration / timescale if timescale else 0.0,
+        "frames": 0,
+        "bytes": 0,
+        "width": 0,
+        "height": 0,
+        "fourcc": b"",
+        "oti": 0,
+        "avg_bitrate": 0,
+    }
+    if track["handler"] not in (b"vide", b"soun"):
+        return track
+
+    # Первое описание семплов (stsd: полный бокс + количество записей)
+    stsd = _child(data, *stbl, b"stsd")
+    entry_size, fourcc = struct.unpack_from(">I4s", data, stsd[0] + 8)
+    entry = stsd[0] + 8
+    track["fourcc"] = fourcc
+    if track["handler"] == b"vide":
+        track["width"], track["height"] = struct.unpack_from(">HH", data, entry + 32)
+    elif fourcc == b"mp4a":
+        _mp4_esds(data, entry, entry + entry_size, track)
+
+    # Количество кадров (stts) и размер потока (stsz)
+    stts = _child(data, *stbl, b"stts")
+    (count,) = struct.unpack_from(">I", data, stts[0] + 4)
+    track["frames"] = sum(struct.unpack_from(f">{count * 2}I", data, stts[0] + 8)[::2])
+    stsz = _child(data, *stbl, b"stsz")
+    sample_size, sample_count = struct.unpack_from(">II", data, stsz[0] + 4)
+    if sample_size:
+        track["bytes"] = sample_size * sample_count
+    else:
+        sizes = struct.unpack_from(f">{sample_count}I", data, stsz[0] + 12)
+        track["bytes"] = sum(sizes)
+    return track
+
+
+def _mp4_esds(data: mmap.mmap, entry: int, entry_end: int, track: dict) -> None:
+    """
+    objectTypeIndication и средний битрейт из дескриптора декодера (esds)
+    """
+    # AudioSampleEntry: 28 байт после заголовка записи; QuickTime v1/v2 — длиннее
+    (version,) = struct.unpack_from(">H", data, entry + 16)
+    offset = {0: 36, 1: 52, 2: 72}.get(version)
+    if offset is None:
+        return
+    for kind, start, end in _boxes(data, entry + offset, entry_end):
+        if kind == b"wave":
+            # QuickTime: esds внутри wave
+            for k, s, e in _boxes(data, start, end):
+                if k == b"esds":
+                    start, end, kind = s, e, k
+                    break
+        if kind != b"esds":
+            continue
+        pos = start + 4
+        while pos < end:
+            tag = data[pos]
+            pos += 1
+            length = 0
+            for _ in range(4):
+                byte = data[pos]
+                pos += 1
+                length = (length << 7) | (byte & 0x7F)
+                if not byte & 0x80:
+                    break
+            if tag == 0x03:
+                # ES_Descriptor: ES_ID, флаги и необязательные поля, затем вложенные дескрипторы
+                flags = data[pos + 2]
+                pos += 3
+                if flags & 0x80:
+                    pos += 2
+                if flags & 0x40:
+                    pos += 1 + data[pos]
+                if flags & 0x20:
+                    pos += 2
+                continue
+            if tag == 0x04:
+                track["oti"] = data[pos]
+                (track["avg_bitrate"],) = struct.unpack_from(">I", data, pos + 9)
+                return
+            pos += length
+        return
+
+
+def _mp4_audio_codec(audio: dict) -> str:
+    fourcc = audio["fourcc"]
+    if fourcc == b"mp4a":
+        codec = _MP4_AUDIO_OTI.get(audio["oti"])
+    else:
+        codec = _MP4_AUDIO_FOURCC.get(fourcc)
+    if codec is None:
+        raise UnsupportedContainer(f"аудиокодек {fourcc!r}")
+    return codec
+
+
+def _bitrate(size: int, seconds: float) -> int:
+    return int(size * 8 / seconds) if seconds else 0
+
+
+# --- Matroska / WebM ---
+
+
+def _vint(data: mmap.mmap, pos: int, keep_marker: bool) -> tuple[int, int]:
+    """
+    Число переменной длины EBML: (значение, позиция после него); -1 — неизвестный размер
+    """
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8:
+        raise ValueError("некорректное число EBML")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | data[pos + i]
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1
+    return value, pos + length
+
+
+def _elements(data: mmap.mmap, start: int, end: int) -> Iterator[tuple[int, int, int]]:
+    """
+    Элементы EBML в диапазоне: (идентификатор, начало содержимого, конец элемента)
+    """
+    pos = start
+    while pos < end:
+        element_id, pos = _vint(data, pos, keep_marker=True)
+        size, pos = _vint(data, pos, keep_marker=False)
+        if size < 0:
+            raise UnsupportedContainer("элемент неизвестного размера (поток)")
+        yield element_id, pos, pos + size
+        pos += size
+
+
+def _uint(data: mmap.mmap, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big")
+
+
+def _float(data: mmap.mmap, start: int, end: int) -> float:
+    if end - start == 4:
+        return struct.unpack_from(">f", data, start)[0]
+    if end - start == 8:
+        return struct.unpack_from(">d", data, start)[0]
+    return 0.0
+
+
+def _string(data: mmap.mmap, start: int, end: int) -> str:
+    return bytes(data[start:end]).rstrip(b"\x00").decode("utf-8", "replace")
+
+
+def _probe_matroska(data: mmap.mmap) -> SrcMediaInfo:
+    elements = _elements(data, 0, len(data))
+    element_id, start, end = next(elements)
+    doc_type = next(
+        (_string(data, s, e) for i, s, e in _elements(data, start, end) if i == _DOC_TYPE), ""
+    )
+    if doc_type not in ("matroska", "webm"):
+        raise UnsupportedContainer(f"DocType {doc_type!r}")
+    segment = next(((s, e) for i, s, e in elements if i == _SEGMENT), None)
+    if segment is None:
+        raise UnsupportedContainer("нет Segment")
+    seg_start, seg_end = segment[0], min(segment[1], len(data))
+
+    # Разделы до первого кластера; остальные (обычно теги в конце файла) — по SeekHead
+    found: dict[int, tuple[int, int]] = {}
+    seeks: dict[int, int] = {}
+    for element_id, start, end in _elements(data, seg_start, seg_end):
+        if element_id == _CLUSTER:
+            break
+        if element_id in (_INFO, _TRACKS, _TAGS):
+            found.setdefault(element_id, (start, end))
+        elif element_id == _SEEK_HEAD:
+            seeks.update(_seek_head(data, start, end))
+    for element_id in (_INFO, _TRACKS, _TAGS):
+        if element_id not in found and element_id in seeks:
+            element = next(_elements(data, seg_start + seeks[element_id], seg_end))
+            if element[0] == element_id:
+                found[element_id] = element[1:]
+    if _INFO not in found or _TRACKS not in found:
+        raise UnsupportedContainer("нет Info или Tracks")
+
+    timecode_scale, duration = 1_000_000, 0.0
+    for element_id, start, end in _elements(data, *found[_INFO]):
+        if element_id == _TIMECODE_SCALE:
+            timecode_scale = _uint(data, start, end)
+        elif element_id == _DURATION:
+            duration = _float(data, start, end)
+
+    video = audio = None
+    for element_id, start, end in _elements(data, *found[_TRACKS]):
+        if element_id != _TRACK_ENTRY:
+            continue
+        track = _mkv_track(data, start, end)
+        if track["type"] == 1 and video is None:
+            video = track
+        elif track["type"] == 2 and audio is None:
+            audio = track
+    if video is None or audio is None:
+        raise UnsupportedContainer("нет видео- или аудиодорожки")
+    if not video["default_duration"]:
+        raise UnsupportedContainer("нет DefaultDuration видео")
+
+    # Битрейт — только из статистики тегов (mkvmerge и др.), иначе его надо считать по кластерам
+    bps = _mkv_bps_tags(data, *found[_TAGS]) if _TAGS in found else {}
+    if video["uid"] not in bps or audio["uid"] not in bps:
+        raise UnsupportedContainer("нет статистики BPS в тегах")
+
+    codec_id = audio["codec_id"]
+    audio_codec = _MKV_AUDIO_CODECS.get(codec_id) or _MKV_AUDIO_CODECS.get(codec_id.split("/")[0])
+    if audio_codec is None:
+        raise UnsupportedContainer(f"аудиокодек {codec_id}")
+    return SrcMediaInfo(
+        src_width=video["width"],
+        src_height=video["height"],
+        src_fps=round(1e9 / video["default_duration"], 3),
+        src_video_bitrate_avg=bps[video["uid"]],
+        src_audio_codec=audio_codec,
+        src_audio_bitrate=bps[audio["uid"]],
+        src_duration=round(duration * timecode_scale / 1e9, 3),
+    )
+
+
+def _seek_head(data: mmap.mmap, start: int, end: int) -> dict[int, int]:
+    """
+    Позиции разделов (относительно начала содержимого Segment) по идентификатору
+    """
+    seeks = {}
+    for element_id, s, e in _elements(data, start, end):
+        if element_id != _SEEK:
+            continue
+        target, position = 0, None
+        for child_id, cs, ce in _elements(data, s, e):
+            if child_id == _SEEK_ID:
+                target = _uint(data, cs, ce)
+            elif child_id == _SEEK_POSITION:
+                position = _uint(data, cs, ce)
+        if target and position is not None:
+            seeks.setdefault(target, position)
+    return seeks
+
+
+def _mkv_track(data: mmap.mmap, start: int, end: int) -> dict:
+    track = {"type": 0, "uid": 0, "codec_id": "", "default_duration": 0, "width": 0, "height": 0}
+    for element_id, s, e in _elements(data, start, end):
+        if element_id == _TRACK_TYPE:
+            track["type"] = _uint(data, s, e)
+        elif element_id == _TRACK_UID:
+            track["uid"] = _uint(data, s, e)
+        elif element_id == _CODEC_ID:
+            track["codec_id"] = _string(data, s, e)
+        elif element_id == _DEFAULT_DURATION:
+            track["default_duration"] = _uint(data, s, e)
+        elif element_id == _VIDEO:
+            for child_id, cs, ce in _elements(data, s, e):
+                if child_id == _PIXEL_WIDTH:
+                    track["width"] = _uint(data, cs, ce)
+                elif child_id == _PIXEL_HEIGHT:
+                    track["height"] = _uint(data, cs, ce)
+    return track
+
+
+def _mkv_bps_tags(data: mmap.mmap, start: int, end: int) -> dict[int, int]:
+    """
+    Битрейт дорожек из тегов статистики: TrackUID → BPS.
+    Как и MediaInfo, BPS учитывается, только если он перечислен в _STATISTICS_TAGS
+    (статистика записана программой сборки файла, а не задана вручную)
+    """
+    bps = {}
+    for element_id, s, e in _elements(data, start, end):
+        if element_id != _TAG:
+            continue
+        uid = None
+        tags: dict[str, str] = {}
+        for child_id, cs, ce in _elements(data, s, e):
+            if child_id == _TARGETS:
+                uid = next(
+                    (
+                        _uint(data, ts, te)
+                        for t, ts, te in _elements(data, cs, ce)
+                        if t == _TAG_TRACK_UID
+                    ),
+                    None,
+                )
+            elif child_id == _SIMPLE_TAG:
+                name, string = "", ""
+                for tag_id, ts, te in _elements(data, cs, ce):
+                    if tag_id == _TAG_NAME:
+                        name = _string(data, ts, te)
+                    elif tag_id == _TAG_STRING:
+                        string = _string(data, ts, te)
+                tags[name] = string
+        value = tags.get("BPS", "")
+        if uid and value.isdigit() and "BPS" in tags.get("_STATISTICS_TAGS", "").split():
+            bps[uid] = int(value)
+    return bps
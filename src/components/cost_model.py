@@ -0,0 +1,60 @@
+from typing import Literal
+
+from core.config import (ADAPTIVE_MEM_BASE, ADAPTIVE_MEM_FRAMES,
+                         FFMPEG_X264_PRESET, SCHEDULER_ENCODE_PIXEL_RATE,
+                         SCHEDULER_PRESET_FACTORS, SCHEDULER_REMUX_SPEED)
+from services.main.models import OutputMediaParams, SrcMediaInfo
+
+# Порядок запуска заданий:
+# - fifo: в порядке сканирования
+# - longest: сначала самые долгие (меньше общее время пакета на нескольких воркерах)
+# - shortest: сначала самые быстрые (раньше первые результаты)
+JobOrder = Literal["fifo", "longest", "shortest"]
+
+
+def estimate_cost(
+    output_media_params: OutputMediaParams, preset: str = FFMPEG_X264_PRESET
+) -> float:
+    """
+    Оценка времени задания (сек) по параметрам результата:
+    - encode: длительность × пикселей кадра × fps × коэффициент пресета x264 / SCHEDULER_ENCODE_PIXEL_RATE
+    - remux: длительность / SCHEDULER_REMUX_SPEED
+    - skip: 0 (копирование файла)
+    Неизвестная частота кадров считается равной 30.
+    """
+    p = output_media_params
+    if p.mode == "skip":
+        return 0.0
+    if p.mode == "remux":
+        return p.duration / SCHEDULER_REMUX_SPEED
+    pixels = p.duration * p.width * p.height * (p.fps or 30.0)
+    return pixels * SCHEDULER_PRESET_FACTORS.get(preset, 1.0) / SCHEDULER_ENCODE_PIXEL_RATE
+
+
+def order_key(order: JobOrder, est_cost: float) -> float:
+    """
+    Ключ приоритета (меньше — раньше); при равных ключах сохраняется порядок поступления
+    """
+    if order == "longest":
+        return -est_cost
+    if order == "shortest":
+        return est_cost
+    return 0.0
+
+
+def estimate_memory(
+    src_media_info: SrcMediaInfo, output_media_params: OutputMediaParams
+) -> int:
+    """
+    Оценка памяти процесса ffmpeg (байт): базовая + кадры в работе (декодер, масштабирование,
+    очередь lookahead x264) для исходного и итогового разрешения, YUV 4:2:0 — 1.5 байта на пиксель
+    """
+    if output_media_params.mode == "skip":
+        return 0
+    if output_media_params.mode == "remux":
+        # Видео копируется без декодирования
+        return ADAPTIVE_MEM_BASE
+    src_pixels = src_media_info.src_width * src_media_info.src_height
+    out_pixels = output_media_params.width * output_media_params.height
+    frames = (src_pixels + out_pixels) * 1.5 * ADAPTIVE_MEM_FRAMES
+    return int(ADAPTIVE_MEM_BASE + frames)
@@ -0,0 +1,306 @@
+import json
+import statistics
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic
+
+from loguru import logger
+
+from components.cost_model import estimate_cost
+from core.config import SCHEDULER_ENCODE_PIXEL_RATE, SCHEDULER_PRESET_FACTORS
+from services.main.models import OutputMediaParams
+from services.transcoder.commands import OnTranscoderRun
+
+# Доля вклада нового замера в выученную скорость (экспоненциальное сглаживание)
+_EWMA_ALPHA = 0.3
+# Прогресс (%), после которого скорость выполняющегося задания считается надёжной
+_MIN_PROGRESS = 10.0
+
+
+def resolution_class(params: OutputMediaParams) -> str:
+    """
+    Класс разрешения результата: скорость кодирования на пиксель зависит от разрешения
+    """
+    pixels = params.width * params.height
+    if pixels <= 640 * 480:
+        return "sd"
+    if pixels <= 1280 * 720:
+        return "hd"
+    if pixels <= 1920 * 1080:
+        return "fhd"
+    return "uhd"
+
+
+def encode_pixels(params: OutputMediaParams) -> float:
+    """
+    Объём работы кодирования: пикселей во всех кадрах результата
+    """
+    return params.duration * params.width * params.height * (params.fps or 30.0)
+
+
+def _work(cmd: OnTranscoderRun) -> tuple[str, float, float]:
+    """
+    Вклад задания в суммы очереди: (класс разрешения, пикселей, сек для не перекодируемых)
+    """
+    params = cmd.output_media_params
+    if params.mode != "encode":
+        return "", 0.0, estimate_cost(params)
+    return resolution_class(params), encode_pixels(params), 0.0
+
+
+class SpeedModel:
+    """
+    Скорость кодирования (пикселей результата в секунду на задание) по пресету и классу разрешения.
+
+    - Выученные значения сглаживаются и сохраняются в JSON между запусками.
+    - Для пресета без замеров скорость пересчитывается из замеров других пресетов того же класса
+      по относительной стоимости пресетов (SCHEDULER_PRESET_FACTORS), без замеров вообще —
+      из SCHEDULER_ENCODE_PIXEL_RATE.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._rates: dict[str, float] = {}
+        self._lock = threading.Lock()
+        try:
+            self._rates = {k: float(v) for k, v in json.loads(path.read_text("utf-8")).items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def rate(self, preset: str, res_class: str) -> float:
+        with self._lock:
+            learned = self._rates.get(f"{preset}:{res_class}")
+            if learned:
+                return learned
+            # Замеры других пресетов того же класса, приведённые к стоимости medium
+            same_class = [
+                rate * SCHEDULER_PRESET_FACTORS.get(key.split(":")[0], 1.0)
+                for key, rate in self._rates.items()
+                if key.endswith(f":{res_class}")
+            ]
+        base = statistics.median(same_class) if same_class else SCHEDULER_ENCODE_PIXEL_RATE
+        return base / SCHEDULER_PRESET_FACTORS.get(preset, 1.0)
+
+    def learn(self, preset: str, res_class: str, rate: float) -> None:
+        if rate <= 0:
+            return
+        key = f"{preset}:{res_class}"
+        with self._lock:
+            old = self._rates.get(key)
+            self._rates[key] = rate if old is None else old + _EWMA_ALPHA * (rate - old)
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._rates, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(data, encoding="utf-8")
+
+
+@dataclass
+class _Running:
+    cmd: OnTranscoderRun
+    preset: str
+    started: float
+    progress: float = 0.0
+
+
+class DeadlinePlanner:
+    """
+    Выбор пресета x264 для каждого задания, чтобы пакет уложился в срок.
+
+    При запуске задания пересчитывается прогноз окончания пакета:
+    - очередь (спланированные, но не запущенные задания) — по модели скорости;
+      хранятся суммы пикселей по классам разрешения, поэтому пересчёт не перебирает очередь,
+    - найденные, но ещё не проанализированные файлы (expect) — по средней работе
+      уже спланированных заданий,
+    - выполняющиеся — по их фактической скорости из событий прогресса (до _MIN_PROGRESS% — по модели),
+    - суммарное время делится на количество воркеров.
+
+    Отношение фактической скорости выполняющихся заданий к модели поправляет прогноз сразу,
+    не дожидаясь окончания заданий. Для оставшихся заданий выбирается самый медленный общий пресет,
+    при котором пакет укладывается в срок; запускаемое задание может получить пресет
+    на ступень медленнее, если запас времени позволяет. Если не укладывается даже самый быстрый — он.
+    """
+
+    def __init__(
+        self,
+        deadline: float,
+        presets: list[str],
+        workers: int,
+        model: SpeedModel,
+    ) -> None:
+        # Пресеты от самого быстрого к самому медленному
+        self.presets = presets
+        self.workers = max(1, workers)
+        self.model = model
+        self.deadline_at = monotonic() + deadline
+        self._queued: dict[int, OnTranscoderRun] = {}
+        # Работа очереди: пикселей по классам разрешения (перекодирование) и оценка остальных, сек
+        self._queued_pixels: dict[str, float] = defaultdict(float)
+        self._queued_other = 0.0
+        # Все спланированные задания — средняя работа для ещё не проанализированных файлов
+        self._planned_pixels: dict[str, float] = defaultdict(float)
+        self._planned_other = 0.0
+        self._planned = 0
+        self._expected = 0
+        self._running: dict[int, _Running] = {}
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def expect(self, count: int = 1) -> None:
+        """
+        Найдены файлы, которые ещё будут проанализированы и спланированы
+        """
+        with self._lock:
+            self._expected += count
+
+    def discard_expected(self) -> None:
+        """
+        Ожидаемый файл не будет спланирован (ошибка анализа)
+        """
+        with self._lock:
+            self._expected = max(0, self._expected - 1)
+
+    def add(self, cmd: OnTranscoderRun) -> None:
+        """
+        Задание спланировано и ждёт запуска
+        """
+        with self._lock:
+            self._expected = max(0, self._expected - 1)
+            self._queued[cmd.job_id] = cmd
+            res_class, pixels, other = _work(cmd)
+            self._queued_pixels[res_class] += pixels
+            self._queued_other += other
+            self._planned_pixels[res_class] += pixels
+            self._planned_other += other
+            self._planned += 1
+
+    def assign(self, cmd: OnTranscoderRun) -> str:
+        """
+        Задание запускается: выбор пресета (для не перекодируемых — пресет по умолчанию)
+        """
+        with self._lock:
+            if self._queued.pop(cmd.job_id, None) is not None:
+                res_class, pixels, other = _work(cmd)
+                self._queued_pixels[res_class] -= pixels
+                self._queued_other -= other
+                if not self._queued:
+                    # Без накопления погрешности сумм
+                    self._queued_pixels.clear()
+                    self._queued_other = 0.0
+            params = cmd.output_media_params
+            if params.mode != "encode":
+                preset = ""
+            else:
+                preset = self._choose(cmd)
+            self._running[cmd.job_id] = _Running(cmd, preset, monotonic())
+            return preset
+
+    def on_progress(self, job_id: int, progress: float) -> None:
+        with self._lock:
+            job = self._running.get(job_id)
+            if job is not None:
+                job.progress = progress
+
+    def finish(self, job_id: int, ok: bool) -> None:
+        """
+        Задание завершено: фактическая скорость полного прохода уточняет модель
+        """
+        with self._lock:
+            job = self._running.pop(job_id, None)
+        if job is None or not ok or not job.preset:
+            return
+        wall = monotonic() - job.started
+        params = job.cmd.output_media_params
+        if wall > 0:
+            self.model.learn(job.preset, resolution_class(params), encode_pixels(params) / wall)
+
+    def _choose(self, cmd: OnTranscoderRun) -> str:
+        """
+        Вызывается под блокировкой
+        """
+        now = monotonic()
+        budget = self.deadline_at - now
+        correction = self._live_correction(now)
+        running_left = sum(self._running_left(job, now, correction) for job in self._running.values())
+
+        def _fits(next_preset: str, rest_preset: str) -> bool:
+            work = running_left + self._job_time(cmd, next_preset, correction)
+            work += self._rest_time(rest_preset, correction)
+            return work / self.workers <= budget
+
+        rest = next((p for p in reversed(self.presets) if _fits(p, p)), None)
+        if rest is None:
+            if not self._warned:
+                logger.warning(
+                    "Пакет не укладывается в срок даже с пресетом {0}: осталось {1:.0f} сек",
+                    self.presets[0],
+                    budget,
+                )
+                self._warned = True
+            return self.presets[0]
+        # Запас времени — на ступень медленнее для запускаемого задания (не больше:
+        # ошибка прогноза по одному заданию не должна съесть срок остальных)
+        step = self.presets.index(rest) + 1
+        preset = rest
+        if step < len(self.presets) and _fits(self.presets[step], rest):
+            preset = self.presets[step]
+        logger.debug(
+            "{0}: пресет {1} (остальные — {2}), до срока {3:.0f} сек, поправка скорости {4:.2f}",
+            cmd.input_file.name,
+            preset,
+            rest,
+            budget,
+            correction,
+        )
+        return preset
+
+    def _rest_time(self, preset: str, correction: float) -> float:
+        """
+        Время очереди и ещё не проанализированных файлов с пресетом preset
+        """
+        rest = self._pixels_time(self._queued_pixels, preset, correction) + self._queued_other
+        if self._expected and self._planned:
+            planned = self._pixels_time(self._planned_pixels, preset, correction)
+            rest += self._expected * (planned + self._planned_other) / self._planned
+        return rest
+
+    def _pixels_time(self, pixels: dict[str, float], preset: str, correction: float) -> float:
+        return sum(
+            px / (self.model.rate(preset, res_class) * correction)
+            for res_class, px in pixels.items()
+            if px > 0
+        )
+
+    def _job_time(self, cmd: OnTranscoderRun, preset: str, correction: float) -> float:
+        params = cmd.output_media_params
+        if params.mode != "encode":
+            return estimate_cost(params)
+        rate = self.model.rate(preset, resolution_class(params)) * correction
+        return encode_pixels(params) / rate
+
+    def _running_left(self, job: _Running, now: float, correction: float) -> float:
+        """
+        Оставшееся время выполняющегося задания: по фактической скорости или по модели
+        """
+        elapsed = now - job.started
+        if job.progress >= _MIN_PROGRESS:
+            return elapsed * (100.0 - job.progress) / job.progress
+        total = self._job_time(job.cmd, job.preset or self.presets[0], correction)
+        return max(0.0, total - elapsed)
+
+    def _live_correction(self, now: float) -> float:
+        """
+        Медиана отношения фактической скорости выполняющихся заданий к модели (1 — нет данных)
+        """
+        ratios = []
+        for job in self._running.values():
+            params = job.cmd.output_media_params
+            elapsed = now - job.started
+            if not job.preset or job.progress < _MIN_PROGRESS or elapsed <= 0:
+                continue
+            actual = encode_pixels(params) * job.progress / 100.0 / elapsed
+            ratios.append(actual / self.model.rate(job.preset, resolution_class(params)))
+        return statistics.median(ratios) if ratios else 1.0
@@ -1,14 +1,56 @@
 from pathlib import Path
+from typing import Callable, Optional
 
+from loguru import logger
 from pymediainfo import MediaInfo
 
-from core.config import DEFAULT_FPS
+from core.config import DEFAULT_FPS, PROBE_BACKEND, PROBE_THRESHOLD_MARGIN
 from services.main.models import SrcMediaInfo
 
-from components.utils.formatters import to_float_or_raise, to_int, to_int_or_raise
+from components.build_media_params import near_decision_threshold
+from components.container_probe import UnsupportedContainer, probe_container
+from components.probe_cache import ProbeCache
+from components.utils.formatters import (to_float, to_float_or_raise, to_int,
+                                         to_int_or_raise)
 
 
-def get_media_info(path: Path) -> SrcMediaInfo:
+def get_media_info(path: Path, cache: Optional[ProbeCache] = None) -> SrcMediaInfo:
+    """
+    Информация об исходном файле; при наличии кэша повторный анализ не выполняется
+    """
+    if cache is None:
+        return parse_media_info(path)
+    info = cache.get(path)
+    if info is None:
+        info = parse_media_info(path)
+        cache.put(path, info)
+    return info
+
+
+def parse_media_info(path: Path, backend: str = PROBE_BACKEND) -> SrcMediaInfo:
+    """
+    Анализ файла выбранным способом (PROBE_BACKENDS)
+    """
+    return PROBE_BACKENDS[backend](path)
+
+
+def parse_auto(path: Path) -> SrcMediaInfo:
+    """
+    Заголовки контейнера (быстро, без libmediainfo), при неудаче или битрейте
+    вблизи порога решения (PROBE_THRESHOLD_MARGIN) — MediaInfo
+    """
+    try:
+        info = probe_container(path)
+    except UnsupportedContainer as e:
+        logger.trace("{0}: анализ через MediaInfo ({1})", path.name, e)
+        return parse_mediainfo(path)
+    if near_decision_threshold(info, PROBE_THRESHOLD_MARGIN):
+        logger.trace("{0}: битрейт вблизи порога, анализ через MediaInfo", path.name)
+        return parse_mediainfo(path)
+    return info
+
+
+def parse_mediainfo(path: Path) -> SrcMediaInfo:
     mi = MediaInfo.parse(path)
     vtrack = next((t for t in mi.tracks if t.track_type == "Video"), None)
     atrack = next((t for t in mi.tracks if t.track_type == "Audio"), None)
@@ -33,6 +75,10 @@ def get_media_info(path: Path) -> SrcMediaInfo:
     width = getattr(vtrack, "width", None)
     height = getattr(vtrack, "height", None)
 
+    # Длительность (мс)
+    gtrack = next((t for t in mi.tracks if t.track_type == "General"), None)
+    duration_ms = getattr(gtrack, "duration", None) or getattr(vtrack, "duration", None)
+
     return SrcMediaInfo(
         src_width=to_int_or_raise(width),
         src_height=to_int_or_raise(height),
@@ -40,4 +86,13 @@ def get_media_info(path: Path) -> SrcMediaInfo:
         src_video_bitrate_avg=to_int(video_bitrate_bps),
         src_audio_codec=audio_codec,
         src_audio_bitrate=to_int(audio_bitrate_bps),
+        src_duration=to_float(duration_ms) / 1000,
     )
+
+
+# Способы анализа: имя → функция (PROBE_BACKEND, benchmarks/probe.py)
+PROBE_BACKENDS: dict[str, Callable[[Path], SrcMediaInfo]] = {
+    "auto": parse_auto,
+    "container": probe_container,
+    "mediainfo": parse_mediainfo,
+}
@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Literal, Optional
+
+from loguru import logger
+
+# Состояние задания:
+# - queued: файл найден и поставлен в очередь
+# - probing: анализ файла
+# - encoding: перекодирование (сегменты, если есть, сохраняются между запусками)
+# - finalized: итоговый файл записан, файл больше не рассматривается
+# - failed: ошибка, при следующем запуске задание выполняется снова
+JobState = Literal["queued", "probing", "encoding", "finalized", "failed"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path          TEXT PRIMARY KEY,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    state         TEXT NOT NULL,
+    chunks_dir    TEXT NOT NULL DEFAULT '',
+    segments_done INTEGER NOT NULL DEFAULT 0,
+    segments_total INTEGER NOT NULL DEFAULT 0,
+    error         TEXT NOT NULL DEFAULT '',
+    updated       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+@dataclass
+class JobRecord:
+    path: str
+    state: JobState
+    chunks_dir: str
+    segments_done: int
+    segments_total: int
+    error: str
+
+
+class JobJournal:
+    """
+    Журнал заданий в sqlite: состояние каждого файла и контрольные точки сегментного кодирования.
+
+    - Ключ: путь исходника; размер и время изменения сверяются — изменённый исходник
+      считается новым заданием.
+    - Каждое изменение фиксируется сразу (synchronous=FULL), поэтому журнал переживает
+      аварийное завершение программы.
+    - Завершённые (finalized) файлы при следующих запусках не анализируются.
+    - Папки сегментов незавершённых заданий не удаляются при запуске (app_init),
+      кодирование продолжается с последнего готового сегмента.
+    - Потокобезопасен (одно соединение под блокировкой).
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        logger.debug("<Журнал заданий>: {0}", db_path)
+
+    def is_finalized(self, path: Path, output: Optional[Path] = None) -> bool:
+        """
+        Файл уже обработан и с тех пор не менялся; output — итоговый файл, который должен существовать
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM jobs WHERE path = ? AND state = 'finalized'",
+                (_path_key(path),),
+            ).fetchone()
+        if row is None:
+            return False
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return False
+        if tuple(row) != (st.st_size, st.st_mtime_ns):
+            return False
+        return output is None or output.exists()
+
+    def get(self, path: Path) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, state, chunks_dir, segments_done, segments_total, error "
+                "FROM jobs WHERE path = ?",
+                (_path_key(path),),
+            ).fetchone()
+        return JobRecord(*row) if row else None
+
+    def queue(self, paths: Iterable[Path]) -> None:
+        """
+        Поставить файлы в очередь (одной транзакцией). Контрольные точки незавершённых
+        заданий сохраняются, если исходник не менялся.
+        Файлы, удалённые или переименованные после сканирования, пропускаются.
+        """
+        now = time.time()
+        rows = []
+        for path in paths:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                logger.warning("Файл не найден, не поставлен в журнал: {0}", path)
+                continue
+            rows.append((_path_key(path), st.st_size, st.st_mtime_ns, now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO jobs (path, size, mtime_ns, state, updated) "
+                "VALUES (?, ?, ?, 'queued', ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "  state = 'queued', error = '', updated = excluded.updated, "
+                "  chunks_dir = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                "               THEN chunks_dir ELSE '' END, "
+                "  segments_done = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                "               THEN segments_done ELSE 0 END, "
+                "  size = excluded.size, mtime_ns = excluded.mtime_ns",
+                rows,
+            )
+            self._conn.commit()
+
+    def set_state(self, path: Path, state: JobState, error: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated = ? WHERE path = ?",
+                (state, error, time.time(), _path_key(path)),
+            )
+            self._conn.commit()
+
+    def start_encoding(self, path: Path, chunks_dir: Optional[Path]) -> None:
+        """
+        Начало кодирования; chunks_dir — папка сегментов, которую нужно сохранить до завершения
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'encoding', chunks_dir = ?, updated = ? WHERE path = ?",
+                (str(chunks_dir) if chunks_dir else "", time.time(), _path_key(path)),
+            )
+            self._conn.commit()
+
+    def checkpoint(self, path: Path, segments_done: int, segments_total: int) -> None:
+        """
+        Контрольная точка: сколько сегментов закодировано
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET segments_done = ?, segments_total = ?, updated = ? WHERE path = ?",
+                (segments_done, segments_total, time.time(), _path_key(path)),
+            )
+            self._conn.commit()
+
+    def finish(self, path: Path, ok: bool, error: str = "") -> None:
+        """
+        Итог задания: finalized (итоговый файл записан) или failed.
+        У завершённого задания папка сегментов больше не сохраняется.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated = ?, "
+                "chunks_dir = CASE WHEN ? THEN '' ELSE chunks_dir END WHERE path = ?",
+                ("finalized" if ok else "failed", error, time.time(), ok, _path_key(path)),
+            )
+            self._conn.commit()
+
+    def resumable_dirs(self) -> set[Path]:
+        """
+        Папки сегментов незавершённых заданий (их нельзя удалять при запуске)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunks_dir FROM jobs WHERE state != 'finalized' AND chunks_dir != ''"
+            ).fetchall()
+        return {Path(r[0]) for r in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _path_key(path: Path) -> str:
+    return str(path.resolve())
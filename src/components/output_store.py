@@ -0,0 +1,234 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from shutil import copy2
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from services.main.models import OutputMediaParams
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key      TEXT PRIMARY KEY,
+    blob     TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    ok       INTEGER NOT NULL,
+    aborted  INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_accessed ON outputs (accessed);
+"""
+
+
+@dataclass
+class StoredOutput:
+    blob: Path
+    size: int
+    # Итог задания, при котором был получен результат (ok / досрочная остановка)
+    ok: bool
+    aborted: bool
+
+
+class OutputStore:
+    """
+    Хранилище результатов, адресуемое содержимым: ключ — отпечаток исходника
+    (размер + контрольная сумма выборочных блоков, без чтения файла целиком)
+    и контрольная сумма параметров кодирования и досрочной остановки.
+
+    - Копии одного ролика под разными именами и повторные запуски в новую папку output
+      получают копию результата вместо кодирования. Результаты копируются, а не связываются
+      жёсткой ссылкой: изменение итогового файла в output не меняет сохранённый результат.
+    - Результаты хранятся в root/objects, индекс — root/index.sqlite.
+    - Суммарный размер ограничен max_bytes: при превышении удаляются давно не использованные результаты.
+    - Потокобезопасен (одно соединение под блокировкой).
+    """
+
+    def __init__(
+        self, root: Path, max_bytes: int, sample_blocks: int, block_size: int
+    ) -> None:
+        self.root = root
+        self.objects = root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.sample_blocks = sample_blocks
+        self.block_size = block_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(root / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        logger.debug("<Хранилище результатов>: {0}", root)
+
+    def key(
+        self,
+        input_file: Path,
+        output_media_params: OutputMediaParams,
+        abort_ratio: float = 0.0,
+        abort_min_progress: float = 0.0,
+    ) -> str:
+        """
+        Настройки досрочной остановки входят в ключ: результат, остановленный
+        при одних настройках, не выдаётся при других
+        """
+        return "{0}-{1}".format(
+            content_fingerprint(input_file, self.sample_blocks, self.block_size),
+            params_digest(output_media_params, abort_ratio, abort_min_progress),
+        )
+
+    def get(self, key: str) -> Optional[StoredOutput]:
+        """
+        Сохранённый результат или None (промах). Результат, изменённый или удалённый
+        вне хранилища, удаляется из индекса.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob, size, ok, aborted FROM outputs WHERE key = ?", (key,)
+            ).fetchone()
+        if row is not None:
+            stored = StoredOutput(self.objects / row[0], row[1], bool(row[2]), bool(row[3]))
+            try:
+                valid = stored.blob.stat().st_size == stored.size
+            except FileNotFoundError:
+                valid = False
+            if valid:
+                with self._lock:
+                    self.hits += 1
+                    self._conn.execute(
+                        "UPDATE outputs SET accessed = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._conn.commit()
+                return stored
+            self._remove(key, stored.blob)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def materialize(self, stored: StoredOutput, output_temp: Path, output_final: Path) -> None:
+        """
+        Итоговый файл из хранилища: копия во временный файл и переименование,
+        прерванное копирование не оставляет неполный итоговый файл
+        """
+        try:
+            copy2(stored.blob, output_temp)
+            output_temp.replace(output_final)
+        except BaseException:
+            output_temp.unlink(missing_ok=True)
+            raise
+
+    def put(self, key: str, output_file: Path, ok: bool, aborted: bool = False) -> None:
+        """
+        Сохранить итоговый файл задания и при необходимости вытеснить старые результаты
+        """
+        blob_name = key + output_file.suffix.lower()
+        blob = self.objects / blob_name
+        tmp = blob.with_name(blob.name + ".part")
+        tmp.unlink(missing_ok=True)
+        copy2(output_file, tmp)
+        tmp.replace(blob)
+        row = (key, blob_name, blob.stat().st_size, ok, aborted, time.time())
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?)", row)
+            evicted = self._evict()
+            self._conn.commit()
+        for name in evicted:
+            (self.objects / name).unlink(missing_ok=True)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+
+    def close(self) -> None:
+        logger.debug(
+            "<Хранилище результатов>: попаданий={0}, промахов={1}", self.hits, self.misses
+        )
+        with self._lock:
+            self._conn.close()
+
+    def _remove(self, key: str, blob: Path) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            self._conn.commit()
+        blob.unlink(missing_ok=True)
+
+    def _evict(self) -> list[str]:
+        """
+        Удалить из индекса давно не использованные результаты сверх лимита размера
+        (вызывается под блокировкой). Возвращает имена файлов для удаления.
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+        evicted: list[str] = []
+        if total <= self.max_bytes:
+            return evicted
+        for key, blob, size in self._conn.execute(
+            "SELECT key, blob, size FROM outputs ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            evicted.append(blob)
+            total -= size
+        return evicted
+
+
+class KeyedLock:
+    """
+    Блокировка по ключу: задания с одинаковым исходником и параметрами выполняются по очереди,
+    поэтому дубликат в том же пакете дожидается результата первого и берёт его из хранилища
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locks: dict[str, tuple[threading.Lock, list[int]]] = {}
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._lock:
+            lock, users = self._locks.setdefault(key, (threading.Lock(), [0]))
+            users[0] += 1
+        lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+            with self._lock:
+                users[0] -= 1
+                if not users[0]:
+                    del self._locks[key]
+
+
+def content_fingerprint(path: Path, sample_blocks: int, block_size: int) -> str:
+    """
+    Отпечаток содержимого: размер + контрольная сумма sample_blocks блоков по block_size байт,
+    равномерно распределённых по файлу (первый и последний блок включены).
+    Небольшие файлы хешируются целиком.
+    """
+    size = path.stat().st_size
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with path.open("rb") as f:
+        if size <= sample_blocks * block_size:
+            h.update(f.read())
+        else:
+            step = (size - block_size) / max(1, sample_blocks - 1)
+            for i in range(sample_blocks):
+                f.seek(int(i * step))
+                h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def params_digest(
+    output_media_params: OutputMediaParams,
+    abort_ratio: float = 0.0,
+    abort_min_progress: float = 0.0,
+) -> str:
+    params = asdict(output_media_params)
+    params["abort"] = [abort_ratio, abort_min_progress]
+    data = json.dumps(params, sort_keys=True).encode()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
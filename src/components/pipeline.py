@@ -0,0 +1,154 @@
+import heapq
+import queue
+import threading
+from itertools import count
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Маркер окончания потока элементов в очереди
+_DONE = object()
+
+
+class StageResult(Generic[T, R]):
+    """
+    Результат обработки элемента стадией: значение или исключение
+    """
+
+    __slots__ = ("item", "value", "error")
+
+    def __init__(self, item: T, value: Optional[R], error: Optional[BaseException]):
+        self.item = item
+        self.value = value
+        self.error = error
+
+
+def ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    ahead: int,
+) -> Iterator[StageResult[T, R]]:
+    """
+    Параллельная обработка элементов в пуле потоков с сохранением порядка.
+    Источник читается в отдельном потоке (prefetch), в работе одновременно не более `ahead` элементов.
+    Результат отдаётся сразу по готовности, даже если источник ждёт новых элементов
+    (например, наблюдение за папкой).
+    Исключения не прерывают поток, а возвращаются в StageResult.error.
+    """
+    with ThreadPoolExecutor(max(1, workers), thread_name_prefix="stage") as pool:
+        submitted = prefetch(((item, pool.submit(fn, item)) for item in items), ahead)
+        for item, future in submitted:
+            yield _collect(item, future)
+
+
+def prefetch(source: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Выполнять генератор-источник в отдельном потоке и отдавать элементы через
+    ограниченную очередь: источник работает с опережением потребителя не более чем на maxsize
+    элементов (при заполнении очереди — ждёт). Исключение источника пробрасывается потребителю.
+    """
+    q, stop = _start_producer(source, maxsize)
+    try:
+        while True:
+            item = _unwrap(q.get())
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def prioritize(
+    source: Iterable[T],
+    key: Callable[[T], float],
+    maxsize: int,
+    fill_first: bool = False,
+) -> Iterator[T]:
+    """
+    Как prefetch, но потребителю отдаётся элемент с наименьшим key среди уже готовых
+    (приоритетная очередь до maxsize элементов). Выбор происходит в момент запроса,
+    поэтому при потреблении по мере освобождения воркеров порядок определяется
+    всеми элементами, подготовленными к этому моменту.
+
+    fill_first: первый элемент отдаётся только после окончания источника или заполнения
+    очереди — для пакета, где важен порядок всех заданий, а не время до первого результата.
+    """
+    q, stop = _start_producer(source, maxsize)
+    heap: list[tuple[float, int, T]] = []
+    seq = count()
+    exhausted = False
+
+    def _push(item) -> None:
+        nonlocal exhausted
+        item = _unwrap(item)
+        if item is _DONE:
+            exhausted = True
+        else:
+            heapq.heappush(heap, (key(item), next(seq), item))
+
+    try:
+        if fill_first:
+            while not exhausted and len(heap) < maxsize:
+                _push(q.get())
+        while True:
+            # Все готовые элементы — в кучу, без ожидания
+            while not exhausted and len(heap) < maxsize:
+                try:
+                    _push(q.get_nowait())
+                except queue.Empty:
+                    break
+            if not heap:
+                if exhausted:
+                    return
+                _push(q.get())
+                continue
+            yield heapq.heappop(heap)[2]
+    finally:
+        stop.set()
+
+
+def _start_producer(source: Iterable[T], maxsize: int) -> tuple[queue.Queue, threading.Event]:
+    """
+    Поток, перекладывающий элементы источника в ограниченную очередь
+    (в конце — _DONE или исключение источника)
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer() -> None:
+        try:
+            for item in source:
+                if not _put(item):
+                    return
+            _put(_DONE)
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            _put(e)
+
+    thread = threading.Thread(target=_producer, name="prefetch", daemon=True)
+    thread.start()
+    return q, stop
+
+
+def _unwrap(item):
+    if isinstance(item, BaseException):
+        raise item
+    return item
+
+
+def _collect(item: T, future: Future) -> StageResult:
+    try:
+        return StageResult(item, future.result(), None)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return StageResult(item, None, e)
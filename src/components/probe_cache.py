@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from services.main.models import SrcMediaInfo
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest   TEXT NOT NULL,
+    info     TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS probe_accessed ON probe (accessed);
+"""
+
+
+class ProbeCache:
+    """
+    Постоянный кэш результатов анализа медиафайлов (SrcMediaInfo) в sqlite.
+
+    - Ключ: путь + размер + время изменения (+ опционально контрольная сумма
+      первых/последних hash_bytes байт). Несовпадение любого поля — промах и удаление записи.
+    - Размер ограничен max_entries: при превышении удаляются давно не использованные записи.
+    - Счётчики hits/misses — для отчёта о работе кэша.
+    - Потокобезопасен (одно соединение под блокировкой).
+    """
+
+    def __init__(self, db_path: Path, max_entries: int, hash_bytes: int = 0) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hash_bytes = hash_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        logger.debug("<Кэш анализа>: {0}", db_path)
+
+    def get(self, path: Path) -> Optional[SrcMediaInfo]:
+        """
+        Вернуть сохранённый результат или None (промах)
+        """
+        key = _path_key(path)
+        st = path.stat()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, digest, info FROM probe WHERE path = ?", (key,)
+            ).fetchone()
+        if row is not None:
+            size, mtime_ns, digest, info = row
+            if (size, mtime_ns) == (st.st_size, st.st_mtime_ns) and digest == self._digest(path):
+                try:
+                    result = SrcMediaInfo(**json.loads(info))
+                except (TypeError, ValueError):
+                    result = None
+                if result is not None:
+                    with self._lock:
+                        self.hits += 1
+                        self._conn.execute(
+                            "UPDATE probe SET accessed = ? WHERE path = ?", (time.time(), key)
+                        )
+                        self._conn.commit()
+                    return result
+            self.invalidate(path)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, path: Path, info: SrcMediaInfo) -> None:
+        """
+        Сохранить результат анализа и при необходимости вытеснить старые записи
+        """
+        st = path.stat()
+        row = (
+            _path_key(path),
+            st.st_size,
+            st.st_mtime_ns,
+            self._digest(path),
+            json.dumps(asdict(info)),
+            time.time(),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probe VALUES (?, ?, ?, ?, ?, ?)", row
+            )
+            self._evict()
+            self._conn.commit()
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM probe WHERE path = ?", (_path_key(path),))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM probe")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM probe").fetchone()[0]
+
+    def close(self) -> None:
+        logger.debug("<Кэш анализа>: попаданий={0}, промахов={1}", self.hits, self.misses)
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        """
+        Удалить давно не использованные записи сверх лимита (вызывается под блокировкой)
+        """
+        count = self._conn.execute("SELECT COUNT(*) FROM probe").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM probe WHERE path IN "
+                "(SELECT path FROM probe ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+
+    def _digest(self, path: Path) -> str:
+        """
+        Контрольная сумма первых и последних hash_bytes байт файла ("" — отключено)
+        """
+        if self.hash_bytes <= 0:
+            return ""
+        h = hashlib.blake2b(digest_size=16)
+        with path.open("rb") as f:
+            h.update(f.read(self.hash_bytes))
+            size = path.stat().st_size
+            if size > self.hash_bytes * 2:
+                f.seek(size - self.hash_bytes)
+                h.update(f.read(self.hash_bytes))
+        return h.hexdigest()
+
+
+def _path_key(path: Path) -> str:
+    return str(path.resolve())
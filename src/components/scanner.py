@@ -0,0 +1,53 @@
+import os
+from pathlib import Path
+from typing import Iterator
+
+# Служебные папки и файлы в папке output (сегменты, временные файлы) не считаются результатами
+_CHUNKS_DIR_SUFFIX = ".chunks"
+_TMP_SUFFIX = ".tmp"
+
+
+def scan_tree(root: Path, exts: set[str]) -> Iterator[Path]:
+    """
+    Рекурсивный обход папки через os.scandir: файлы с расширениями из exts отдаются по мере обхода.
+    Тип записи берётся из результата readdir, поэтому stat на каждый файл не выполняется.
+    Порядок: по имени внутри папки, вложенные папки — после файлов.
+    Символические ссылки на папки не обходятся (защита от циклов).
+    """
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except (FileNotFoundError, PermissionError):
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+            elif os.path.splitext(entry.name)[1].lower() in exts and entry.is_file():
+                yield Path(entry.path)
+        # Стек: первая по имени папка обходится первой
+        stack.extend(reversed(subdirs))
+
+
+def scan_outputs(root: Path) -> set[str]:
+    """
+    Множество готовых результатов в папке output за один обход:
+    пути относительно root в формате POSIX (без временных файлов и папок сегментов)
+    """
+    done: set[str] = set()
+    if not root.exists():
+        return done
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.lower().endswith(_CHUNKS_DIR_SUFFIX):
+                        stack.append((Path(entry.path), prefix + entry.name + "/"))
+                elif _TMP_SUFFIX not in Path(entry.name).suffixes[:-1]:
+                    done.add(prefix + entry.name)
+    return done
@@ -18,6 +18,16 @@ def to_int_or_raise(v) -> int:
         raise ValueError("Недопустимое значение") from exc
 
 
+def to_float(v) -> float:
+    """
+    Преобразовать значение в число с точкой или вернуть "0.0"
+    """
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 def to_float_or_raise(v) -> float:
     """
     Преобразовать значение в число с точкой или сообщить об ошибке
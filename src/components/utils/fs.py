@@ -1,5 +1,7 @@
+import os
 from pathlib import Path
-from typing import Iterable, List, Union
+from shutil import rmtree
+from typing import Callable, Collection, Iterable, List, Optional, Union
 
 
 def fs_create_dirs(dirs) -> None:
@@ -14,7 +16,8 @@ def fs_delete_files_with_suffix_before_ext(
     path: Union[str, Path],
     suffix: str,
     recursive: bool = True,
-    dry_run: bool = False
+    dry_run: bool = False,
+    skip: Optional[Callable[[Path], bool]] = None,
 ) -> List[Path]:
     """
     Удаляет файлы, в имени которых присутствует заданный суффикс, перед финальным расширением.
@@ -27,6 +30,8 @@ def fs_delete_files_with_suffix_before_ext(
                 '.tmp' или 'tmp' — эквивалентно.
       - recursive: искать рекурсивно (True) или только в указанной папке (False).
       - dry_run: если True — ничего не удаляется, только возвращается список кандидатов.
+      - skip: файлы, для которых skip(path) истинно, не удаляются
+              (например, временные файлы заданий другого экземпляра программы).
 
     Возвращает:
       Список путей удалённых (или намеченных к удалению при dry_run=True) файлов.
@@ -58,17 +63,58 @@ def fs_delete_files_with_suffix_before_ext(
     candidates: List[Path] = []
     for p in it:
         # Учитываем только обычные файлы (в т.ч. симлинки на файлы)
-        if p.is_file() and has_target_suffix(p):
+        if p.is_file() and has_target_suffix(p) and not (skip and skip(p)):
             candidates.append(p)
 
     deleted: List[Path] = []
     for p in candidates:
         try:
             if not dry_run:
-                p.unlink()
+                # Файл мог удалить другой экземпляр программы
+                p.unlink(missing_ok=True)
             deleted.append(p)
         except (ValueError, TypeError) as e:
             # Можно логировать или собрать ошибки отдельно
             print(f"Не удалось удалить {p}: {e}")
 
     return deleted
+
+
+def fs_delete_dirs_with_suffix(
+    path: Union[str, Path],
+    suffix: str,
+    keep: Collection[Path] = (),
+    recursive: bool = True,
+    skip: Optional[Callable[[Path], bool]] = None,
+) -> List[Path]:
+    """
+    Удаляет (вместе с содержимым) вложенные папки с заданным суффиксом,
+    например, оставшиеся после прерванного сегментного перекодирования 'video.tmp.chunks'.
+    Папки из keep (например, сегменты незавершённых заданий журнала) и папки,
+    для которых skip(path) истинно, не удаляются.
+    recursive: искать во всех подпапках (True) или только на первом уровне (False).
+
+    Возвращает:
+      Список путей удалённых папок.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Path not found: {path}")
+
+    keep_resolved = {Path(k).resolve() for k in keep}
+    norm_suffix = suffix.lower()
+    deleted: List[Path] = []
+    for root, dirs, _ in os.walk(path):
+        for name in list(dirs):
+            if not name.lower().endswith(norm_suffix):
+                continue
+            # Найденные папки не обходятся дальше
+            dirs.remove(name)
+            p = Path(root) / name
+            if p.resolve() in keep_resolved or (skip and skip(p)):
+                continue
+            rmtree(p, ignore_errors=True)
+            deleted.append(p)
+        if not recursive:
+            break
+    return deleted
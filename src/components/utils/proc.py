@@ -0,0 +1,148 @@
+import ctypes
+import glob
+import os
+import platform
+import sys
+import threading
+from typing import Optional
+
+from loguru import logger
+
+# Тиков процессорного времени в секунде (для /proc/<pid>/stat)
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_cpu_time(pid: int) -> Optional[float]:
+    """
+    Процессорное время (user + system, сек) запущенного процесса по /proc/<pid>/stat.
+    None — если процесс уже завершён или платформа не Linux.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Имя процесса в скобках может содержать пробелы — поля считаются после ")"
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    try:
+        utime, stime = int(fields[11]), int(fields[12])
+    except (IndexError, ValueError):
+        return None
+    return (utime + stime) / _CLK_TCK
+
+
+def process_alive(pid: int) -> Optional[bool]:
+    """
+    Процесс с pid запущен на этом компьютере; None — неизвестно (не POSIX или pid не задан)
+    """
+    # На Windows os.kill(pid, 0) отправляет CTRL_C_EVENT, а не проверяет процесс
+    if os.name != "posix" or pid <= 0:
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+class ChildCpuMeter:
+    """
+    Процессорное время дочерних процессов задания (в т.ч. нескольких процессов сегментного режима).
+    Время снимается при каждом обновлении прогресса: хвост после последнего снимка не учитывается.
+    """
+
+    def __init__(self) -> None:
+        self._samples: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def sample(self, pid: Optional[int]) -> None:
+        if pid is None:
+            return
+        cpu = process_cpu_time(pid)
+        if cpu is not None:
+            with self._lock:
+                self._samples[pid] = cpu
+
+    @property
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._samples.values())
+
+
+def load_average() -> Optional[float]:
+    """
+    Средняя загрузка системы за 1 минуту (None — недоступна, например, на Windows)
+    """
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def mem_available() -> Optional[int]:
+    """
+    Доступная память (байт) по MemAvailable из /proc/meminfo (None — не Linux)
+    """
+    try:
+        with open("/proc/meminfo", "rb") as f:
+            for line in f:
+                if line.startswith(b"MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def max_temperature() -> Optional[float]:
+    """
+    Максимальная температура (°C) по датчикам /sys/class/thermal (None — датчиков нет)
+    """
+    temps = []
+    for zone in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+        try:
+            with open(zone, "rb") as f:
+                temps.append(int(f.read().strip()) / 1000)
+        except (OSError, ValueError):
+            continue
+    return max(temps) if temps else None
+
+
+# ioprio_set(2): IOPRIO_WHO_PROCESS, класс IDLE (3) в старших битах
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+_SYS_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "i686": 289, "armv7l": 314}
+
+
+def set_process_priority(
+    nice: int = 0, io_idle: bool = False, affinity: Optional[list[int]] = None
+) -> None:
+    """
+    Приоритет текущего процесса: nice, класс ввода-вывода idle (ionice -c 3) и привязка к ядрам.
+    Вызывается до запуска потоков: потоки и дочерние процессы (ffmpeg) наследуют настройки.
+    Неподдерживаемые на платформе настройки пропускаются с предупреждением.
+    """
+    if nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+        except (AttributeError, OSError) as e:
+            logger.warning("Не удалось установить nice {0}: {1}", nice, e)
+    if io_idle:
+        syscall = _SYS_IOPRIO_SET.get(platform.machine())
+        ok = False
+        if sys.platform.startswith("linux") and syscall is not None:
+            libc = ctypes.CDLL(None, use_errno=True)
+            prio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+            ok = libc.syscall(syscall, _IOPRIO_WHO_PROCESS, 0, prio) == 0
+        if not ok:
+            logger.warning("Не удалось установить класс ввода-вывода idle")
+    if affinity:
+        try:
+            os.sched_setaffinity(0, affinity)
+        except (AttributeError, OSError, ValueError) as e:
+            logger.warning("Не удалось привязать процесс к ядрам {0}: {1}", affinity, e)
@@ -0,0 +1,222 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import Iterator, Optional
+
+from loguru import logger
+
+# Маски inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Candidate:
+    """
+    Файл, ожидающий окончания записи: размер и время изменения на момент последней проверки
+    """
+
+    __slots__ = ("size", "mtime_ns", "changed")
+
+    def __init__(self, size: int, mtime_ns: int, changed: float) -> None:
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.changed = changed
+
+
+class FolderWatcher:
+    """
+    Наблюдение за папкой: новые файлы с расширениями из exts отдаются итератором
+    после того, как перестали расти (размер и время изменения не менялись settle_time сек).
+
+    - Linux: inotify (через libc), проверяются только файлы, о которых сообщило ядро;
+    - иначе (или при ошибке inotify): опрос содержимого папки раз в poll_interval сек.
+
+    Файлы, уже лежащие в папке при запуске, тоже отдаются (после той же проверки).
+    Файл отдаётся один раз, пока не изменится (размер или время изменения) или не будет
+    удалён и добавлен снова; итерация завершается после stop().
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        exts: set[str],
+        settle_time: float,
+        poll_interval: float,
+        force_polling: bool = False,
+    ) -> None:
+        self.folder = folder
+        self.exts = exts
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._candidates: dict[Path, _Candidate] = {}
+        # Отданные файлы → (размер, время изменения); удалённые из папки забываются
+        self._seen: dict[Path, tuple[int, int]] = {}
+        self._fd: Optional[int] = None if force_polling else _inotify_open(folder)
+        logger.debug(
+            "<Наблюдение за папкой>: {0} ({1})",
+            folder,
+            "inotify" if self._fd is not None else "опрос",
+        )
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def __iter__(self) -> Iterator[Path]:
+        try:
+            self._rescan()
+            while not self._stop.is_set():
+                yield from self._settled()
+                timeout = self._next_check_timeout()
+                if self._fd is not None:
+                    self._wait_inotify(timeout)
+                else:
+                    if self._stop.wait(timeout):
+                        break
+                    self._rescan()
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _accepts(self, path: Path) -> bool:
+        return path.suffix.lower() in self.exts
+
+    def _is_seen(self, path: Path, st: os.stat_result) -> bool:
+        return self._seen.get(path) == (st.st_size, st.st_mtime_ns)
+
+    def _touch(self, path: Path) -> None:
+        """
+        Файл изменился (или появился): проверка окончания записи начинается заново
+        """
+        if not self._accepts(path):
+            return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self._candidates.pop(path, None)
+            return
+        if self._is_seen(path, st):
+            return
+        self._candidates[path] = _Candidate(st.st_size, st.st_mtime_ns, monotonic())
+
+    def _rescan(self) -> None:
+        """
+        Полный просмотр папки: при запуске, в режиме опроса и при переполнении очереди inotify
+        """
+        present: set[Path] = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if not self._accepts(path) or not entry.is_file():
+                    continue
+                present.add(path)
+                st = entry.stat()
+                if self._is_seen(path, st):
+                    continue
+                known = self._candidates.get(path)
+                if known is None or (known.size, known.mtime_ns) != (st.st_size, st.st_mtime_ns):
+                    self._candidates[path] = _Candidate(st.st_size, st.st_mtime_ns, monotonic())
+        # Удалённые файлы (в режиме опроса событий удаления нет)
+        for path in self._seen.keys() - present:
+            del self._seen[path]
+
+    def _settled(self) -> Iterator[Path]:
+        """
+        Файлы, размер которых не менялся settle_time сек
+        """
+        now = monotonic()
+        for path, c in list(self._candidates.items()):
+            if now - c.changed < self.settle_time:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                del self._candidates[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (c.size, c.mtime_ns):
+                # Изменения без событий (например, запись по сети) — ждём дальше
+                self._candidates[path] = _Candidate(st.st_size, st.st_mtime_ns, now)
+                continue
+            del self._candidates[path]
+            self._seen[path] = (st.st_size, st.st_mtime_ns)
+            yield path
+
+    def _next_check_timeout(self) -> float:
+        if self._fd is None:
+            return self.poll_interval
+        if not self._candidates:
+            # Проверка флага остановки не реже раза в секунду
+            return 1.0
+        now = monotonic()
+        earliest = min(c.changed for c in self._candidates.values())
+        return min(1.0, max(0.05, earliest + self.settle_time - now))
+
+    def _wait_inotify(self, timeout: float) -> None:
+        assert self._fd is not None
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                self._rescan()
+                continue
+            if not name:
+                continue
+            path = self.folder / os.fsdecode(name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._candidates.pop(path, None)
+                self._seen.pop(path, None)
+            else:
+                self._touch(path)
+
+
+def _inotify_open(folder: Path) -> Optional[int]:
+    """
+    Дескриптор inotify с наблюдением за папкой; None — inotify недоступен
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(fd, os.fsencode(folder), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, "inotify_add_watch")
+    except (OSError, AttributeError) as e:
+        logger.warning("inotify недоступен ({0}), используется опрос папки", e)
+        return None
+    return fd
@@ -0,0 +1,216 @@
+import asyncio
+import inspect
+from collections import deque
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from loguru import logger
+
+from core.commands import Command
+from core.events import Event
+from core.messagebus import (AbstractMessageBus, EventPolicy, Message, _Slot,
+                             _get_callback_info, bind_handler)
+
+
+class AsyncMessageBus(AbstractMessageBus):
+    """
+    Вариант MessageBus для asyncio: тот же API подписки и публикации,
+    обработчики могут быть как обычными функциями, так и корутинами.
+
+    - События доставляются задачей-диспетчером в цикле событий (по порядку,
+      корутины-обработчики ожидаются). Публиковать события можно и из других потоков.
+    - publish(Command) возвращает asyncio.Future с результатом обработчика,
+      поэтому вызывающий код пишет `await bus.publish(cmd)`.
+    - Политики доставки (EventPolicy): слияние по ключу и "drop"; режим "block"
+      не поддерживается, т.к. publish не может ждать внутри цикла событий.
+    - Перед использованием: `await bus.start()`, по завершении: `await bus.close()`.
+    """
+
+    def __init__(self) -> None:
+        self.event_handlers: dict[type[Event], tuple[Callable, ...]] = {}
+        self.command_handlers: dict[type[Command], Callable] = {}
+        self.dependencies: dict[str, Any] = {}
+        self._pending: deque[_Slot] = deque()
+        self._coalesce_index: dict[Hashable, _Slot] = {}
+        self._pending_by_type: dict[type[Event], int] = {}
+        self._policies: dict[type[Event], EventPolicy] = {}
+        self.coalesced: dict[type[Event], int] = {}
+        self.dropped: dict[type[Event], int] = {}
+        self._closed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Публичный API (в логическом порядке использования) ---
+
+    async def start(self) -> None:
+        """Запускает диспетчер событий в текущем цикле событий."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._dispatcher(), name="bus-dispatcher")
+
+    def add_dependency(self, name: str, dep: Any) -> None:
+        """Добавляет или обновляет одну зависимость по имени."""
+        if not isinstance(name, str):
+            raise TypeError("Имя зависимости должно быть строкой")
+        self.dependencies[name] = dep
+
+    def update_dependencies(self, deps: dict[str, Any]) -> None:
+        """Добавляет или обновляет несколько зависимостей."""
+        if not isinstance(deps, dict):
+            raise TypeError("Зависимости должны быть переданы как dict[str, Any]")
+        self.dependencies.update(deps)
+
+    def subscribe_event(self, event: type[Event], callback: Callable) -> None:
+        wrapped = bind_handler(callback, self.dependencies)
+        self.event_handlers[event] = (*self.event_handlers.get(event, ()), wrapped)
+        logger.trace("event={0} += {1}.", event, _get_callback_info(callback))
+
+    def subscribe_command(self, command: type[Command], callback: Callable) -> None:
+        """Подписывает функцию или корутину `callback` на команды типа `command`."""
+        if command in self.command_handlers:
+            raise ValueError(
+                f"Команде {command} уже назначен обработчик {_get_callback_info(callback)}."
+            )
+        self.command_handlers[command] = bind_handler(callback, self.dependencies)
+        logger.trace("command={0} += {1}.", command, _get_callback_info(callback))
+
+    def set_event_policy(self, event: type[Event], policy: EventPolicy) -> None:
+        """Назначает политику доставки событиям типа `event`."""
+        if policy.maxsize > 0 and policy.overflow == "block":
+            raise ValueError("AsyncMessageBus не поддерживает политику overflow=\"block\"")
+        self._policies[event] = policy
+
+    def publish(self, message: Message) -> Any | None:
+        if isinstance(message, Event):
+            self.handle_event(message)
+            return None
+        elif isinstance(message, Command):
+            return self.handle_command(message)
+        else:
+            raise ValueError(f"{message} не Event или Command")
+
+    def publish_many(self, messages: Iterable[Message]) -> list[Any | None]:
+        return [self.publish(m) for m in messages]
+
+    def handle_event(self, event: Event) -> None:
+        if self._loop is None:
+            raise RuntimeError("Шина не запущена: вызовите start()")
+        if self._closed:
+            raise RuntimeError(f"Шина закрыта, событие {event} не доставлено")
+        if _in_loop_thread(self._loop):
+            self._enqueue(event)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, event)
+
+    def handle_command(self, command: Command) -> asyncio.Future:
+        """
+        Выполняет обработчик команды. Результат (или исключение) — в возвращаемом Future.
+        """
+        if self._loop is None:
+            raise RuntimeError("Шина не запущена: вызовите start()")
+        handler = self.command_handlers[type(command)]
+        if not _in_loop_thread(self._loop):
+            return asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(_await_result(handler, command), self._loop)
+            )
+        try:
+            result = handler(command)
+        except Exception as e:
+            logger.exception(e)
+            raise
+        if inspect.isawaitable(result):
+            return asyncio.ensure_future(result)
+        future = self._loop.create_future()
+        future.set_result(result)
+        return future
+
+    async def drain(self, timeout: float | None = None) -> bool:  # type: ignore[override]
+        """
+        Ждёт доставки всех опубликованных событий.
+        Возвращает False, если за timeout очередь не опустела.
+        """
+        assert self._idle is not None
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, timeout: float | None = None) -> None:  # type: ignore[override]
+        """
+        Доставляет оставшиеся события и останавливает диспетчер.
+        """
+        if self._task is None:
+            return
+        await self.drain(timeout)
+        self._closed = True
+        assert self._wakeup is not None
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    # --- Внутренние методы (protected) ---
+
+    def _enqueue(self, event: Event) -> None:
+        event_type = type(event)
+        policy = self._policies.get(event_type)
+        key = None
+        if policy and policy.coalesce_key:
+            key = (event_type, policy.coalesce_key(event))
+            slot = self._coalesce_index.get(key)
+            if slot is not None:
+                slot.event = event
+                self.coalesced[event_type] = self.coalesced.get(event_type, 0) + 1
+                return
+        if policy and policy.maxsize > 0:
+            if self._pending_by_type.get(event_type, 0) >= policy.maxsize:
+                self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+                return
+        slot = _Slot(event, key)
+        self._pending.append(slot)
+        if key is not None:
+            self._coalesce_index[key] = slot
+        self._pending_by_type[event_type] = self._pending_by_type.get(event_type, 0) + 1
+        assert self._wakeup is not None and self._idle is not None
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def _dispatcher(self) -> None:
+        assert self._wakeup is not None and self._idle is not None
+        while True:
+            if not self._pending:
+                self._idle.set()
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            slot = self._pending.popleft()
+            if slot.key is not None:
+                del self._coalesce_index[slot.key]
+            event = slot.event
+            self._pending_by_type[type(event)] -= 1
+            for h in self.event_handlers.get(type(event), ()):
+                try:
+                    result = h(event)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.exception("event={0}. e={1}", event, e)
+
+
+async def _await_result(handler: Callable, command: Command) -> Any:
+    result = handler(command)
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+def _in_loop_thread(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
@@ -1,7 +1,8 @@
+import os
 import sys
 from enum import Enum
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from loguru import logger
 
@@ -38,11 +39,16 @@ else:
     RESOURCES_DIR = BASE_DIR / "resources"
     FFMPEG_BIN = RESOURCES_DIR / "ffmpeg" / "bin" / "ffmpeg"
     BASE_DIR = BASE_DIR / "_test"
+# Переопределение исполняемого файла ffmpeg (например, системный ffmpeg на Linux для бенчмарков)
+if os.environ.get("VIDEOGYMNAST_FFMPEG_BIN"):
+    FFMPEG_BIN = Path(os.environ["VIDEOGYMNAST_FFMPEG_BIN"])
 logger.debug(f"<FFmpage - Исполняемый файл>: {FFMPEG_BIN}")
 
 #
 INPUT_PATH = BASE_DIR / "input"
 OUTPUT_PATH = BASE_DIR / "output"
+CACHE_PATH = BASE_DIR / "cache"
+REPORTS_PATH = BASE_DIR / "reports"
 
 # Видео-расширения
 VIDEO_EXTS: set[str] = {
@@ -59,13 +65,184 @@ DEFAULT_BPP_SD: float = 0.03
 DEFAULT_BPP_720P: float = 0.02
 DEFAULT_BPP_1080P: float = 0.01
 
+# Анализ медиафайлов (components/get_media_info.py):
+# auto — заголовки MP4/MOV и Matroska/WebM без libmediainfo, остальное — MediaInfo;
+# mediainfo — только MediaInfo
+PROBE_BACKEND: str = "auto"
+# Битрейт по заголовкам контейнера (auto) считается из размеров сэмплов и отличается
+# от MediaInfo на доли процента; если он ближе этой доли к порогу решения
+# (копирование AAC, быстрые пути) — файл повторно анализируется через MediaInfo
+PROBE_THRESHOLD_MARGIN: float = 0.02
+
+# Кэш анализа медиафайлов (sqlite)
+PROBE_CACHE_ENABLED: bool = True
+PROBE_CACHE_FILE = CACHE_PATH / "probe_cache.sqlite"
+# Максимальное количество записей (при превышении удаляются давно не использованные)
+PROBE_CACHE_MAX_ENTRIES: int = 100_000
+# Байт из начала и конца файла для контрольной суммы (0 — только размер и время изменения)
+PROBE_CACHE_HASH_BYTES: int = 0
+
+# Быстрые пути (без перекодирования видео): разрешение не меняется и исходный bpp
+# (бит на пиксель) не превышает рекомендуемый более чем в FAST_PATH_BPP_RATIO раз.
+# Если при этом и аудио не требует перекодирования — файл копируется как есть (skip),
+# иначе видео копируется, а аудио перекодируется (remux)
+FAST_PATH_ENABLED: bool = True
+FAST_PATH_BPP_RATIO: float = 1.1
+
 # FFmpeg - Общее
 FFMPEG_GLOBAL_ARGS: List[str] = ["-hide_banner", "-y"]
+# Последние байты stderr ffmpeg, сохраняемые для сообщения об ошибке (кольцевой буфер на процесс)
+FFMPEG_STDERR_TAIL_BYTES: int = 16 * 1024
 
 # FFmpeg - Кодирование
 FFMPEG_X264_PRESET: str = "medium"
 vbv_bufsize_multiplier: float = 2.0
 
+# Параллельная обработка
+# Количество одновременных заданий перекодирования (0 — авто)
+TRANSCODER_JOBS: int = 0
+# Ориентир потоков libx264 на одно задание при автоматическом расчёте
+TRANSCODER_AUTO_THREADS_PER_JOB: int = 8
+# Процессы-воркеры перекодирования (core/process_bus.py): задания выполняются вне основного
+# процесса, интерфейс и планирование не делят с ними GIL (0 — в основном процессе)
+TRANSCODER_PROCESS_WORKERS: int = 0
+
+# Распределённая обработка (services/cluster): координатор (--serve) выдаёт задания воркерам (--worker)
+# по HTTP. Исходники и папка output должны быть доступны воркерам по тем же путям (общее хранилище)
+CLUSTER_ADDRESS: str = "127.0.0.1:8765"
+# Заданий, выданных воркерам или ожидающих выдачи (--jobs координатора)
+CLUSTER_JOBS: int = 16
+# Срок аренды задания (сек): не продлённое воркером задание передаётся другому воркеру
+CLUSTER_LEASE_TTL: float = 15.0
+# Интервал продления аренды и отправки событий заданий (сек)
+CLUSTER_HEARTBEAT_INTERVAL: float = 1.0
+# Выдач задания (с истёкшей арендой), после которых оно завершается с ошибкой
+CLUSTER_MAX_ATTEMPTS: int = 3
+# Сколько координатор держит запрос аренды, если заданий нет (сек)
+CLUSTER_POLL_WAIT: float = 5.0
+# Сколько воркер ждёт недоступного координатора, прежде чем завершиться (сек)
+CLUSTER_RETRY_TIME: float = 30.0
+
+# Адаптивный допуск заданий (--adaptive): количество одновременных заданий и потоков ffmpeg
+# определяется по загрузке системы, доступной памяти и температуре (components/adaptive.py);
+# TRANSCODER_JOBS / --jobs — верхний предел (0 — по количеству ядер)
+ADAPTIVE_CONCURRENCY: bool = False
+# Доля ядер, которую может занимать программа вместе с чужой нагрузкой
+ADAPTIVE_CPU_BUDGET: float = 1.0
+# Память, которая всегда остаётся свободной, байт
+ADAPTIVE_MEM_RESERVE: int = 1024**3
+# Оценка памяти задания: базовая (байт) + ADAPTIVE_MEM_FRAMES кадров исходного и итогового разрешения
+ADAPTIVE_MEM_BASE: int = 200 * 1024**2
+ADAPTIVE_MEM_FRAMES: int = 60
+# Время (сек), за которое запущенное задание занимает память (до этого учитывается по оценке)
+ADAPTIVE_RAMP_TIME: float = 10.0
+# Интервал повторной проверки ресурсов, когда задание ожидает допуска (сек)
+ADAPTIVE_POLL_INTERVAL: float = 2.0
+# Температура (°C), при которой новые задания не запускаются (0 — не проверять)
+ADAPTIVE_THERMAL_LIMIT: float = 90.0
+
+# Приоритет процессов (наследуется ffmpeg): nice (0 — не менять), класс ввода-вывода idle,
+# привязка к ядрам (пустой список — без привязки). Только Linux/macOS
+PROCESS_NICE: int = 0
+PROCESS_IO_IDLE: bool = False
+PROCESS_CPU_AFFINITY: List[int] = []
+
+# Пайплайн: анализ файлов идёт в пуле потоков с опережением кодирования
+PIPELINE_PROBE_WORKERS: int = 4
+# Сколько файлов может быть проанализировано наперёд (ёмкость очереди между стадиями)
+PIPELINE_PROBE_AHEAD: int = 256
+# Сканирование папки input (рекурсивно, в отдельном потоке): сколько найденных файлов может ждать анализа.
+# Очередь с запасом, чтобы сканирование большого дерева завершалось раньше обработки
+PIPELINE_SCAN_AHEAD: int = 100_000
+
+# Планировщик: порядок запуска заданий по оценке времени (components/cost_model.py)
+# fifo — порядок сканирования, longest — сначала долгие (меньше общее время пакета),
+# shortest — сначала быстрые (раньше первые результаты)
+SCHEDULER_ORDER: str = "longest"
+# Пикселей в секунду при перекодировании с пресетом medium (оценка; уточняется по отчёту: факт / оценка)
+SCHEDULER_ENCODE_PIXEL_RATE: float = 60e6
+# Скорость перепаковки, × реального времени
+SCHEDULER_REMUX_SPEED: float = 100.0
+# Относительная стоимость пресетов x264 (medium = 1)
+SCHEDULER_PRESET_FACTORS: Dict[str, float] = {
+    "ultrafast": 0.15,
+    "superfast": 0.25,
+    "veryfast": 0.35,
+    "faster": 0.6,
+    "fast": 0.8,
+    "medium": 1.0,
+    "slow": 1.6,
+    "slower": 2.8,
+    "veryslow": 5.5,
+    "placebo": 15.0,
+}
+# Срок пакета (--deadline): пресеты x264 на выбор, от самого быстрого к самому медленному
+DEADLINE_PRESETS: List[str] = ["veryfast", "faster", "fast", "medium", "slow"]
+# Выученная скорость кодирования по пресетам и разрешениям (components/deadline.py)
+DEADLINE_SPEED_MODEL_FILE = CACHE_PATH / "speed_model.json"
+# Сколько файлов очереди выводится в списке перед обработкой (остальные — одной строкой)
+SCAN_PREVIEW_FILES: int = 20
+
+# Досрочная остановка: если прогноз итогового размера (по размеру .tmp и проценту прогресса)
+# превышает исходный в EARLY_ABORT_RATIO раз, ffmpeg останавливается и используется исходник (0 — выкл.)
+EARLY_ABORT_RATIO: float = 1.05
+# Минимальный прогресс (%), после которого прогнозу можно доверять
+EARLY_ABORT_MIN_PROGRESS: float = 15.0
+
+# Сегментное перекодирование (длинный файл делится по ключевым кадрам и кодируется параллельно)
+SEGMENT_ENCODING: bool = False
+# Минимальная длительность исходника (сек), начиная с которой файл делится на сегменты
+SEGMENT_MIN_DURATION: float = 600.0
+# Минимальная длина сегмента (сек)
+SEGMENT_MIN_LENGTH: float = 30.0
+# Потоков libx264 на один сегментный воркер
+SEGMENT_THREADS_PER_WORKER: int = 4
+# Сегментов на воркер (для выравнивания нагрузки между воркерами)
+SEGMENTS_PER_WORKER: int = 4
+
+# Журнал заданий (sqlite): состояние файлов между запусками, завершённые файлы не анализируются повторно
+JOURNAL_ENABLED: bool = True
+JOURNAL_FILE = CACHE_PATH / "jobs.sqlite"
+# В сегментном режиме длинные файлы (от SEGMENT_MIN_DURATION) делятся на сегменты и при одном воркере,
+# чтобы после сбоя или Ctrl+C кодирование продолжилось с последнего готового сегмента
+JOURNAL_RESUMABLE_ENCODING: bool = True
+# Файлов на одну транзакцию при постановке в журнал
+JOURNAL_QUEUE_BATCH: int = 256
+
+# Хранилище результатов, адресуемое содержимым (отпечаток исходника + параметры кодирования):
+# дубликаты исходников и повторные запуски получают копию готового файла вместо кодирования
+OUTPUT_STORE_ENABLED: bool = True
+OUTPUT_STORE_PATH = CACHE_PATH / "outputs"
+# Лимит суммарного размера результатов, байт (давно не использованные вытесняются)
+OUTPUT_STORE_MAX_BYTES: int = 20 * 1000**3
+# Отпечаток исходника: размер + контрольная сумма OUTPUT_STORE_SAMPLE_BLOCKS блоков по OUTPUT_STORE_BLOCK_SIZE байт
+OUTPUT_STORE_SAMPLE_BLOCKS: int = 16
+OUTPUT_STORE_BLOCK_SIZE: int = 64 * 1024
+
+# Несколько экземпляров программы на одних папках input/output (в т.ч. на разных компьютерах с общим
+# хранилищем): файл берётся в работу созданием отметки name.tmp.claim рядом с результатом,
+# файлы, захваченные другим экземпляром, пропускаются
+CLAIMS_ENABLED: bool = True
+# Отметка обновляется каждые CLAIM_TTL / 4 сек; не обновлявшаяся CLAIM_TTL сек считается оставленной
+# аварийно завершённым экземпляром — файл захватывается заново, его временные файлы удаляются
+CLAIM_TTL: float = 120.0
+
+# Режим наблюдения за папкой (--watch): файл берётся в работу, когда его размер
+# не менялся WATCH_SETTLE_TIME сек; без inotify папка опрашивается раз в WATCH_POLL_INTERVAL сек
+WATCH_SETTLE_TIME: float = 5.0
+WATCH_POLL_INTERVAL: float = 2.0
+WATCH_FORCE_POLLING: bool = False
+
+# Отчёт о запуске: метрики заданий в REPORTS_PATH (run-<время>.jsonl и .csv)
+REPORT_ENABLED: bool = True
+
+# Интерфейс: частота перерисовки панели заданий (раз/сек), не зависит от частоты событий прогресса
+RICH_REFRESH_PER_SECOND: float = 4.0
+# Ширина прогресс-бара в строке задания
+RICH_BAR_WIDTH: int = 16
+# Строк stderr ffmpeg, выводимых под панелью задания при ошибке
+RICH_STDERR_LINES: int = 5
+
 # FFmpeg - Аудио
 DEFAULT_AUDIO_CODEC: str = "aac"
 DEFAULT_AAC_BITRATE: int = 128_000
@@ -2,9 +2,12 @@
 
 import abc
 import inspect
-import queue
 import threading
-from typing import Any, Callable, Union
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import (Any, Callable, Hashable, Iterable, Literal, Optional,
+                    Union)
 
 from loguru import logger
 
@@ -14,25 +17,64 @@ from core.events import Event
 Message = Union[Command, Event]
 
 
+@dataclass(frozen=True)
+class EventPolicy:
+    """
+    Политика доставки событий одного типа
+    """
+
+    # Ключ слияния: недоставленное событие с тем же ключом заменяется новым
+    # (побеждает последнее значение, позиция в очереди сохраняется)
+    coalesce_key: Optional[Callable[[Event], Hashable]] = None
+    # Максимум недоставленных событий этого типа (0 — без ограничений)
+    maxsize: int = 0
+    # Поведение при переполнении: "block" — ждать освобождения места, "drop" — отбросить новое событие
+    overflow: Literal["block", "drop"] = "block"
+
+
+@dataclass
+class _Slot:
+    event: Event
+    key: Optional[Hashable]
+
+
 class AbstractMessageBus(abc.ABC):
-    event_handlers: dict[type[Event], list[Callable]] = {}
-    command_handlers: dict[type[Command], Callable] = {}
+    event_handlers: dict[type[Event], tuple[Callable, ...]]
+    command_handlers: dict[type[Command], Callable]
 
     def add_dependency(self, name: str, dep: Any) -> None: ...
     def update_dependencies(self, deps: dict[str, Any]) -> None: ...
     def subscribe_event(self, event: type[Event], callback: Callable) -> None: ...
     def subscribe_command(self, command: type[Command], callback: Callable) -> None: ...
     def publish(self, message: Message) -> Any | None: ...
+    def publish_many(self, messages: Iterable[Message]) -> list[Any | None]: ...
+    def set_event_policy(self, event: type[Event], policy: EventPolicy) -> None: ...
+    def drain(self, timeout: float | None = None) -> bool: ...
+    def close(self, timeout: float | None = None) -> None: ...
 
 
 class MessageBus(AbstractMessageBus):
-    event_handlers: dict[type[Event], list[Callable]] = {}
-    command_handlers: dict[type[Command], Callable] = {}
 
     def __init__(self):
-        self._event_queue = queue.Queue()
+        # Таблицы обработчиков принадлежат экземпляру шины.
+        # Кортежи обработчиков событий заменяются целиком при подписке,
+        # поэтому диспетчер читает их без блокировки.
+        self.event_handlers: dict[type[Event], tuple[Callable, ...]] = {}
+        self.command_handlers: dict[type[Command], Callable] = {}
         self.dependencies: dict[str, Any] = {}
-        threading.Thread(target=self._dispatcher, daemon=True).start()
+        # Очередь недоставленных событий и индексы для политик доставки
+        self._pending: deque[_Slot] = deque()
+        self._coalesce_index: dict[Hashable, _Slot] = {}
+        self._pending_by_type: dict[type[Event], int] = {}
+        self._policies: dict[type[Event], EventPolicy] = {}
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        # Счётчики: слитые и отброшенные события по типам
+        self.coalesced: dict[type[Event], int] = {}
+        self.dropped: dict[type[Event], int] = {}
+        self._thread = threading.Thread(target=self._dispatcher, daemon=True)
+        self._thread.start()
 
     # --- Публичный API (в логическом порядке использования) ---
 
@@ -53,10 +95,10 @@ class MessageBus(AbstractMessageBus):
     def subscribe_event(self, event: type[Event], callback: Callable):
         wrapped = self._wrap(callback)
         if event in self.event_handlers:
-            self.event_handlers[event].append(wrapped)
+            self.event_handlers[event] = (*self.event_handlers[event], wrapped)
         else:
             logger.debug("event={0} не найден. Добавляем в словарь событий.", event)
-            self.event_handlers[event] = [wrapped]
+            self.event_handlers[event] = (wrapped,)
         logger.trace(
             "event={0} += {1} len({2})={3}.",
             event,
@@ -76,6 +118,12 @@ class MessageBus(AbstractMessageBus):
         self.command_handlers[command] = wrapped
         logger.trace("command={0} += {1}.", command, _get_callback_info(callback))
 
+    def set_event_policy(self, event: type[Event], policy: EventPolicy) -> None:
+        """Назначает политику доставки событиям типа `event`."""
+        with self._cond:
+            self._policies[event] = policy
+        logger.trace("event={0} policy={1}.", event, policy)
+
     def publish(self, message: Message) -> Any | None:
         if isinstance(message, Event):
             self.handle_event(message)
@@ -85,8 +133,38 @@ class MessageBus(AbstractMessageBus):
         else:
             raise ValueError(f"{message} не Event или Command")
 
+    def publish_many(self, messages: Iterable[Message]) -> list[Any | None]:
+        """
+        Публикация пачки сообщений с сохранением порядка.
+        Подряд идущие события ставятся в очередь за один захват блокировки.
+        Возвращает результаты (None для событий).
+        """
+        results: list[Any | None] = []
+        batch: list[Event] = []
+        for message in messages:
+            if isinstance(message, Event):
+                batch.append(message)
+                results.append(None)
+                continue
+            if batch:
+                self.handle_events(batch)
+                batch = []
+            if isinstance(message, Command):
+                results.append(self.handle_command(message))
+            else:
+                raise ValueError(f"{message} не Event или Command")
+        if batch:
+            self.handle_events(batch)
+        return results
+
     def handle_event(self, event: Event) -> None:
-        self._event_queue.put(event)
+        with self._cond:
+            self._enqueue(event)
+
+    def handle_events(self, events: Iterable[Event]) -> None:
+        with self._cond:
+            for event in events:
+                self._enqueue(event)
 
     def handle_command(self, command: Command) -> Any | None:
         try:
@@ -96,48 +174,133 @@ class MessageBus(AbstractMessageBus):
             logger.exception(e)
             raise
 
+    def drain(self, timeout: float | None = None) -> bool:
+        """
+        Ждёт доставки всех опубликованных событий.
+        Возвращает False, если за timeout очередь не опустела.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("drain() нельзя вызывать из обработчика события")
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Доставляет оставшиеся события и останавливает диспетчер.
+        После закрытия публикация событий невозможна.
+        """
+        self.drain(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self.coalesced or self.dropped:
+            logger.debug(
+                "Шина закрыта: слито={0}, отброшено={1}",
+                {t.__qualname__: n for t, n in self.coalesced.items()},
+                {t.__qualname__: n for t, n in self.dropped.items()},
+            )
+
     # --- Внутренние методы (protected) ---
 
-    def _wrap(self, callback: Callable) -> Callable[[Message], None]:
-        sig = inspect.signature(callback)
+    def _wrap(self, callback: Callable) -> Callable[[Message], Any]:
+        return bind_handler(callback, self.dependencies)
 
-        # Запрещаем *args и **kwargs
-        for param in sig.parameters.values():
-            if param.kind in (
-                inspect.Parameter.VAR_POSITIONAL,
-                inspect.Parameter.VAR_KEYWORD,
-            ):
-                raise ValueError(
-                    f"Обработчик {callback} не должен использовать *args или **kwargs. "
-                    f"Найден параметр: {param.name} (kind={param.kind.name})"
+    def _enqueue(self, event: Event) -> None:
+        """
+        Постановка события в очередь с учётом политики (вызывается под блокировкой)
+        """
+        event_type = type(event)
+        if self._closed:
+            raise RuntimeError(f"Шина закрыта, событие {event} не доставлено")
+        policy = self._policies.get(event_type)
+        key = None
+        if policy and policy.coalesce_key:
+            key = (event_type, policy.coalesce_key(event))
+            slot = self._coalesce_index.get(key)
+            if slot is not None:
+                slot.event = event
+                self.coalesced[event_type] = self.coalesced.get(event_type, 0) + 1
+                return
+        if policy and policy.maxsize > 0:
+            if policy.overflow == "drop":
+                if self._pending_by_type.get(event_type, 0) >= policy.maxsize:
+                    self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+                    return
+            # Поток диспетчера не ждёт сам себя (иначе взаимоблокировка)
+            elif threading.current_thread() is not self._thread:
+                self._cond.wait_for(
+                    lambda: self._pending_by_type.get(event_type, 0) < policy.maxsize
+                    or self._closed
                 )
+                if self._closed:
+                    raise RuntimeError(f"Шина закрыта, событие {event} не доставлено")
+        slot = _Slot(event, key)
+        self._pending.append(slot)
+        if key is not None:
+            self._coalesce_index[key] = slot
+        self._pending_by_type[event_type] = self._pending_by_type.get(event_type, 0) + 1
+        self._cond.notify_all()
 
-        # Пропускаем первый параметр (event/command)
-        params = list(sig.parameters.items())
-        dep_names = [name for i, (name, param) in enumerate(params) if i > 0]
-        missing = [n for n in dep_names if n not in self.dependencies]
-        if missing:
-            raise LookupError(
-                f"Отсутствуют зависимости для обработчика {callback}: {missing}"
-            )
+    def _dispatcher(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                slot = self._pending.popleft()
+                if slot.key is not None:
+                    del self._coalesce_index[slot.key]
+                event = slot.event
+                self._pending_by_type[type(event)] -= 1
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                for h in self.event_handlers.get(type(event), ()):
+                    try:
+                        h(event)
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        logger.exception("event={0}. e={1}", event, e)
+                        continue
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
 
-        def _handler(message: Message) -> None:
-            deps = {n: self.dependencies[n] for n in dep_names}
-            return callback(message, **deps)
 
-        _handler.__qualname__ = getattr(callback, "__qualname__", str(callback))
-        _handler.__module__ = getattr(callback, "__module__", None)  # type: ignore
-        return _handler
+def bind_handler(callback: Callable, dependencies: dict[str, Any]) -> Callable[[Message], Any]:
+    """
+    Проверяет обработчик и связывает его с зависимостями один раз при подписке:
+    при вызове не строится словарь зависимостей и нет лишних обёрток.
+    Зависимости, изменённые после подписки, обработчику не передаются.
+    """
+    sig = inspect.signature(callback)
 
-    def _dispatcher(self):
-        while True:
-            event = self._event_queue.get()
-            for h in self.event_handlers.get(type(event), []):
-                try:
-                    h(event)
-                except (ValueError, TypeError) as e:
-                    logger.exception("event={0}. e={1}", event, e)
-                    continue
+    # Запрещаем *args и **kwargs
+    for param in sig.parameters.values():
+        if param.kind in (
+            inspect.Parameter.VAR_POSITIONAL,
+            inspect.Parameter.VAR_KEYWORD,
+        ):
+            raise ValueError(
+                f"Обработчик {callback} не должен использовать *args или **kwargs. "
+                f"Найден параметр: {param.name} (kind={param.kind.name})"
+            )
+
+    # Пропускаем первый параметр (event/command)
+    params = list(sig.parameters.items())
+    dep_names = [name for i, (name, param) in enumerate(params) if i > 0]
+    missing = [n for n in dep_names if n not in dependencies]
+    if missing:
+        raise LookupError(
+            f"Отсутствуют зависимости для обработчика {callback}: {missing}"
+        )
+
+    if not dep_names:
+        return callback
+    return partial(callback, **{n: dependencies[n] for n in dep_names})
 
 
 def _get_callback_info(callback: Callable[[Any], None]) -> str:
@@ -160,6 +323,3 @@ def _get_callback_info(callback: Callable[[Any], None]) -> str:
             return f"{module}.{name}{params}"
         return f"{name}{params}"
     return f"{callback}{params}"
-
-
-bus = MessageBus()
@@ -0,0 +1,462 @@
+"""
+Шина сообщений между процессами: сервисы в процессах-воркерах подключаются к MessageBus
+основного процесса.
+
+- Основной процесс: ProcessBusHost поверх MessageBus запускает воркеры и передаёт им
+  команды (по одной на вызов, результат — через Future) и события, на которые они подписаны.
+- Процесс-воркер: RemoteMessageBus (тот же интерфейс AbstractMessageBus), сервисы подписываются
+  на неё как на обычную шину. Опубликованные воркером события доставляются через шину
+  основного процесса (в том числе подписчикам в этом же воркере), поэтому порядок событий общий.
+- Транспорт: multiprocessing.Pipe, кадр — pickle кортежа. Сообщения (dataclass) передаются
+  компактно: тип — один раз на соединение, дальше — номер типа и значения полей.
+  Типы сообщений должны импортироваться в обоих процессах.
+"""
+
+import importlib
+import itertools
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import fields, is_dataclass
+from functools import lru_cache, partial
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Iterable, Optional
+
+from loguru import logger
+
+from core.commands import Command
+from core.events import Event
+from core.messagebus import (AbstractMessageBus, EventPolicy, Message,
+                             MessageBus)
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in fields(cls))
+
+
+@lru_cache(maxsize=None)
+def _resolve_type(name: str) -> type:
+    module, _, qualname = name.partition(":")
+    obj: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _type_name(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+class _Channel:
+    """
+    Соединение с другим процессом: отправка кадров под блокировкой и кодирование сообщений
+    (таблицы типов отдельно для отправки и приёма)
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+        self._send_lock = threading.Lock()
+        self._out_types: dict[type, int] = {}
+        self._in_types: dict[int, type] = {}
+
+    def send(self, kind: str, *args: Any) -> None:
+        with self._send_lock:
+            self.conn.send_bytes(pickle.dumps((kind, *args), _PROTOCOL))
+
+    def send_message(self, kind: str, message: Message, *args: Any) -> None:
+        """
+        Кадр с сообщением: (kind, *args, номер типа, значения полей);
+        новый тип предваряется кадром "type"
+        """
+        cls = type(message)
+        if not is_dataclass(cls):
+            raise TypeError(f"Сообщение {cls} не dataclass, передача между процессами невозможна")
+        values = tuple(getattr(message, name) for name in _field_names(cls))
+        with self._send_lock:
+            index = self._out_types.get(cls)
+            if index is None:
+                index = len(self._out_types)
+                self._out_types[cls] = index
+                self.conn.send_bytes(pickle.dumps(("type", index, _type_name(cls)), _PROTOCOL))
+            self.conn.send_bytes(pickle.dumps((kind, *args, index, values), _PROTOCOL))
+
+    def recv(self) -> tuple:
+        """
+        Следующий кадр (кадры "type" обрабатываются здесь же); EOFError — соединение закрыто
+        """
+        while True:
+            frame = pickle.loads(self.conn.recv_bytes())
+            if frame[0] != "type":
+                return frame
+            self._in_types[frame[1]] = _resolve_type(frame[2])
+
+    def decode(self, index: int, values: tuple) -> Message:
+        cls = self._in_types[index]
+        message = cls.__new__(cls)
+        message.__dict__.update(zip(_field_names(cls), values))
+        return message
+
+
+def _pack_error(exc: BaseException) -> BaseException:
+    """
+    Исключение для передачи в другой процесс (непередаваемое заменяется описанием)
+    """
+    try:
+        pickle.dumps(exc, _PROTOCOL)
+        return exc
+    except Exception:  # pylint: disable=broad-exception-caught
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+class _Calls:
+    """
+    Команды, отправленные в другой процесс и ожидающие результата
+    """
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self) -> tuple[int, Future]:
+        future: Future = Future()
+        with self._lock:
+            call_id = next(self._ids)
+            self._pending[call_id] = future
+        return call_id, future
+
+    def resolve(self, call_id: int, ok: bool, value: Any) -> None:
+        with self._lock:
+            future = self._pending.pop(call_id, None)
+        if future is None:
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def fail_all(self, exc: BaseException) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(exc)
+
+
+def _serve_call(
+    channel: _Channel, call_id: int, handler: Callable[[Message], Any], command: Command
+) -> None:
+    """
+    Выполнение команды из другого процесса и отправка результата
+    """
+    try:
+        result = handler(command)
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+        channel.send("result", call_id, False, _pack_error(e))
+        return
+    try:
+        channel.send("result", call_id, True, result)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        channel.send("result", call_id, False, _pack_error(e))
+
+
+# --- Основной процесс ---
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, channel: _Channel) -> None:
+        self.process = process
+        self.channel = channel
+        self.calls = _Calls()
+        self.ready = threading.Event()
+        self.alive = True
+        self.reader: Optional[threading.Thread] = None
+
+
+class ProcessBusHost:
+    """
+    Подключение процессов-воркеров к шине основного процесса.
+
+    - start_worker запускает процесс (spawn), в нём setup("модуль:функция") вызывается
+      с RemoteMessageBus и kwargs — так сервис создаётся в воркере.
+    - Команда, на которую подписан воркер, регистрируется на шине основного процесса:
+      publish(command) отправляет её наименее загруженному воркеру и ждёт результат;
+      submit(command) возвращает Future без ожидания.
+    - События, на которые подписан воркер, пересылаются ему из шины основного процесса;
+      события воркера публикуются в шину основного процесса.
+    - Если воркер завершился, ожидающие команды получают RuntimeError.
+    """
+
+    def __init__(self, bus: MessageBus, call_workers: int = 4) -> None:
+        self.bus = bus
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: list[_Worker] = []
+        # Тип команды → воркеры, которые её выполняют
+        self._servers: dict[type[Command], list[_Worker]] = {}
+        self._lock = threading.Lock()
+        # Команды воркеров к обработчикам основного процесса
+        self._calls_pool = ThreadPoolExecutor(call_workers, thread_name_prefix="process-bus")
+
+    def start_worker(
+        self,
+        setup: str,
+        kwargs: Optional[dict[str, Any]] = None,
+        log_level: str = "WARNING",
+        timeout: Optional[float] = 60.0,
+    ) -> int:
+        """
+        Запустить процесс-воркер и дождаться подписок его сервисов; возвращает pid
+        """
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, setup, kwargs or {}, log_level),
+            name=f"bus-worker-{len(self._workers) + 1}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, _Channel(parent_conn))
+        worker.reader = threading.Thread(
+            target=self._read, args=(worker,), name=f"{process.name}-reader", daemon=True
+        )
+        worker.reader.start()
+        with self._lock:
+            self._workers.append(worker)
+        if not worker.ready.wait(timeout) or not worker.alive:
+            raise RuntimeError(f"Процесс-воркер {process.name} не запустился ({setup})")
+        logger.debug("<Процесс-воркер>: {0}, pid {1}", setup, process.pid)
+        return process.pid
+
+    def submit(self, command: Command) -> Future:
+        """
+        Отправить команду воркеру (с наименьшим количеством выполняемых команд)
+        """
+        with self._lock:
+            servers = [w for w in self._servers.get(type(command), ()) if w.alive]
+            if not servers:
+                raise LookupError(f"Нет процесса-воркера для команды {type(command).__qualname__}")
+            worker = min(servers, key=lambda w: len(w.calls))
+            call_id, future = worker.calls.add()
+        try:
+            worker.channel.send_message("call", command, call_id)
+        except OSError as e:
+            worker.calls.resolve(call_id, False, RuntimeError(f"Процесс-воркер недоступен: {e}"))
+        return future
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Остановить воркеры: каждый доделывает принятые команды и отправляет оставшиеся события
+        """
+        for worker in self._workers:
+            if worker.alive:
+                try:
+                    worker.channel.send("close")
+                except OSError:
+                    pass
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                logger.warning("Процесс-воркер {0} не завершился, остановка", worker.process.name)
+                worker.process.terminate()
+                worker.process.join()
+            if worker.reader is not None:
+                worker.reader.join(timeout)
+        self._calls_pool.shutdown(wait=True)
+
+    def _call_remote(self, command: Command) -> Any:
+        return self.submit(command).result()
+
+    def _forward_event(self, worker: _Worker, event: Event) -> None:
+        if worker.alive:
+            try:
+                worker.channel.send_message("event", event)
+            except OSError:
+                pass
+
+    def _read(self, worker: _Worker) -> None:
+        """
+        Кадры от воркера (поток на воркер)
+        """
+        channel = worker.channel
+        try:
+            while True:
+                frame = channel.recv()
+                kind = frame[0]
+                if kind == "event":
+                    self.bus.publish(channel.decode(*frame[1:]))
+                elif kind == "result":
+                    worker.calls.resolve(*frame[1:])
+                elif kind == "call":
+                    call_id, command = frame[1], channel.decode(*frame[2:])
+                    self._calls_pool.submit(
+                        _serve_call, channel, call_id, self.bus.publish, command
+                    )
+                elif kind == "sub_event":
+                    self.bus.subscribe_event(
+                        _resolve_type(frame[1]), partial(self._forward_event, worker)
+                    )
+                elif kind == "sub_command":
+                    self._add_server(_resolve_type(frame[1]), worker)
+                elif kind == "ready":
+                    worker.ready.set()
+                elif kind == "closed":
+                    break
+        except (EOFError, OSError):
+            pass
+        finally:
+            worker.alive = False
+            worker.ready.set()
+            worker.calls.fail_all(
+                RuntimeError(f"Процесс-воркер {worker.process.name} завершился")
+            )
+            channel.conn.close()
+
+    def _add_server(self, command: type[Command], worker: _Worker) -> None:
+        with self._lock:
+            servers = self._servers.setdefault(command, [])
+            first = not servers
+            servers.append(worker)
+        if first:
+            self.bus.subscribe_command(command, self._call_remote)
+
+
+# --- Процесс-воркер ---
+
+
+class RemoteMessageBus(AbstractMessageBus):
+    """
+    Шина процесса-воркера, подключённая к ProcessBusHost.
+
+    - Обработчики событий и команд выполняются в этом процессе (локальная MessageBus).
+    - Публикуемые события отправляются в основной процесс через очередь отправки:
+      политики доставки (set_event_policy) действуют на неё, поэтому, пока канал занят,
+      события сливаются или отбрасываются так же, как в MessageBus.
+    - Команда без обработчика в воркере выполняется в основном процессе (ожидание результата).
+    """
+
+    def __init__(self, conn: Connection, call_workers: int = 8) -> None:
+        self._channel = _Channel(conn)
+        self._local = MessageBus()
+        self._outbox = MessageBus()
+        self._forwarded: set[type[Event]] = set()
+        self._calls = _Calls()
+        self._pool = ThreadPoolExecutor(call_workers, thread_name_prefix="remote-command")
+        self._closing = threading.Event()
+        self._reader = threading.Thread(target=self._read, name="remote-bus-reader", daemon=True)
+
+    @property
+    def event_handlers(self):
+        return self._local.event_handlers
+
+    @property
+    def command_handlers(self):
+        return self._local.command_handlers
+
+    def add_dependency(self, name: str, dep: Any) -> None:
+        self._local.add_dependency(name, dep)
+
+    def update_dependencies(self, deps: dict[str, Any]) -> None:
+        self._local.update_dependencies(deps)
+
+    def subscribe_event(self, event: type[Event], callback: Callable) -> None:
+        first = event not in self._local.event_handlers
+        self._local.subscribe_event(event, callback)
+        if first:
+            self._channel.send("sub_event", _type_name(event))
+
+    def subscribe_command(self, command: type[Command], callback: Callable) -> None:
+        self._local.subscribe_command(command, callback)
+        self._channel.send("sub_command", _type_name(command))
+
+    def set_event_policy(self, event: type[Event], policy: EventPolicy) -> None:
+        self._local.set_event_policy(event, policy)
+        self._outbox.set_event_policy(event, policy)
+
+    def publish(self, message: Message) -> Any | None:
+        if isinstance(message, Event):
+            event_type = type(message)
+            if event_type not in self._forwarded:
+                self._forwarded.add(event_type)
+                self._outbox.subscribe_event(event_type, self._send_event)
+            self._outbox.publish(message)
+            return None
+        if isinstance(message, Command):
+            if type(message) in self._local.command_handlers:
+                return self._local.publish(message)
+            call_id, future = self._calls.add()
+            self._channel.send_message("call", message, call_id)
+            return future.result()
+        raise ValueError(f"{message} не Event или Command")
+
+    def publish_many(self, messages: Iterable[Message]) -> list[Any | None]:
+        return [self.publish(m) for m in messages]
+
+    def drain(self, timeout: float | None = None) -> bool:
+        return self._outbox.drain(timeout) and self._local.drain(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        self._pool.shutdown(wait=True)
+        self._outbox.close(timeout)
+        self._local.close(timeout)
+
+    def serve(self) -> None:
+        """
+        Приём команд и событий до команды остановки из основного процесса
+        (Ctrl+C в воркере игнорируется: остановкой управляет основной процесс)
+        """
+        self._reader.start()
+        self._channel.send("ready")
+        while True:
+            try:
+                self._closing.wait()
+                break
+            except KeyboardInterrupt:
+                continue
+        self.close()
+        try:
+            self._channel.send("closed")
+        except OSError:
+            pass
+
+    def _send_event(self, event: Event) -> None:
+        self._channel.send_message("event", event)
+
+    def _read(self) -> None:
+        channel = self._channel
+        try:
+            while True:
+                frame = channel.recv()
+                kind = frame[0]
+                if kind == "event":
+                    self._local.publish(channel.decode(*frame[1:]))
+                elif kind == "call":
+                    call_id, command = frame[1], channel.decode(*frame[2:])
+                    self._pool.submit(_serve_call, channel, call_id, self._local.publish, command)
+                elif kind == "result":
+                    self._calls.resolve(*frame[1:])
+                elif kind == "close":
+                    break
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._calls.fail_all(RuntimeError("Основной процесс недоступен"))
+            self._closing.set()
+
+
+def _worker_main(conn: Connection, setup: str, kwargs: dict[str, Any], log_level: str) -> None:
+    """
+    Точка входа процесса-воркера: настройка логов, затем импорт и запуск сервиса
+    """
+    from components.loguru_settings import logger_settings
+
+    logger_settings(log_level)
+    bus = RemoteMessageBus(conn)
+    _resolve_type(setup)(bus, **kwargs)
+    bus.serve()
@@ -7,9 +7,88 @@ def main():
     logger_settings(args.log_level)
 
     # ---
-    from time import sleep
+    from components.claims import FileClaims
+    from components.job_journal import JobJournal
+    from components.output_store import OutputStore
+    from components.probe_cache import ProbeCache
+    from components.utils.proc import set_process_priority
+    from core.config import (CLAIM_TTL, CLAIMS_ENABLED, JOURNAL_ENABLED,
+                             JOURNAL_FILE, MODE, OUTPUT_STORE_BLOCK_SIZE,
+                             OUTPUT_STORE_ENABLED, OUTPUT_STORE_MAX_BYTES,
+                             OUTPUT_STORE_PATH, OUTPUT_STORE_SAMPLE_BLOCKS,
+                             PROBE_CACHE_ENABLED, PROBE_CACHE_FILE,
+                             PROBE_CACHE_HASH_BYTES, PROBE_CACHE_MAX_ENTRIES,
+                             PROCESS_CPU_AFFINITY, PROCESS_IO_IDLE,
+                             PROCESS_NICE, TRANSCODER_PROCESS_WORKERS,
+                             ModeType)
 
-    from core.config import MODE, ModeType
+    # До запуска потоков: настройки наследуются потоками и процессами ffmpeg
+    set_process_priority(
+        _arg_or(args.nice, PROCESS_NICE), PROCESS_IO_IDLE, PROCESS_CPU_AFFINITY
+    )
+
+    # Воркер распределённой обработки: только перекодирование заданий координатора
+    if args.worker:
+        run_worker(args)
+        return
+
+    probe_cache = (
+        ProbeCache(PROBE_CACHE_FILE, PROBE_CACHE_MAX_ENTRIES, PROBE_CACHE_HASH_BYTES)
+        if PROBE_CACHE_ENABLED and not args.no_probe_cache
+        else None
+    )
+    # Журнал заданий и хранилище результатов — только в многопоточном режиме
+    journal = (
+        JobJournal(JOURNAL_FILE)
+        if JOURNAL_ENABLED and not args.no_journal and not args.asyncio
+        else None
+    )
+    # Отметки захвата файлов: несколько экземпляров на одной папке input делят файлы между собой
+    claims = (
+        FileClaims(CLAIM_TTL)
+        if CLAIMS_ENABLED and not args.no_claims and not args.asyncio and not args.dry_run
+        else None
+    )
+    process_workers = _arg_or(args.process_workers, TRANSCODER_PROCESS_WORKERS)
+    # Хранилище результатов блокирует одинаковые задания внутри процесса —
+    # с процессами-воркерами и воркерами координатора не используется
+    store = (
+        OutputStore(
+            OUTPUT_STORE_PATH,
+            OUTPUT_STORE_MAX_BYTES,
+            OUTPUT_STORE_SAMPLE_BLOCKS,
+            OUTPUT_STORE_BLOCK_SIZE,
+        )
+        if OUTPUT_STORE_ENABLED
+        and not args.no_output_store
+        and not args.asyncio
+        and not args.dry_run
+        and not process_workers
+        and args.serve is None
+        else None
+    )
+
+    if args.asyncio:
+        import asyncio
+
+        asyncio.run(run_async(args, probe_cache))
+    else:
+        run_threaded(args, probe_cache, journal, store, process_workers, claims)
+
+    for resource in (probe_cache, journal, store, claims):
+        if resource is not None:
+            resource.close()
+
+    # Запрос подтверждения о закрытии приложения
+    if MODE == ModeType.PROD:
+        input("Нажмите Enter для выхода...")
+
+
+def run_threaded(args, probe_cache, journal=None, store=None, process_workers=0, claims=None):
+    from core.config import (ADAPTIVE_CONCURRENCY, CLUSTER_ADDRESS, CLUSTER_JOBS,
+                             EARLY_ABORT_MIN_PROGRESS, EARLY_ABORT_RATIO,
+                             SCHEDULER_ORDER, SEGMENT_ENCODING,
+                             TRANSCODER_JOBS)
     from core.messagebus import MessageBus
     from services.main.entry import MainService
     from services.rich.entry import RichService
@@ -17,18 +96,142 @@ def main():
 
     # Инициализация сервисов приложения
     bus = MessageBus()
+    start_report(bus, args)
 
-    services = [
-        RichService(bus),
-        TranscoderService(bus),
-        MainService(bus),
-    ]
+    transcoder_args = dict(
+        abort_ratio=_arg_or(args.abort_ratio, EARLY_ABORT_RATIO),
+        abort_min_progress=_arg_or(args.abort_min_progress, EARLY_ABORT_MIN_PROGRESS),
+    )
+    host = None
+    coordinator = None
+    jobs = _arg_or(args.jobs, TRANSCODER_JOBS)
+    if args.serve is not None:
+        from services.cluster.entry import CoordinatorService
+
+        # Задания выполняют воркеры (--worker), --jobs — ёмкость очереди выдачи
+        coordinator = CoordinatorService(bus, args.serve or CLUSTER_ADDRESS)
+        transcoder = coordinator
+        jobs = _arg_or(args.jobs, CLUSTER_JOBS)
+        _interrupt_coordinator(coordinator)
+    elif process_workers:
+        from core.process_bus import ProcessBusHost
+
+        # TranscoderService в каждом процессе-воркере, команды — наименее загруженному
+        host = ProcessBusHost(bus)
+        for _ in range(process_workers):
+            host.start_worker(
+                "services.transcoder.entry:TranscoderService", transcoder_args, args.log_level
+            )
+        transcoder = None
+    else:
+        transcoder = TranscoderService(bus, **transcoder_args, store=store)
+
+    try:
+        services = [
+            RichService(bus),
+            transcoder,
+            MainService(
+                bus,
+                jobs=jobs,
+                chunked=_arg_or(args.chunked, SEGMENT_ENCODING),
+                probe_cache=probe_cache,
+                dry_run=args.dry_run,
+                watch=args.watch,
+                journal=journal,
+                order=_arg_or(args.order, SCHEDULER_ORDER),
+                # Ресурсы координатора не ограничивают задания воркеров
+                adaptive=_arg_or(args.adaptive, ADAPTIVE_CONCURRENCY) and coordinator is None,
+                deadline=args.deadline,
+                claims=claims,
+            ),
+        ]
+    finally:
+        # Остановка воркеров (их события — в шину) до закрытия шины
+        if host is not None:
+            host.close()
+        if coordinator is not None:
+            coordinator.close()
+
+    # Доставка оставшихся событий (в т.ч. итоговых) до выхода
+    bus.close()
 
-    # Запрос подтверждения о закрытии приложения
-    if MODE == ModeType.PROD:
-        sleep(1)
-        input("Нажмите Enter для выхода...")
+
+def run_worker(args):
+    from core.config import (EARLY_ABORT_MIN_PROGRESS, EARLY_ABORT_RATIO,
+                             SEGMENT_ENCODING, TRANSCODER_JOBS)
+    from services.cluster.worker import ClusterWorker
+
+    ClusterWorker(
+        args.worker,
+        jobs=_arg_or(args.jobs, TRANSCODER_JOBS),
+        chunked=_arg_or(args.chunked, SEGMENT_ENCODING),
+        abort_ratio=_arg_or(args.abort_ratio, EARLY_ABORT_RATIO),
+        abort_min_progress=_arg_or(args.abort_min_progress, EARLY_ABORT_MIN_PROGRESS),
+    ).run()
+
+
+def _interrupt_coordinator(coordinator):
+    """
+    Ctrl+C на координаторе: снять с очереди задания, ещё не выданные воркерам
+    (иначе пайплайн ждал бы их выполнения), затем обычное прерывание
+    """
+    import signal
+
+    def _handler(signum, frame):
+        coordinator.interrupt()
+        signal.default_int_handler(signum, frame)
+
+    signal.signal(signal.SIGINT, _handler)
+
+
+async def run_async(args, probe_cache):
+    from core.async_messagebus import AsyncMessageBus
+    from core.config import (EARLY_ABORT_MIN_PROGRESS, EARLY_ABORT_RATIO,
+                             TRANSCODER_JOBS)
+    from services.main.async_entry import AsyncMainService
+    from services.rich.entry import RichService
+    from services.transcoder.async_entry import AsyncTranscoderService
+
+    # Инициализация сервисов приложения: один цикл событий для шины,
+    # анализа, перекодирования и интерфейса
+    bus = AsyncMessageBus()
+    await bus.start()
+    start_report(bus, args)
+
+    RichService(bus)
+    AsyncTranscoderService(
+        bus,
+        abort_ratio=_arg_or(args.abort_ratio, EARLY_ABORT_RATIO),
+        abort_min_progress=_arg_or(args.abort_min_progress, EARLY_ABORT_MIN_PROGRESS),
+    )
+    await AsyncMainService(
+        bus, jobs=_arg_or(args.jobs, TRANSCODER_JOBS), probe_cache=probe_cache
+    ).run()
+
+    await bus.close()
+
+
+def start_report(bus, args):
+    """
+    Отчёт о запуске подписывается на шину раньше остальных сервисов
+    """
+    from core.config import REPORT_ENABLED
+    from services.report.entry import ReportService
+
+    if REPORT_ENABLED and not args.no_report:
+        ReportService(bus)
+
+
+def _arg_or(value, default):
+    """
+    Значение из командной строки или настройка по умолчанию из core.config
+    """
+    return default if value is None else value
 
 
 if __name__ == "__main__":
+    # Процессы-воркеры в собранной программе (PyInstaller)
+    from multiprocessing import freeze_support
+
+    freeze_support()
     main()
@@ -0,0 +1,254 @@
+import json
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Optional
+
+from loguru import logger
+
+from core.config import (CLUSTER_ADDRESS, CLUSTER_HEARTBEAT_INTERVAL,
+                         CLUSTER_LEASE_TTL, CLUSTER_MAX_ATTEMPTS,
+                         CLUSTER_POLL_WAIT)
+from core.messagebus import AbstractMessageBus
+from services.transcoder.commands import OnTranscoderRun
+from services.transcoder.events import (OnTranscodingCompleted,
+                                        OnTranscodingProgressEvent)
+from services.transcoder.metrics import build_job_metrics
+
+from .leases import Job, LeaseQueue
+from .protocol import event_from_wire, from_wire, parse_address, to_wire
+
+
+class CoordinatorService:
+    """
+    Координатор распределённой обработки: вместо TranscoderService выполняет команду OnTranscoderRun
+    руками воркеров (services/cluster/worker.py), которые забирают задания по HTTP (services/cluster/protocol.py).
+
+    - Команда ставится в очередь аренды, обработчик ждёт итога от воркера —
+      поэтому MainService (планирование, журнал, итоги пакета) работает без изменений,
+      а --jobs ограничивает количество заданий, выданных воркерам или ожидающих выдачи.
+    - События заданий от воркеров (прогресс, сегменты, итог, метрики) публикуются в шину.
+    - Аренда не продлена за CLUSTER_LEASE_TTL сек — задание возвращается в очередь,
+      после CLUSTER_MAX_ATTEMPTS таких попыток завершается с ошибкой.
+    """
+
+    def __init__(
+        self,
+        bus: AbstractMessageBus,
+        address: str = CLUSTER_ADDRESS,
+        lease_ttl: float = CLUSTER_LEASE_TTL,
+        heartbeat_interval: float = CLUSTER_HEARTBEAT_INTERVAL,
+        max_attempts: int = CLUSTER_MAX_ATTEMPTS,
+        poll_wait: float = CLUSTER_POLL_WAIT,
+    ) -> None:
+        self.bus = bus
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_wait = poll_wait
+        self.queue = LeaseQueue(lease_ttl, max_attempts)
+        # Воркер → время последнего запроса; воркеры, которым сообщено о завершении пакета
+        self._workers: dict[str, float] = {}
+        self._told_done: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._interrupted = False
+
+        self.server = ThreadingHTTPServer(parse_address(address), _Handler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self._threads = [
+            threading.Thread(target=self.server.serve_forever, name="cluster-http", daemon=True),
+            threading.Thread(target=self._expire_loop, name="cluster-leases", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        host, port = self.server.server_address[:2]
+        logger.info("<Координатор>: http://{0}:{1}, ожидание воркеров", host, port)
+
+        self.bus.subscribe_command(OnTranscoderRun, self.run)
+
+    def run(self, cmd: OnTranscoderRun) -> OnTranscodingCompleted:
+        """
+        Задание выполняется воркером; возвращает его итог (события итога уже опубликованы)
+        """
+        return self.queue.put(cmd).result()
+
+    def interrupt(self) -> None:
+        """
+        Ctrl+C: задания, ещё не выданные воркерам, не запускаются (выданные доделываются);
+        повторно — итоги выданных заданий тоже не ждутся
+        """
+        jobs = self.queue.cancel_waiting()
+        reason = "не выдано воркеру"
+        if self._interrupted:
+            jobs += self.queue.cancel_leased()
+            reason = "итог воркера не дождались"
+        self._interrupted = True
+        for job in jobs:
+            job.future.set_exception(RuntimeError(f"{job.cmd.input_file.name}: {reason}, остановка"))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Пакет завершён: воркерам, обратившимся в течение срока аренды, сообщается о завершении
+        (ожидание до timeout сек, по умолчанию — два интервала продления), затем сервер останавливается
+        """
+        self.queue.close()
+        waited_until = monotonic() + (self.heartbeat_interval * 2 if timeout is None else timeout)
+        while monotonic() < waited_until and self._active_workers() - self._told_done:
+            self._stop.wait(0.1)
+        self._stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        for t in self._threads:
+            t.join()
+
+    # --- Запросы воркеров (потоки HTTP-сервера) ---
+
+    def on_lease(self, body: dict) -> tuple[HTTPStatus, Optional[dict]]:
+        worker = str(body.get("worker", "?"))
+        self._seen(worker)
+        lease = self.queue.lease(worker, self.poll_wait)
+        if lease is None:
+            if self.queue.closed:
+                with self._lock:
+                    self._told_done.add(worker)
+                return HTTPStatus.GONE, None
+            return HTTPStatus.NO_CONTENT, None
+        logger.debug("{0}: выдано воркеру {1}", lease.job.cmd.input_file.name, worker)
+        return HTTPStatus.OK, {
+            "lease": lease.lease_id,
+            "ttl": self.queue.ttl,
+            "heartbeat": self.heartbeat_interval,
+            "job": to_wire(lease.job.cmd),
+        }
+
+    def on_heartbeat(self, body: dict) -> tuple[HTTPStatus, Optional[dict]]:
+        self._seen(str(body.get("worker", "?")))
+        lost = []
+        for item in body.get("leases", []):
+            lease_id = int(item["lease"])
+            # События потерянной аренды не публикуются: задание уже у другого воркера
+            if not self.queue.renew(lease_id):
+                lost.append(lease_id)
+                continue
+            self._publish_events(item.get("events", []))
+        return HTTPStatus.OK, {"lost": lost}
+
+    def on_complete(self, body: dict) -> tuple[HTTPStatus, Optional[dict]]:
+        job = self.queue.complete(int(body["lease"]))
+        if job is None:
+            return HTTPStatus.CONFLICT, None
+        self._publish_events(body.get("events", []))
+        if "error" in body:
+            job.future.set_exception(RuntimeError(str(body["error"])))
+        else:
+            job.future.set_result(from_wire(OnTranscodingCompleted, body["result"]))
+        return HTTPStatus.OK, {}
+
+    def on_release(self, body: dict) -> tuple[HTTPStatus, Optional[dict]]:
+        if not self.queue.release(int(body["lease"])):
+            return HTTPStatus.CONFLICT, None
+        return HTTPStatus.OK, {}
+
+    def on_status(self) -> tuple[HTTPStatus, Optional[dict]]:
+        now = monotonic()
+        with self._lock:
+            seen = {w: round(now - t, 1) for w, t in self._workers.items()}
+        return HTTPStatus.OK, {**self.queue.stats(), "seen": seen, "closed": self.queue.closed}
+
+    def _publish_events(self, events: list[dict]) -> None:
+        self.bus.publish_many([event_from_wire(e) for e in events])
+
+    def _seen(self, worker: str) -> None:
+        with self._lock:
+            self._workers[worker] = monotonic()
+
+    def _active_workers(self) -> set[str]:
+        since = monotonic() - self.queue.ttl
+        with self._lock:
+            return {w for w, t in self._workers.items() if t >= since}
+
+    def _expire_loop(self) -> None:
+        while not self._stop.wait(min(1.0, self.queue.ttl / 4)):
+            expired, exhausted = self.queue.expire()
+            for lease in expired:
+                cmd = lease.job.cmd
+                if lease.job in exhausted:
+                    continue
+                logger.warning(
+                    "{0}: воркер {1} не продлил аренду, задание возвращено в очередь",
+                    cmd.input_file.name,
+                    lease.worker,
+                )
+                # Прогресс задания начнётся заново у другого воркера
+                self.bus.publish(OnTranscodingProgressEvent(0.0, cmd.job_id))
+            for job in exhausted:
+                self._fail(job)
+
+    def _fail(self, job: Job) -> None:
+        """
+        Попытки закончились: итог с ошибкой публикуется, как его опубликовал бы TranscoderService
+        """
+        cmd = job.cmd
+        try:
+            src_size = cmd.input_file.stat().st_size
+        except OSError:
+            src_size = 0
+        result = OnTranscodingCompleted(
+            False,
+            f"Задание не завершено воркерами за {job.attempts} попыток",
+            cmd.job_id,
+            src_size,
+            mode=cmd.output_media_params.mode,
+            src_duration=cmd.output_media_params.duration,
+        )
+        self.bus.publish(result)
+        self.bus.publish(build_job_metrics(cmd, result, monotonic() - job.first_leased, 0.0))
+        job.future.set_result(result)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Разбор запроса и ответ в JSON; обработка — методами CoordinatorService
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        coordinator: CoordinatorService = self.server.coordinator
+        routes = {
+            "/lease": coordinator.on_lease,
+            "/heartbeat": coordinator.on_heartbeat,
+            "/complete": coordinator.on_complete,
+            "/release": coordinator.on_release,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._reply(HTTPStatus.NOT_FOUND, None)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            status, data = route(body)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Неверный запрос воркера {0}: {1}", self.path, e)
+            status, data = HTTPStatus.BAD_REQUEST, None
+        self._reply(status, data)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        if self.path == "/status":
+            self._reply(*self.server.coordinator.on_status())
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, None)
+
+    def _reply(self, status: HTTPStatus, data: Optional[dict]) -> None:
+        payload = b"" if data is None else json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        if payload:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        logger.trace("HTTP {0}: {1}", self.address_string(), format % args)
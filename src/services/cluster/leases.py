@@ -0,0 +1,161 @@
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Callable, Optional
+
+from services.transcoder.commands import OnTranscoderRun
+
+
+@dataclass(eq=False)
+class Job:
+    cmd: OnTranscoderRun
+    # Итог задания (OnTranscodingCompleted) для ожидающего обработчика команды
+    future: Future = field(default_factory=Future)
+    # Выдач воркерам, аренда которых истекла
+    attempts: int = 0
+    # Время первой выдачи (monotonic), 0 — ещё не выдавалось
+    first_leased: float = 0.0
+
+
+@dataclass
+class Lease:
+    lease_id: int
+    job: Job
+    worker: str
+    expires: float
+
+
+class LeaseQueue:
+    """
+    Очередь заданий координатора с арендой.
+
+    - Воркер берёт задание в аренду на ttl сек и продлевает её (renew); аренда, не продлённая
+      вовремя (воркер завершился или недоступен), истекает (expire), задание возвращается
+      в начало очереди. После max_attempts истёкших аренд задание больше не выдаётся.
+    - Итог принимается только по действующей аренде: после истечения результат прежнего
+      воркера отклоняется, даже если он всё же закончил задание.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_attempts: int,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_attempts = max(1, max_attempts)
+        self._clock = clock
+        self._waiting: deque[Job] = deque()
+        self._leases: dict[int, Lease] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def put(self, cmd: OnTranscoderRun) -> Future:
+        job = Job(cmd)
+        with self._cond:
+            self._waiting.append(job)
+            self._cond.notify()
+        return job.future
+
+    def lease(self, worker: str, timeout: float) -> Optional[Lease]:
+        """
+        Задание в аренду; ждёт до timeout сек, None — заданий нет или очередь закрыта
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._waiting or self.closed, timeout)
+            if self.closed or not self._waiting:
+                return None
+            job = self._waiting.popleft()
+            now = self._clock()
+            job.first_leased = job.first_leased or now
+            lease = Lease(next(self._ids), job, worker, now + self.ttl)
+            self._leases[lease.lease_id] = lease
+            return lease
+
+    def renew(self, lease_id: int) -> bool:
+        """
+        Продлить аренду; False — аренда истекла (задание передано в очередь заново)
+        """
+        with self._cond:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                return False
+            lease.expires = self._clock() + self.ttl
+            return True
+
+    def complete(self, lease_id: int) -> Optional[Job]:
+        """
+        Завершить аренду: задание для передачи итога; None — аренда уже истекла
+        """
+        with self._cond:
+            lease = self._leases.pop(lease_id, None)
+        return lease.job if lease else None
+
+    def release(self, lease_id: int) -> bool:
+        """
+        Воркер отказался от задания: в начало очереди, попытка не засчитывается
+        """
+        with self._cond:
+            lease = self._leases.pop(lease_id, None)
+            if lease is None:
+                return False
+            self._waiting.appendleft(lease.job)
+            self._cond.notify()
+            return True
+
+    def expire(self) -> tuple[list[Lease], list[Job]]:
+        """
+        Истёкшие аренды и задания, у которых закончились попытки
+        (остальные задания истёкших аренд возвращены в начало очереди)
+        """
+        now = self._clock()
+        expired: list[Lease] = []
+        exhausted: list[Job] = []
+        with self._cond:
+            for lease_id, lease in list(self._leases.items()):
+                if lease.expires > now:
+                    continue
+                del self._leases[lease_id]
+                expired.append(lease)
+                lease.job.attempts += 1
+                if lease.job.attempts >= self.max_attempts:
+                    exhausted.append(lease.job)
+                else:
+                    self._waiting.appendleft(lease.job)
+                    self._cond.notify()
+        return expired, exhausted
+
+    def cancel_waiting(self) -> list[Job]:
+        """
+        Снять с очереди задания, ещё не выданные воркерам
+        """
+        with self._cond:
+            jobs, self._waiting = list(self._waiting), deque()
+        return jobs
+
+    def cancel_leased(self) -> list[Job]:
+        """
+        Снять все аренды: итоги воркеров по ним больше не принимаются
+        """
+        with self._cond:
+            leases, self._leases = list(self._leases.values()), {}
+        return [lease.job for lease in leases]
+
+    def close(self) -> None:
+        """
+        Новые аренды не выдаются, ожидающие запросы аренды завершаются
+        """
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            workers: dict[str, int] = {}
+            for lease in self._leases.values():
+                workers[lease.worker] = workers.get(lease.worker, 0) + 1
+            return {"waiting": len(self._waiting), "leased": len(self._leases), "workers": workers}
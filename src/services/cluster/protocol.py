@@ -0,0 +1,132 @@
+"""
+Протокол координатора и воркеров: JSON поверх HTTP (POST, тело и ответ — JSON-объекты).
+
+- POST /lease {"worker"} — задание в аренду: 200 {"lease", "ttl", "heartbeat", "job"};
+  204 — заданий нет (после ожидания до CLUSTER_POLL_WAIT сек); 410 — пакет завершён, воркеру выйти.
+- POST /heartbeat {"worker", "leases": [{"lease", "events"}]} — продление аренды и события заданий;
+  200 {"lost": [номера аренд, которые истекли и переданы другим воркерам]}.
+- POST /complete {"lease", "events", "result" | "error"} — итог задания; 409 — аренда потеряна.
+- POST /release {"lease"} — вернуть задание в очередь (воркер останавливается).
+- GET /status — очередь, аренды и воркеры.
+
+Сообщения (dataclass) передаются словарём полей, пути — строками; события — {"type", "data"},
+принимаются только типы из EVENT_TYPES.
+"""
+
+import json
+import urllib.error
+import urllib.request
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import Any, Optional, Union, get_args, get_origin, get_type_hints
+
+from core.events import Event
+from services.transcoder.events import (OnJobMetrics, OnSegmentCompleted,
+                                        OnTranscodingCompleted,
+                                        OnTranscodingProgressEvent)
+
+# События задания, которые воркер пересылает координатору
+EVENT_TYPES: dict[str, type[Event]] = {
+    cls.__name__: cls
+    for cls in (
+        OnTranscodingProgressEvent,
+        OnSegmentCompleted,
+        OnTranscodingCompleted,
+        OnJobMetrics,
+    )
+}
+
+
+def parse_address(address: str, default_port: int = 0) -> tuple[str, int]:
+    """
+    "host:port", "http://host:port" или ":port" (все интерфейсы) → (host, port)
+    """
+    address = address.strip().removeprefix("http://").rstrip("/")
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        host, port = address, ""
+    try:
+        return host or "0.0.0.0", int(port) if port else default_port
+    except ValueError as exc:
+        raise ValueError(f"Ожидается адрес вида host:port: {address}") from exc
+
+
+def to_wire(value: Any) -> Any:
+    """
+    Сообщение (dataclass) и вложенные значения → значения JSON
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return {f.name: to_wire(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, PurePath):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [to_wire(v) for v in value]
+    return value
+
+
+def from_wire(cls: type, data: dict) -> Any:
+    """
+    Сообщение из словаря полей по аннотациям dataclass (неизвестные поля пропускаются)
+    """
+    hints = _type_hints(cls)
+    return cls(**{name: _decode(hints[name], v) for name, v in data.items() if name in hints})
+
+
+def event_to_wire(event: Event) -> dict:
+    return {"type": type(event).__name__, "data": to_wire(event)}
+
+
+def event_from_wire(data: dict) -> Event:
+    cls = EVENT_TYPES.get(data.get("type", ""))
+    if cls is None:
+        raise ValueError(f"Неизвестный тип события: {data.get('type')}")
+    return from_wire(cls, data["data"])
+
+
+@lru_cache(maxsize=None)
+def _type_hints(cls: type) -> dict[str, Any]:
+    return get_type_hints(cls)
+
+
+def _decode(hint: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if get_origin(hint) is Union:
+        hint = next(a for a in get_args(hint) if a is not type(None))
+    if hint is Path:
+        return Path(value)
+    if is_dataclass(hint):
+        return from_wire(hint, value)
+    if hint is float:
+        # JSON не различает 1 и 1.0
+        return float(value)
+    return value
+
+
+class ClusterClient:
+    """
+    HTTP-клиент воркера: запрос → (код ответа, JSON-объект или None).
+    Ошибки соединения — OSError (urllib.error.URLError — его подкласс)
+    """
+
+    def __init__(self, address: str, timeout: float) -> None:
+        host, port = parse_address(address)
+        self.url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def post(self, path: str, body: dict) -> tuple[int, Optional[dict]]:
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                raw = response.read()
+                return response.status, json.loads(raw) if raw else None
+        except urllib.error.HTTPError as e:
+            # 4xx/5xx — ответ координатора, а не ошибка соединения
+            with e:
+                return e.code, None
@@ -0,0 +1,264 @@
+import os
+import socket
+import threading
+from dataclasses import replace
+from http import HTTPStatus
+from pathlib import Path
+from time import monotonic
+from typing import Optional
+
+from loguru import logger
+
+from components.concurrency import resolve_concurrency, resolve_segment_workers
+from core.config import (CLUSTER_HEARTBEAT_INTERVAL, CLUSTER_POLL_WAIT,
+                         CLUSTER_RETRY_TIME, EARLY_ABORT_MIN_PROGRESS,
+                         EARLY_ABORT_RATIO, OUTPUT_PATH, SEGMENT_ENCODING,
+                         SEGMENT_MIN_DURATION, SEGMENT_THREADS_PER_WORKER,
+                         TRANSCODER_AUTO_THREADS_PER_JOB, TRANSCODER_JOBS)
+from core.events import Event
+from core.messagebus import MessageBus
+from services.transcoder.commands import OnTranscoderRun
+from services.transcoder.entry import TranscoderService
+from services.transcoder.events import (OnTranscodingCompleted,
+                                        OnTranscodingProgressEvent)
+from services.transcoder.metrics import job_outcome
+
+from .protocol import (EVENT_TYPES, ClusterClient, event_to_wire, from_wire,
+                       to_wire)
+
+
+class _ActiveLease:
+    """
+    Выполняемое задание воркера и его события, ещё не отправленные координатору
+    """
+
+    __slots__ = ("lease_id", "cmd", "events", "lost")
+
+    def __init__(self, lease_id: int, cmd: OnTranscoderRun) -> None:
+        self.lease_id = lease_id
+        self.cmd = cmd
+        self.events: list[Event] = []
+        self.lost = False
+
+    def add(self, event: Event) -> None:
+        # Подряд идущие события прогресса сливаются: важно только последнее значение
+        if (
+            isinstance(event, OnTranscodingProgressEvent)
+            and self.events
+            and isinstance(self.events[-1], OnTranscodingProgressEvent)
+        ):
+            self.events[-1] = event
+        else:
+            self.events.append(event)
+
+    def take_events(self) -> list[dict]:
+        events, self.events = self.events, []
+        return [event_to_wire(e) for e in events]
+
+
+class ClusterWorker:
+    """
+    Воркер распределённой обработки: берёт задания у координатора (--serve) и выполняет их
+    TranscoderService на своей шине.
+
+    - jobs слотов, каждый в своём потоке: аренда задания → кодирование → итог с событиями.
+    - Поток продления раз в интервал, заданный координатором, продлевает аренды выполняемых
+      заданий и отправляет накопленные события (прогресс — последнее значение).
+    - Потоки ffmpeg и сегменты рассчитываются по ядрам воркера, а не координатора.
+    - Аренда потеряна (координатор передал задание другому) — ffmpeg останавливается,
+      итоговый файл не создаётся, итог не отправляется.
+    - Координатор сообщил о завершении пакета или недоступен дольше retry_time сек — выход.
+    - Ctrl+C: новые задания не берутся, прерванные возвращаются координатору.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        jobs: int = TRANSCODER_JOBS,
+        chunked: bool = SEGMENT_ENCODING,
+        abort_ratio: float = EARLY_ABORT_RATIO,
+        abort_min_progress: float = EARLY_ABORT_MIN_PROGRESS,
+        output_dir: Path = OUTPUT_PATH,
+        retry_time: float = CLUSTER_RETRY_TIME,
+        name: Optional[str] = None,
+    ) -> None:
+        # Ожидание аренды на координаторе + запас на ответ
+        self.client = ClusterClient(address, CLUSTER_POLL_WAIT + 30.0)
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.retry_time = retry_time
+        self.heartbeat_interval = CLUSTER_HEARTBEAT_INTERVAL
+        self.jobs, self.threads = resolve_concurrency(jobs, TRANSCODER_AUTO_THREADS_PER_JOB)
+        self.segment_workers = (
+            resolve_segment_workers(self.threads, SEGMENT_THREADS_PER_WORKER) if chunked else 0
+        )
+        self.bus = MessageBus()
+        self.transcoder = TranscoderService(self.bus, abort_ratio, abort_min_progress, output_dir)
+        for event in EVENT_TYPES.values():
+            self.bus.subscribe_event(event, self.on_event)
+        # job_id → выполняемое задание
+        self._leases: dict[int, _ActiveLease] = {}
+        self._lock = threading.Lock()
+        # Отправка событий по порядку: продление и итог задания не обгоняют друг друга
+        self._send_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._done = threading.Event()
+        self._slots_running = 0
+        self._slots_done = threading.Event()
+
+    def run(self) -> None:
+        logger.info(
+            "<Воркер> {0}: координатор {1}, заданий: {2}, потоков на задание: {3}",
+            self.name,
+            self.client.url,
+            self.jobs,
+            self.threads,
+        )
+        # Потоки-демоны: повторный Ctrl+C завершает воркер, не дожидаясь заданий
+        slots = [
+            threading.Thread(target=self._slot, name=f"cluster-slot-{i + 1}", daemon=True)
+            for i in range(self.jobs)
+        ]
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="cluster-heartbeat", daemon=True)
+        self._slots_running = len(slots)
+        for t in [*slots, heartbeat]:
+            t.start()
+        # Ожидание через Event: Thread.join, прерванный Ctrl+C, может счесть поток завершённым
+        try:
+            while not self._slots_done.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            logger.warning("Остановка воркера: прерванные задания возвращаются координатору")
+            self._stopping.set()
+            self._slots_done.wait()
+        finally:
+            self._done.set()
+            heartbeat.join()
+            self.bus.close()
+
+    def localize(self, cmd: OnTranscoderRun) -> OnTranscoderRun:
+        """
+        Потоки ffmpeg и количество сегментов — по ресурсам этого воркера
+        """
+        params = cmd.output_media_params
+        segments = cmd.segments
+        if (
+            self.segment_workers > 1
+            and params.mode == "encode"
+            and params.duration >= SEGMENT_MIN_DURATION
+        ):
+            segments = self.segment_workers
+        elif segments:
+            segments = max(1, self.segment_workers)
+        return replace(cmd, threads=self.threads, segments=segments)
+
+    def on_event(self, e: Event) -> None:
+        with self._lock:
+            lease = self._leases.get(e.job_id)
+            if lease is not None:
+                lease.add(e)
+
+    def _slot(self) -> None:
+        try:
+            self._lease_loop()
+        finally:
+            with self._lock:
+                self._slots_running -= 1
+                if not self._slots_running:
+                    self._slots_done.set()
+
+    def _lease_loop(self) -> None:
+        while not (self._done.is_set() or self._stopping.is_set()):
+            status, data = self._request("/lease", {"worker": self.name})
+            if status == HTTPStatus.GONE and not self._done.is_set():
+                logger.info("<Воркер> {0}: пакет завершён", self.name)
+                self._done.set()
+            if status != HTTPStatus.OK:
+                continue
+            self.heartbeat_interval = float(data["heartbeat"])
+            lease = _ActiveLease(int(data["lease"]), from_wire(OnTranscoderRun, data["job"]))
+            if self._stopping.is_set():
+                self._request("/release", {"lease": lease.lease_id})
+                break
+            self._execute(lease)
+
+    def _execute(self, lease: _ActiveLease) -> None:
+        cmd = lease.cmd = self.localize(lease.cmd)
+        with self._lock:
+            self._leases[cmd.job_id] = lease
+        result: Optional[OnTranscodingCompleted] = None
+        error = ""
+        try:
+            result = self.bus.publish(cmd)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = str(e) or type(e).__name__
+
+        # События задания (итог и метрики публикуются перед возвратом) — в очередь отправки
+        self.bus.drain()
+        with self._lock:
+            self._leases.pop(cmd.job_id, None)
+
+        with self._send_lock:
+            if lease.lost:
+                logger.warning("{0}: аренда потеряна, итог не отправлен", cmd.input_file.name)
+                return
+            # Ffmpeg прерван вместе с воркером — задание выполнит другой воркер
+            if self._stopping.is_set() and (result is None or job_outcome(result) == "failed"):
+                self._request("/release", {"lease": lease.lease_id})
+                return
+            body: dict = {"lease": lease.lease_id, "events": lease.take_events()}
+            if result is None:
+                body["error"] = error
+            else:
+                body["result"] = to_wire(result)
+            status, _ = self._request("/complete", body)
+        if status == HTTPStatus.CONFLICT:
+            logger.warning("{0}: аренда потеряна, итог не принят", cmd.input_file.name)
+        elif result is not None:
+            logger.info("{0}: {1}", cmd.input_file.name, result.msg)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._done.wait(self.heartbeat_interval):
+            with self._send_lock:
+                with self._lock:
+                    leases = {lease.lease_id: lease for lease in self._leases.values()}
+                    batch = [
+                        {"lease": lease_id, "events": lease.take_events()}
+                        for lease_id, lease in leases.items()
+                    ]
+                if not batch:
+                    continue
+                status, data = self._request("/heartbeat", {"worker": self.name, "leases": batch})
+                if status != HTTPStatus.OK:
+                    continue
+                for lease_id in data.get("lost", []):
+                    lease = leases.get(lease_id)
+                    if lease is not None and not lease.lost:
+                        lease.lost = True
+                        # Иначе ffmpeg продолжит писать в те же временный и итоговый файлы,
+                        # что и воркер, получивший задание
+                        self.transcoder.cancel(lease.cmd.job_id)
+                        logger.warning(
+                            "{0}: аренда истекла, задание передано другому воркеру",
+                            lease.cmd.input_file.name,
+                        )
+
+    def _request(self, path: str, body: dict) -> tuple[Optional[int], Optional[dict]]:
+        """
+        Запрос к координатору с повторами при ошибке соединения;
+        (None, None) — координатор недоступен дольше retry_time сек (воркер завершается)
+        """
+        failed_since: Optional[float] = None
+        while True:
+            try:
+                return self.client.post(path, body)
+            except OSError as e:
+                now = monotonic()
+                failed_since = failed_since or now
+                if now - failed_since >= self.retry_time:
+                    if not self._done.is_set():
+                        logger.error("Координатор {0} недоступен: {1}", self.client.url, e)
+                    self._done.set()
+                    return None, None
+                logger.debug("Координатор {0} недоступен, повтор: {1}", self.client.url, e)
+                if self._done.wait(1.0):
+                    return None, None
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import asdict
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+
+from loguru import logger
+
+from components.app_init import app_init
+from components.build_media_params import build_media_params
+from components.concurrency import resolve_concurrency
+from components.get_media_info import get_media_info
+from components.probe_cache import ProbeCache
+from components.scanner import scan_outputs
+from core.async_messagebus import AsyncMessageBus
+from core.config import (INPUT_PATH, OUTPUT_PATH, PIPELINE_PROBE_WORKERS,
+                         SCAN_PREVIEW_FILES, TRANSCODER_AUTO_THREADS_PER_JOB,
+                         TRANSCODER_JOBS, VIDEO_EXTS)
+from services.transcoder.commands import OnTranscoderRun
+from services.transcoder.events import OnTranscodingCompleted
+
+from .entry import build_batch_summary, scan_input
+from .events import (OnAppException, OnFileDataProcessed, OnGetFileToTranscode,
+                     OnMsgNoFilesToTranscode)
+
+
+class AsyncMainService:
+    """
+    Координатор пайплайна для asyncio: каждый файл — корутина
+    (анализ в пуле потоков → расчёт параметров → перекодирование).
+    Одновременность анализа и кодирования ограничивается семафорами,
+    поэтому анализ всех файлов идёт с опережением кодирования.
+    """
+
+    def __init__(
+        self,
+        bus: AsyncMessageBus,
+        jobs: int = TRANSCODER_JOBS,
+        probe_cache: Optional[ProbeCache] = None,
+    ) -> None:
+        self.bus = bus
+        self.probe_cache = probe_cache
+        self.jobs, self.threads = resolve_concurrency(
+            jobs, TRANSCODER_AUTO_THREADS_PER_JOB
+        )
+        logger.debug("<Заданий>: {0}, <потоков на задание>: {1}", self.jobs, self.threads)
+
+    async def run(self) -> None:
+        app_init()
+        await self.run_pipeline()
+
+    async def run_pipeline(self) -> None:
+        done = scan_outputs(OUTPUT_PATH)
+        files = list(scan_input(VIDEO_EXTS, INPUT_PATH))
+        todo = [f for f in files if output_rel(f).as_posix() not in done]
+
+        if not todo:
+            self.bus.publish(
+                OnMsgNoFilesToTranscode("Нет файлов для конвертации", "yellow")
+            )
+            return
+
+        self.bus.publish(
+            OnGetFileToTranscode(
+                [output_rel(f) for f in todo[:SCAN_PREVIEW_FILES]],
+                len(todo),
+                len(files) - len(todo),
+            )
+        )
+
+        started = perf_counter()
+        probe_slots = asyncio.Semaphore(PIPELINE_PROBE_WORKERS)
+        encode_slots = asyncio.Semaphore(self.jobs)
+        outcomes = await asyncio.gather(
+            *(
+                self.run_job(job_id, input_file, probe_slots, encode_slots)
+                for job_id, input_file in enumerate(todo, start=1)
+            )
+        )
+        results = [r for r in outcomes if r is not None]
+
+        self.bus.publish(
+            build_batch_summary(
+                results, len(todo), perf_counter() - started, self.jobs, self.probe_cache
+            )
+        )
+
+    async def run_job(
+        self,
+        job_id: int,
+        input_file: Path,
+        probe_slots: asyncio.Semaphore,
+        encode_slots: asyncio.Semaphore,
+    ) -> Optional[OnTranscodingCompleted]:
+        try:
+            async with probe_slots:
+                src_media_info = await asyncio.to_thread(
+                    get_media_info, input_file, self.probe_cache
+                )
+            output_media_params = build_media_params(**asdict(src_media_info))
+            self.bus.publish(
+                OnFileDataProcessed(input_file, src_media_info, output_media_params, job_id)
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.bus.publish(OnAppException(f"{input_file.name}: {e}"))
+            return None
+
+        async with encode_slots:
+            try:
+                return await self.bus.publish(
+                    OnTranscoderRun(
+                        input_file,
+                        output_media_params,
+                        job_id,
+                        self.threads,
+                        output_rel=output_rel(input_file),
+                    )
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.bus.publish(OnAppException(str(e)))
+                return None
+
+
+def output_rel(input_file: Path) -> Path:
+    """
+    Путь результата относительно папки output (структура подпапок input сохраняется)
+    """
+    return input_file.relative_to(INPUT_PATH)
@@ -1,52 +1,584 @@
-from dataclasses import asdict
+import os
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                as_completed, wait)
+from dataclasses import asdict, replace
+from itertools import islice
 from pathlib import Path
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Optional
+
+from loguru import logger
 
 from components.app_init import app_init
 from components.build_media_params import build_media_params
+from components.adaptive import AdaptiveLimiter
+from components.claims import FileClaims, build_claim_path
+from components.concurrency import (cpu_count, resolve_concurrency,
+                                    resolve_segment_workers)
+from components.cost_model import (JobOrder, estimate_cost, estimate_memory,
+                                  order_key)
+from components.deadline import DeadlinePlanner, SpeedModel
 from components.get_media_info import get_media_info
-from core.config import INPUT_PATH, OUTPUT_PATH, VIDEO_EXTS
+from components.job_journal import JobJournal
+from components.pipeline import (StageResult, ordered_map, prefetch,
+                                 prioritize)
+from components.probe_cache import ProbeCache
+from components.scanner import scan_outputs, scan_tree
+from components.watcher import FolderWatcher
+from core.config import (ADAPTIVE_CONCURRENCY, ADAPTIVE_CPU_BUDGET,
+                         ADAPTIVE_MEM_RESERVE, ADAPTIVE_POLL_INTERVAL,
+                         ADAPTIVE_RAMP_TIME, ADAPTIVE_THERMAL_LIMIT,
+                         DEADLINE_PRESETS, DEADLINE_SPEED_MODEL_FILE,
+                         INPUT_PATH, JOURNAL_QUEUE_BATCH,
+                         JOURNAL_RESUMABLE_ENCODING, OUTPUT_PATH,
+                         PIPELINE_PROBE_AHEAD, PIPELINE_PROBE_WORKERS,
+                         PIPELINE_SCAN_AHEAD, SCAN_PREVIEW_FILES,
+                         SCHEDULER_ORDER, SEGMENT_ENCODING,
+                         SEGMENT_MIN_DURATION, SEGMENT_THREADS_PER_WORKER,
+                         TRANSCODER_AUTO_THREADS_PER_JOB, TRANSCODER_JOBS,
+                         VIDEO_EXTS, WATCH_FORCE_POLLING, WATCH_POLL_INTERVAL,
+                         WATCH_SETTLE_TIME)
 from core.messagebus import AbstractMessageBus
+from services.main.models import OutputMediaParams, SrcMediaInfo
 from services.transcoder.commands import OnTranscoderRun
+from services.transcoder.entry import build_output_paths
+from services.transcoder.events import (OnSegmentCompleted,
+                                        OnTranscodingCompleted,
+                                        OnTranscodingProgressEvent)
+from services.transcoder.segments import build_chunks_dir
 
-from .events import OnAppException, OnFileDataProcessed, OnGetFileToTranscode, OnMsgNoFilesToTranscode
+from .events import (OnAppException, OnBatchCompleted, OnFileClaimedElsewhere,
+                     OnFileDataProcessed, OnFileQueued, OnGetFileToTranscode,
+                     OnMsgNoFilesToTranscode, OnWatchStarted)
 
 
 class MainService:
 
-    def __init__(self, bus: AbstractMessageBus) -> None:
+    def __init__(
+        self,
+        bus: AbstractMessageBus,
+        jobs: int = TRANSCODER_JOBS,
+        chunked: bool = SEGMENT_ENCODING,
+        probe_cache: Optional[ProbeCache] = None,
+        dry_run: bool = False,
+        input_dir: Path = INPUT_PATH,
+        output_dir: Path = OUTPUT_PATH,
+        probe: Optional[Callable[[Path], SrcMediaInfo]] = None,
+        watch: bool = False,
+        journal: Optional[JobJournal] = None,
+        order: JobOrder = SCHEDULER_ORDER,
+        adaptive: bool = ADAPTIVE_CONCURRENCY,
+        deadline: Optional[float] = None,
+        claims: Optional[FileClaims] = None,
+    ) -> None:
         self.bus = bus
+        # Порядок запуска заданий по оценке времени (fifo / longest / shortest)
+        self.order = order
+        # Журнал заданий (не ведётся при dry-run: файлы не обрабатываются)
+        self.journal = None if dry_run else journal
+        # job_id → исходный файл, для контрольных точек журнала
+        self._job_files: dict[int, Path] = {}
+        # Отметки захвата файлов: несколько экземпляров программы делят одну папку input
+        self.claims = None if dry_run else claims
+        # Файлы, пропущенные как захваченные другим экземпляром
+        self._claimed_elsewhere: list[Path] = []
+        # Режим наблюдения: новые файлы обрабатываются по мере появления до Ctrl+C
+        self.watch = watch
+        self.probe_cache = probe_cache
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        # Анализ файла; подменяется в нагрузочных тестах (benchmarks/loadtest.py)
+        self.probe = probe or (lambda f: get_media_info(f, self.probe_cache))
+        # Только анализ и расчёт параметров, без перекодирования
+        self.dry_run = dry_run
+        self.jobs, self.threads = resolve_concurrency(
+            jobs, TRANSCODER_AUTO_THREADS_PER_JOB
+        )
+        # Адаптивный допуск: jobs — только верхний предел, потоки задания выбираются при запуске
+        self.limiter: Optional[AdaptiveLimiter] = None
+        if adaptive:
+            cpus = cpu_count()
+            self.limiter = AdaptiveLimiter(
+                max_jobs=jobs or cpus,
+                threads_per_job=min(TRANSCODER_AUTO_THREADS_PER_JOB, cpus),
+                cpu_budget=ADAPTIVE_CPU_BUDGET,
+                mem_reserve=ADAPTIVE_MEM_RESERVE,
+                ramp_time=ADAPTIVE_RAMP_TIME,
+                thermal_limit=ADAPTIVE_THERMAL_LIMIT,
+                cpus=cpus,
+            )
+            self.jobs, self.threads = self.limiter.max_jobs, self.limiter.threads_per_job
+        # Сегментные воркеры делят между собой потоки задания
+        self.segment_workers = (
+            resolve_segment_workers(self.threads, SEGMENT_THREADS_PER_WORKER)
+            if chunked
+            else 0
+        )
+        logger.debug(
+            "<Заданий>: {0}, <потоков на задание>: {1}, <сегментных воркеров>: {2}",
+            self.jobs,
+            self.threads,
+            self.segment_workers,
+        )
+        # Срок пакета (сек): пресет x264 выбирается при запуске каждого задания
+        self.planner: Optional[DeadlinePlanner] = None
+        if deadline is not None and not dry_run:
+            self.planner = DeadlinePlanner(
+                deadline, DEADLINE_PRESETS, self.jobs, SpeedModel(DEADLINE_SPEED_MODEL_FILE)
+            )
+            self.bus.subscribe_event(OnTranscodingProgressEvent, self.on_progress)
+        if self.journal:
+            self.bus.subscribe_event(OnSegmentCompleted, self.on_segment_completed)
         self.run()
 
     def run(self):
-        app_init()
-        self.run_pipeline()
+        app_init(
+            self.input_dir,
+            self.output_dir,
+            self.journal.resumable_dirs() if self.journal else (),
+            self.claims,
+        )
+        if self.watch:
+            self.run_watch()
+        else:
+            try:
+                self.run_pipeline()
+            finally:
+                if self.planner:
+                    self.planner.model.save()
 
     def run_pipeline(self) -> None:
-        files = scan_input(VIDEO_EXTS, INPUT_PATH)
-        todo = [f for f in files if not (OUTPUT_PATH / f.name).exists()]
+        """
+        Файлы из дерева папки input подаются в пайплайн по мере сканирования
+        (сканирование — в отдельном потоке), итоги сканирования публикуются по его окончании
+        """
+        scan = ScanStats()
+        todo = prefetch(self.scan_todo(scan), PIPELINE_SCAN_AHEAD)
 
-        if not todo:
+        started = perf_counter()
+        results = self.process(todo)
+        if not scan.files_total:
             self.bus.publish(
                 OnMsgNoFilesToTranscode("Нет файлов для конвертации", "yellow")
             )
             return
 
-        self.bus.publish(OnGetFileToTranscode(todo))
+        self.bus.publish(
+            build_batch_summary(
+                results,
+                scan.files_total,
+                perf_counter() - started,
+                self.jobs,
+                self.probe_cache,
+                self.dry_run,
+                len(self._claimed_elsewhere),
+            )
+        )
+
+    def scan_todo(self, scan: "ScanStats") -> Iterator[Path]:
+        """
+        Рекурсивное сканирование папки input без уже обработанных файлов.
+        Готовые результаты определяются одним обходом папки output, а не проверкой каждого файла.
+        Файлы ставятся в журнал пачками по JOURNAL_QUEUE_BATCH (одна транзакция на пачку).
+        """
+        done = scan_outputs(self.output_dir)
+        files = (
+            f
+            for f in scan_input(VIDEO_EXTS, self.input_dir)
+            if not self._skip_done(f, done, scan)
+        )
+        while batch := list(islice(files, JOURNAL_QUEUE_BATCH)):
+            if self.journal:
+                self.journal.queue(batch)
+            if self.planner:
+                # Срок пакета рассчитывается и по файлам, ещё не дошедшим до анализа
+                self.planner.expect(len(batch))
+            for f in batch:
+                scan.add(self.output_rel(f))
+                yield f
+        if scan.files_total:
+            self.bus.publish(OnGetFileToTranscode(scan.preview, scan.files_total, scan.files_done))
+
+    def _skip_done(self, input_file: Path, done: set[str], scan: "ScanStats") -> bool:
+        if self.is_done(input_file, done):
+            scan.files_done += 1
+            return True
+        return False
+
+    def run_watch(self) -> None:
+        """
+        Режим наблюдения: файлы из папки input (уже лежащие и новые) подаются в тот же пайплайн
+        по одному, как только их запись завершена. Папка целиком не пересканируется.
+        Итоги публикуются после остановки (Ctrl+C).
+        """
+        watcher = FolderWatcher(
+            self.input_dir,
+            VIDEO_EXTS,
+            WATCH_SETTLE_TIME,
+            WATCH_POLL_INTERVAL,
+            WATCH_FORCE_POLLING,
+        )
+        queued = 0
+
+        def _new_files() -> Iterator[Path]:
+            nonlocal queued
+            for f in watcher:
+                if self.is_done(f):
+                    continue
+                queued += 1
+                if self.journal:
+                    self.journal.queue([f])
+                self.bus.publish(OnFileQueued(f))
+                yield f
+
+        self.bus.publish(OnWatchStarted(self.input_dir))
+        started = perf_counter()
+        results: list[OnTranscodingCompleted] = []
+        try:
+            self.process(_new_files(), results)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.stop()
+
+        self.bus.publish(
+            build_batch_summary(
+                results,
+                queued,
+                perf_counter() - started,
+                self.jobs,
+                self.probe_cache,
+                self.dry_run,
+                len(self._claimed_elsewhere),
+            )
+        )
 
-        for input_file in todo:
+    def process(
+        self,
+        files: Iterable[Path],
+        results: Optional[list[OnTranscodingCompleted]] = None,
+    ) -> list[OnTranscodingCompleted]:
+        """
+        Стадии: анализ (пул потоков) → расчёт параметров → планирование → кодирование (пул воркеров) → итоги.
+        Анализ и расчёт выполняются в отдельном потоке с опережением кодирования,
+        поэтому ошибки чтения файлов сообщаются сразу, а не по мере очереди.
+        Результаты дописываются в results по мере завершения заданий.
+        """
+        results = [] if results is None else results
+        # В пакетном режиме порядок выбирается по всем проанализированным файлам
+        # (до PIPELINE_PROBE_AHEAD), в режиме наблюдения — по готовым к моменту запуска
+        commands = prioritize(
+            self.plan_stage(self.probe_stage(files)),
+            lambda cmd: order_key(self.order, cmd.est_cost),
+            PIPELINE_PROBE_AHEAD,
+            fill_first=self.order != "fifo" and not self.watch,
+        )
+        if self.dry_run:
+            for _ in commands:
+                pass
+        else:
+            for result in self.encode_stage(commands):
+                results.append(result)
+        return results
+
+    def is_done(self, input_file: Path, done: Optional[set[str]] = None) -> bool:
+        """
+        Файл уже обработан: завершён по журналу (исходник с тех пор не менялся, итоговый файл
+        не удалён) или итоговый файл по тому же относительному пути есть в папке output
+        (done — результат scan_outputs; без него проверяется наличие файла)
+        """
+        output_rel = self.output_rel(input_file)
+        if self.journal and self.journal.is_finalized(input_file, self.output_dir / output_rel):
+            return True
+        if done is not None:
+            return output_rel.as_posix() in done
+        return (self.output_dir / output_rel).exists()
+
+    def output_rel(self, input_file: Path) -> Path:
+        """
+        Путь результата относительно папки output: структура подпапок input сохраняется
+        """
+        # Сравнение строк: Path.relative_to заметно медленнее на сотнях тысяч файлов
+        path, prefix = str(input_file), str(self.input_dir) + os.sep
+        if path.startswith(prefix):
+            return Path(path[len(prefix) :])
+        return Path(input_file.name)
+
+    def probe_stage(self, files: Iterable[Path]) -> Iterator[StageResult]:
+        """
+        Стадия анализа: чтение информации о файлах в пуле потоков (порядок сохраняется)
+        """
+        return ordered_map(
+            self.probe_job,
+            files,
+            PIPELINE_PROBE_WORKERS,
+            PIPELINE_PROBE_AHEAD,
+        )
+
+    def probe_job(self, input_file: Path) -> SrcMediaInfo:
+        if self.journal:
+            self.journal.set_state(input_file, "probing")
+        return self.probe(input_file)
+
+    def plan_stage(self, probed: Iterable[StageResult]) -> Iterator[OnTranscoderRun]:
+        """
+        Стадия расчёта параметров: формирует команды перекодирования,
+        ошибки анализа публикуются как OnAppException
+        """
+        for job_id, r in enumerate(probed, start=1):
             try:
-                src_media_info = get_media_info(input_file)
+                if r.error is not None:
+                    raise r.error
+                input_file, src_media_info = r.item, r.value
                 output_media_params = build_media_params(**asdict(src_media_info))
                 self.bus.publish(
-                    OnFileDataProcessed(input_file, src_media_info, output_media_params)
+                    OnFileDataProcessed(input_file, src_media_info, output_media_params, job_id)
+                )
+                cmd = OnTranscoderRun(
+                    input_file,
+                    output_media_params,
+                    job_id,
+                    self.threads,
+                    self.choose_segments(output_media_params),
+                    resumable=self.journal is not None,
+                    output_rel=self.output_rel(input_file),
+                    est_cost=estimate_cost(output_media_params),
+                    est_memory=estimate_memory(src_media_info, output_media_params),
                 )
-                self.bus.publish(OnTranscoderRun(input_file, output_media_params))
-            except (ValueError, TypeError) as e:
+                if self.planner:
+                    self.planner.add(cmd)
+                yield cmd
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if self.journal:
+                    self.journal.finish(r.item, False, str(e))
+                if self.planner:
+                    self.planner.discard_expected()
+                self.bus.publish(OnAppException(f"{r.item.name}: {e}"))
+
+    def encode_stage(
+        self, commands: Iterable[OnTranscoderRun]
+    ) -> Iterator[OnTranscodingCompleted]:
+        """
+        Стадия кодирования: не более self.jobs заданий одновременно
+        (с адаптивным допуском — пока хватает ресурсов системы).
+        Следующая команда берётся из очереди только при освобождении воркера,
+        поэтому предыдущие стадии ограничены ёмкостью очереди.
+        При Ctrl+C новые задания не запускаются, результаты уже запущенных собираются.
+        """
+        with ThreadPoolExecutor(self.jobs, thread_name_prefix="transcoder") as pool:
+            running: set[Future] = set()
+            interrupted = False
+            try:
+                for cmd in commands:
+                    while (admitted := self.admit(cmd, len(running))) is None:
+                        # Ожидание завершения задания; при адаптивном допуске ресурсы
+                        # перепроверяются каждые ADAPTIVE_POLL_INTERVAL сек
+                        timeout = (
+                            ADAPTIVE_POLL_INTERVAL
+                            if self.limiter and len(running) < self.jobs
+                            else None
+                        )
+                        done, running = wait(
+                            running, timeout=timeout, return_when=FIRST_COMPLETED
+                        )
+                        yield from self._finalize_stage(done)
+                    running.add(pool.submit(self.run_job, admitted))
+            except KeyboardInterrupt:
+                interrupted = True
+            yield from self._finalize_stage(as_completed(running))
+            if interrupted:
+                raise KeyboardInterrupt
+
+    def admit(self, cmd: OnTranscoderRun, running: int) -> Optional[OnTranscoderRun]:
+        """
+        Команда к запуску (с потоками, выбранными адаптивным допуском,
+        и пресетом, выбранным по сроку пакета) или None — ждать
+        """
+        if running >= self.jobs:
+            return None
+        if self.limiter is not None:
+            threads = self.limiter.admit(cmd.job_id, cmd.est_memory)
+            if threads is None:
+                return None
+            # Сегменты — по выделенным потокам, а не по расчёту при планировании
+            segments = self.choose_segments(cmd.output_media_params, threads)
+            cmd = replace(cmd, threads=threads, segments=segments)
+        if self.planner is not None:
+            preset = self.planner.assign(cmd)
+            if preset:
+                params = replace(cmd.output_media_params, preset=preset)
+                cmd = replace(
+                    cmd, output_media_params=params, est_cost=estimate_cost(params, preset)
+                )
+        return cmd
+
+    def run_job(self, cmd: OnTranscoderRun) -> Optional[OnTranscodingCompleted]:
+        """
+        Одно задание в воркере: захват файла, команда перекодирования и запись итога в журнал.
+        None — файл захвачен другим экземпляром программы
+        """
+        result = None
+        claim = self.claim_path(cmd.input_file) if self.claims else None
+        try:
+            if claim is not None and not self.claim_file(cmd, claim):
+                claim = None
+                return None
+            # Состояние encoding — только у файла, захваченного этим экземпляром
+            if self.journal:
+                self._job_files[cmd.job_id] = cmd.input_file
+                self.journal.start_encoding(
+                    cmd.input_file, self.chunks_dir(cmd.input_file) if cmd.segments else None
+                )
+            result = self.bus.publish(cmd)
+        except BaseException as e:
+            if self.journal:
+                self.journal.finish(cmd.input_file, False, str(e))
+            raise
+        finally:
+            if claim is not None:
+                self.claims.release(claim)
+            self._job_files.pop(cmd.job_id, None)
+            if self.limiter:
+                self.limiter.release(cmd.job_id)
+            if self.planner:
+                # Скорость учится только по полным проходам ffmpeg
+                self.planner.finish(
+                    cmd.job_id,
+                    result is not None
+                    and result.out_size > 0
+                    and not (result.cached or result.aborted),
+                )
+        if self.journal:
+            # Итоговый файл записан и при откате на исходник (ok=False, out_size > 0)
+            self.journal.finish(
+                cmd.input_file, result.out_size > 0, "" if result.ok else result.msg
+            )
+        return result
+
+    def claim_file(self, cmd: OnTranscoderRun, claim: Path) -> bool:
+        """
+        Захват файла перед запуском задания. Не захвачен (отметка другого экземпляра)
+        или результат уже записан другим экземпляром после сканирования — файл пропускается
+        """
+        if self.claims.acquire(claim):
+            if not self.is_done(cmd.input_file):
+                return True
+            self.claims.release(claim)
+        self._claimed_elsewhere.append(cmd.input_file)
+        self.bus.publish(OnFileClaimedElsewhere(cmd.input_file, cmd.job_id))
+        return False
+
+    def on_progress(self, e: OnTranscodingProgressEvent) -> None:
+        if self.planner:
+            self.planner.on_progress(e.job_id, e.progress_value)
+
+    def on_segment_completed(self, e: OnSegmentCompleted) -> None:
+        input_file = self._job_files.get(e.job_id)
+        if input_file is not None and self.journal:
+            self.journal.checkpoint(input_file, e.segments_done, e.segments_total)
+
+    def chunks_dir(self, input_file: Path) -> Path:
+        return build_chunks_dir(
+            build_output_paths(self.output_rel(input_file), self.output_dir)[0]
+        )
+
+    def claim_path(self, input_file: Path) -> Path:
+        return build_claim_path(
+            build_output_paths(self.output_rel(input_file), self.output_dir)[0]
+        )
+
+    def _finalize_stage(self, done: Iterable[Future]) -> Iterator[OnTranscodingCompleted]:
+        """
+        Стадия итогов: результаты завершённых заданий, ошибки публикуются как OnAppException
+        """
+        for future in done:
+            try:
+                result = future.result()
+                if result is not None:
+                    yield result
+            except Exception as e:  # pylint: disable=broad-exception-caught
                 self.bus.publish(OnAppException(str(e)))
 
+    def choose_segments(
+        self, output_media_params: OutputMediaParams, threads: Optional[int] = None
+    ) -> int:
+        """
+        Количество сегментных воркеров для файла: длинные перекодируемые файлы делятся
+        на сегменты, если сегментный режим включён и есть больше одного воркера.
+        В сегментном режиме с журналом длинные файлы делятся на сегменты и при одном воркере,
+        чтобы прерванное кодирование можно было продолжить. Без --chunked файл кодируется
+        целиком: при делении сохраняются только первые видео- и аудиодорожка.
+        threads — потоки задания, если они отличаются от self.threads (адаптивный допуск)
+        """
+        if (
+            output_media_params.mode != "encode"
+            or output_media_params.duration < SEGMENT_MIN_DURATION
+        ):
+            return 0
+        workers = self.segment_workers
+        if not workers:
+            return 0
+        if threads is not None:
+            workers = resolve_segment_workers(threads, SEGMENT_THREADS_PER_WORKER)
+        if workers > 1:
+            return workers
+        if self.journal and JOURNAL_RESUMABLE_ENCODING:
+            return 1
+        return 0
+
+
+def build_batch_summary(
+    results: list[OnTranscodingCompleted],
+    files_total: int,
+    wall_time: float,
+    jobs: int,
+    probe_cache: Optional[ProbeCache],
+    dry_run: bool = False,
+    files_elsewhere: int = 0,
+) -> OnBatchCompleted:
+    """
+    Итоги пакета по результатам заданий
+    """
+    return OnBatchCompleted(
+        files_total=files_total,
+        files_ok=sum(1 for r in results if r.ok),
+        src_bytes=sum(r.src_size for r in results),
+        out_bytes=sum(r.out_size for r in results),
+        wall_time=wall_time,
+        jobs=jobs,
+        files_aborted=sum(1 for r in results if r.aborted),
+        files_skipped=sum(1 for r in results if r.mode == "skip"),
+        files_remuxed=sum(1 for r in results if r.mode == "remux"),
+        files_cached=sum(1 for r in results if r.cached),
+        probe_cache_hits=probe_cache.hits if probe_cache else 0,
+        probe_cache_misses=probe_cache.misses if probe_cache else 0,
+        dry_run=dry_run,
+        src_seconds=sum(r.src_duration for r in results),
+        files_elsewhere=files_elsewhere,
+    )
+
+
+class ScanStats:
+    """
+    Итоги сканирования папки input: количество файлов и первые файлы очереди для вывода
+    (пути относительно input)
+    """
+
+    __slots__ = ("files_total", "files_done", "preview")
+
+    def __init__(self) -> None:
+        self.files_total = 0
+        self.files_done = 0
+        self.preview: list[Path] = []
+
+    def add(self, rel_path: Path) -> None:
+        self.files_total += 1
+        if len(self.preview) < SCAN_PREVIEW_FILES:
+            self.preview.append(rel_path)
+
 
-def scan_input(exts: set[str], input_dir: Path) -> list[Path]:
+def scan_input(exts: set[str], input_dir: Path) -> Iterator[Path]:
     """
-    Возвращает отфильтрованный список файлов с допустимыми расширениями из exts
+    Файлы с допустимыми расширениями из exts во всём дереве input_dir (по мере обхода)
     """
-    return [p for p in input_dir.iterdir() if p.is_file() and p.suffix.lower() in exts]
+    return scan_tree(input_dir, exts)
@@ -14,7 +14,29 @@ class OnMsgNoFilesToTranscode(Event):
 
 @dataclass
 class OnGetFileToTranscode(Event):
+    """
+    Итоги сканирования папки input: files — первые файлы очереди (пути относительно input,
+    не более SCAN_PREVIEW_FILES),
+    files_total — всего файлов в очереди, files_done — пропущено как уже обработанные
+    """
+
     files: list[Path]
+    files_total: int = 0
+    files_done: int = 0
+
+
+@dataclass
+class OnWatchStarted(Event):
+    folder: Path
+
+
+@dataclass
+class OnFileQueued(Event):
+    """
+    Режим наблюдения: новый файл дописан и поставлен в очередь
+    """
+
+    file: Path
 
 
 @dataclass
@@ -22,8 +44,48 @@ class OnFileDataProcessed(Event):
     input_file: Path
     src_media_info: SrcMediaInfo
     output_media_params: OutputMediaParams
+    job_id: int = 0
+
+
+@dataclass
+class OnFileClaimedElsewhere(Event):
+    """
+    Файл обрабатывается (или уже обработан) другим экземпляром программы — пропущен
+    """
+
+    input_file: Path
+    job_id: int = 0
 
 
 @dataclass
 class OnAppException(Event):
     msg: str
+
+
+@dataclass
+class OnBatchCompleted(Event):
+    files_total: int
+    files_ok: int
+    src_bytes: int
+    out_bytes: int
+    wall_time: float
+    jobs: int
+    files_aborted: int = 0
+    files_skipped: int = 0
+    files_remuxed: int = 0
+    # Результат взят из хранилища результатов
+    files_cached: int = 0
+    probe_cache_hits: int = 0
+    probe_cache_misses: int = 0
+    dry_run: bool = False
+    # Суммарная длительность обработанных исходников (сек)
+    src_seconds: float = 0.0
+    # Пропущено: файл захвачен другим экземпляром программы
+    files_elsewhere: int = 0
+
+    @property
+    def src_seconds_per_wall_second(self) -> float:
+        """
+        Пропускная способность пакета: секунд исходного видео за секунду работы
+        """
+        return self.src_seconds / self.wall_time if self.wall_time else 0.0
@@ -1,4 +1,11 @@
 from dataclasses import dataclass
+from typing import Literal
+
+# Путь обработки файла:
+# - skip: копия исходника без запуска ffmpeg
+# - remux: видео копируется без перекодирования, перекодируется только аудио
+# - encode: полное перекодирование
+TranscodeMode = Literal["skip", "remux", "encode"]
 
 
 @dataclass
@@ -9,6 +16,8 @@ class SrcMediaInfo:
     src_video_bitrate_avg: int
     src_audio_codec: str
     src_audio_bitrate: int
+    # Длительность (сек), 0 — неизвестна
+    src_duration: float = 0.0
 
 
 @dataclass
@@ -20,3 +29,10 @@ class OutputMediaParams:
     video_bitrate_bufsize: int
     audio_codec: str
     audio_bitrate_bps: int
+    # Длительность исходника (сек) — для сегментирования и расчёта прогресса
+    duration: float = 0.0
+    # Частота кадров (совпадает с исходной, 0 — неизвестна)
+    fps: float = 0.0
+    mode: TranscodeMode = "encode"
+    # Пресет x264 ("" — FFMPEG_X264_PRESET); выбирается планировщиком при --deadline
+    preset: str = ""
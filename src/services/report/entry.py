@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+from dataclasses import asdict, fields
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+from core.config import REPORTS_PATH
+from core.messagebus import AbstractMessageBus
+from services.main.events import OnBatchCompleted
+from services.transcoder.events import OnJobMetrics
+
+# Колонки CSV — поля события метрик задания
+CSV_FIELDS = [f.name for f in fields(OnJobMetrics)]
+
+
+class ReportService:
+    """
+    Отчёт о запуске для планирования мощностей и поиска регрессий:
+    - run-<время>-<pid>.jsonl: строка на каждое задание (type="job") и итоги пакета (type="batch")
+    - run-<время>-<pid>.csv: метрики заданий в табличном виде
+      (pid — экземпляры, запущенные одновременно на общей папке, не пишут в один файл)
+
+    Файлы создаются при первой записи, каждая запись дописывается сразу,
+    поэтому отчёт сохраняется и при прерванном запуске.
+    """
+
+    def __init__(self, bus: AbstractMessageBus, report_dir: Path = REPORTS_PATH) -> None:
+        self.bus = bus
+        stamp = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.jsonl_path = report_dir / f"run-{stamp}.jsonl"
+        self.csv_path = report_dir / f"run-{stamp}.csv"
+        self.bus.subscribe_event(OnJobMetrics, self.on_job_metrics)
+        self.bus.subscribe_event(OnBatchCompleted, self.on_batch_completed)
+        # Факт / оценка времени заданий, где ffmpeg обработал файл целиком (проверка модели стоимости)
+        self.cost_ratios: list[float] = []
+
+    def on_job_metrics(self, e: OnJobMetrics) -> None:
+        if e.est_time > 0 and e.outcome in ("encoded", "remuxed", "fallback"):
+            self.cost_ratios.append(e.wall_time / e.est_time)
+        record = asdict(e)
+        self._append_jsonl({"type": "job", **record})
+
+        write_header = not self.csv_path.exists()
+        with self.csv_path.open("a", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow(record)
+
+    def on_batch_completed(self, e: OnBatchCompleted) -> None:
+        if e.dry_run:
+            return
+        cost_model = cost_model_summary(self.cost_ratios)
+        self.cost_ratios = []
+        self._append_jsonl(
+            {
+                "type": "batch",
+                **asdict(e),
+                "src_seconds_per_wall_second": e.src_seconds_per_wall_second,
+                **cost_model,
+            }
+        )
+        if cost_model:
+            logger.info(
+                "<Модель стоимости>: факт / оценка — медиана {0:.2f}, "
+                "10-90% {1:.2f}..{2:.2f} ({3} заданий)",
+                cost_model["cost_ratio_p50"],
+                cost_model["cost_ratio_p10"],
+                cost_model["cost_ratio_p90"],
+                cost_model["cost_ratio_jobs"],
+            )
+        logger.info("<Отчёт>: {0}", self.jsonl_path)
+
+    def _append_jsonl(self, record: dict) -> None:
+        self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.jsonl_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def cost_model_summary(ratios: list[float]) -> dict:
+    """
+    Распределение отношения факт / оценка времени заданий.
+    Медиана далеко от 1 — нужно поправить SCHEDULER_ENCODE_PIXEL_RATE,
+    широкий разброс — модель плохо различает задания.
+    """
+    if not ratios:
+        return {}
+    values = sorted(ratios)
+
+    def _pct(q: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    return {
+        "cost_ratio_p10": _pct(0.1),
+        "cost_ratio_p50": _pct(0.5),
+        "cost_ratio_p90": _pct(0.9),
+        "cost_ratio_jobs": len(values),
+    }
@@ -1,39 +1,58 @@
+import threading
+from time import monotonic
 from typing import Optional
 
+import humanfriendly as hf
 from rich.box import ROUNDED
 from rich.console import Console
 from rich.live import Live
+from rich.markup import escape
 from rich.panel import Panel
 
+from core.config import (RICH_BAR_WIDTH, RICH_REFRESH_PER_SECOND,
+                         RICH_STDERR_LINES)
 from core.messagebus import AbstractMessageBus
-from services.main.events import (OnAppException, OnFileDataProcessed,
-                                  OnGetFileToTranscode, OnMsgNoFilesToTranscode)
+from services.main.events import (OnAppException, OnBatchCompleted,
+                                  OnFileClaimedElsewhere, OnFileDataProcessed,
+                                  OnFileQueued, OnGetFileToTranscode,
+                                  OnMsgNoFilesToTranscode, OnWatchStarted)
 from services.transcoder.events import (OnTranscodingCompleted,
                                         OnTranscodingProgressEvent)
 
 from .commands import PrintToConsole
-from .rich_elements import make_bar, render_panel
+from .models import BatchState, JobState
+from .rich_elements import render_dashboard, render_panel
 
 
 class RichService:
 
-    def __init__(self, bus: AbstractMessageBus) -> None:
+    def __init__(self, bus: AbstractMessageBus, console: Optional[Console] = None) -> None:
 
         self.bus = bus
         self.bus.subscribe_command(PrintToConsole, self.print_to_console)
         self.bus.subscribe_event(OnMsgNoFilesToTranscode, self.print_to_console)
         self.bus.subscribe_event(OnGetFileToTranscode, self.on_get_file_to_transcode)
+        self.bus.subscribe_event(OnWatchStarted, self.on_watch_started)
+        self.bus.subscribe_event(OnFileQueued, self.on_file_queued)
         self.bus.subscribe_event(OnAppException, self.on_app_exception)
         self.bus.subscribe_event(OnFileDataProcessed, self.on_transcode_prepare)
         self.bus.subscribe_event(
             OnTranscodingProgressEvent, self.on_transcoding_progress_event
         )
         self.bus.subscribe_event(OnTranscodingCompleted, self.on_transcoding_completed)
+        self.bus.subscribe_event(OnFileClaimedElsewhere, self.on_file_claimed_elsewhere)
+        self.bus.subscribe_event(OnBatchCompleted, self.on_batch_completed)
 
         # Переменные для переиспользования при повторных вызовах событий относящихся к одним и тем же файлам
-        self.console = Console()
+        # (ключ — идентификатор задания, задания могут выполняться параллельно).
+        # События только обновляют состояние заданий, панель перерисовывается потоком Live
+        # с фиксированной частотой по снимку состояния
+        self.console = console or Console()
         self._live: Optional[Live] = None
-        self.transcoding_progress_event_data = {}
+        self._lock = threading.Lock()
+        self.transcoding_progress_event_data: dict[int, dict] = {}
+        self.jobs: dict[int, JobState] = {}
+        self.batch = BatchState()
 
     def print_to_console(self, cmd: PrintToConsole):
         """
@@ -49,20 +68,41 @@ class RichService:
 
     def on_get_file_to_transcode(self, e: OnGetFileToTranscode) -> None:
         """
-        Печать списка файлов в красной рамке
+        Печать списка файлов в красной рамке (не более SCAN_PREVIEW_FILES строк)
         """
-        lines = [f"- {p.name}" for p in e.files]
-        lines.append(f"Итого: {len(e.files)} файл(ов)")
+        files_total = e.files_total or len(e.files)
+        lines = [f"- {p.as_posix()}" for p in e.files]
+        if files_total > len(e.files):
+            lines.append(f"… и ещё {files_total - len(e.files)}")
+        lines.append(f"Итого: {files_total} файл(ов)")
+        if e.files_done:
+            lines.append(f"Уже обработано (пропущено): {e.files_done}")
+        with self._lock:
+            # Сканирование идёт параллельно с обработкой: счётчики готовых заданий не сбрасываются
+            self.batch.files_total = files_total
         content = "\n".join(lines)
         panel = Panel(content, title="Файлы:", border_style="bright_red", box=ROUNDED)
         self.console.print(panel)
 
+    def on_watch_started(self, e: OnWatchStarted) -> None:
+        self.console.print(
+            f"[bold green]Ожидание новых файлов в {e.folder} (Ctrl+C — выход)[/bold green]"
+        )
+
+    def on_file_queued(self, e: OnFileQueued) -> None:
+        """
+        Режим наблюдения: файл добавлен в очередь, итоговая строка панели учитывает его
+        """
+        with self._lock:
+            self.batch.files_total += 1
+        self.console.print(f"+ {e.file.name}")
+
     def on_transcode_prepare(self, e: OnFileDataProcessed):
         """
         Событие: Перекодирование видео
         Подготовка переменных для отображения в рамке
         """
-        self.transcoding_progress_event_data = {
+        self.transcoding_progress_event_data[e.job_id] = {
             "title": e.input_file.name,
             "res_in": f"{e.src_media_info.src_width}x{e.src_media_info.src_height}",
             "vbit_in": str(e.src_media_info.src_video_bitrate_avg),
@@ -70,41 +110,138 @@ class RichService:
             "vbit_out": str(e.output_media_params.video_bitrate_avg),
             "audio_in": str(e.src_media_info.src_audio_codec),
             "audio_out": e.output_media_params.audio_codec,
+            "mode": e.output_media_params.mode,
         }
 
     def on_transcoding_progress_event(self, e: OnTranscodingProgressEvent):
         """
         Событие: Перекодирование видео
-        Обновление строк во время выполнения процесса
+        Обновление состояния задания (перерисовка — по таймеру Live)
         """
-        panel = render_panel(
-            tail_line=f"Прогресс: {make_bar(e.progress_value)}",
-            **self.transcoding_progress_event_data,
-        )
+        with self._lock:
+            job = self.jobs.get(e.job_id)
+            if job is None:
+                data = self.transcoding_progress_event_data.get(e.job_id)
+                if data is None:
+                    return
+                job = JobState(title=data["title"], res_out=data["res_out"], mode=data["mode"])
+                self.jobs[e.job_id] = job
+            job.progress = e.progress_value
+            job.fps, job.speed = e.fps, e.speed
 
         if self._live is None:
-            self._live = Live(panel, console=self.console, refresh_per_second=1)
+            self._live = Live(
+                console=self.console,
+                get_renderable=self._render_dashboard,
+                refresh_per_second=RICH_REFRESH_PER_SECOND,
+                transient=True,
+            )
             self._live.start()
-        else:
-            self._live.update(panel)
 
     def on_transcoding_completed(self, e: OnTranscodingCompleted):
         """
         Событие: Перекодирование видео
-        Завершение процесса, выход из "Live" и очистка переменных
+        Печать итоговой панели задания, выход из "Live" после завершения всех заданий
         """
-        if self._live:
-            if e.ok:
-                tail_line = f"[bold green][ ГОТОВО ][/bold green] {e.msg}"
-            else:
-                tail_line = f"[bold yellow][ ВНИМАНИЕ ][/bold yellow] {e.msg}"
-
-            self._live.update(
-                render_panel(
-                    tail_line=tail_line,
-                    **self.transcoding_progress_event_data,
-                )
+        # Сообщение ffmpeg может содержать квадратные скобки ("[out#0] ...") — не разметка rich
+        if e.ok:
+            tail_line = f"[bold green][ ГОТОВО ][/bold green] {escape(e.msg)}"
+        else:
+            tail_line = f"[bold yellow][ ВНИМАНИЕ ][/bold yellow] {escape(e.msg)}"
+
+        with self._lock:
+            self.jobs.pop(e.job_id, None)
+            self.batch.files_done += 1
+            if not e.ok:
+                self.batch.files_failed += 1
+            has_active = bool(self.jobs)
+        data = self.transcoding_progress_event_data.pop(e.job_id, None)
+        if data is not None:
+            self.console.print(render_panel(tail_line=tail_line, **data))
+        if e.stderr:
+            # Последние строки вывода ffmpeg — причина ошибки
+            tail = "\n".join(e.stderr.splitlines()[-RICH_STDERR_LINES:])
+            self.console.print(tail, style="dim", markup=False, highlight=False)
+
+        if self._live and not has_active:
+            self._stop_live()
+
+    def on_file_claimed_elsewhere(self, e: OnFileClaimedElsewhere) -> None:
+        """
+        Файл захвачен другим экземпляром: задание не выполняется, но учитывается в итоговой строке
+        """
+        with self._lock:
+            self.batch.files_done += 1
+        self.transcoding_progress_event_data.pop(e.job_id, None)
+        self.console.print(f"[dim]{e.input_file.name}: обрабатывается другим экземпляром, пропущен[/dim]")
+
+    def on_batch_completed(self, e: OnBatchCompleted):
+        """
+        Печать итогов пакета: количество файлов, объём и пропускная способность
+        """
+        self._stop_live()
+        self.transcoding_progress_event_data.clear()
+        if e.probe_cache_hits or e.probe_cache_misses:
+            self.console.print(
+                f"Кэш анализа: попаданий {e.probe_cache_hits}, промахов {e.probe_cache_misses}"
+            )
+        if e.dry_run:
+            self.console.print(
+                f"[bold green]Анализ завершён: {e.files_total} файл(ов) "
+                f"за {hf.format_timespan(e.wall_time)}[/bold green]"
+            )
+            return
+        src_fmt = hf.format_size(e.src_bytes, binary=False)
+        out_fmt = hf.format_size(e.out_bytes, binary=False)
+        speed_fmt = hf.format_size(e.src_bytes / e.wall_time if e.wall_time else 0, binary=False)
+        self.console.print(
+            f"[bold green]Готово: {e.files_ok}/{e.files_total - e.files_elsewhere} файл(ов), "
+            f"{src_fmt} → {out_fmt} за {hf.format_timespan(e.wall_time)} "
+            f"({speed_fmt}/с, заданий: {e.jobs})[/bold green]"
+        )
+        if e.src_seconds:
+            self.console.print(
+                f"Видео: {hf.format_timespan(e.src_seconds)}, "
+                f"×{e.src_seconds_per_wall_second:.2f} от реального времени"
+            )
+        if e.files_skipped or e.files_remuxed:
+            self.console.print(
+                f"Без перекодирования видео: скопировано {e.files_skipped}, "
+                f"перепаковано {e.files_remuxed}"
+            )
+        if e.files_cached:
+            self.console.print(f"Из хранилища результатов (без кодирования): {e.files_cached} файл(ов)")
+        if e.files_elsewhere:
+            self.console.print(f"Обработано другими экземплярами (пропущено): {e.files_elsewhere} файл(ов)")
+        if e.files_aborted:
+            self.console.print(
+                f"[bold yellow]Остановлено досрочно (прогноз размера больше исходного): "
+                f"{e.files_aborted} файл(ов)[/bold yellow]"
             )
+
+    def _stop_live(self) -> None:
+        if self._live:
             self._live.stop()
             self._live = None
-            self.transcoding_progress_event_data = {}
+
+    def _render_dashboard(self):
+        """
+        Рендер общей панели по снимку состояния (вызывается из потока Live)
+        """
+        now = monotonic()
+        with self._lock:
+            rows = [
+                (
+                    job_id,
+                    job.title,
+                    job.mode,
+                    job.res_out,
+                    job.progress,
+                    now - job.started,
+                    job.fps,
+                    job.speed,
+                )
+                for job_id, job in sorted(self.jobs.items())
+            ]
+            batch = (self.batch.files_done, self.batch.files_failed, self.batch.files_total)
+        return render_dashboard(rows, *batch, bar_width=RICH_BAR_WIDTH)
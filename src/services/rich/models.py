@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from time import monotonic
+
+
+@dataclass(slots=True)
+class JobState:
+    """
+    Состояние задания для панели: обновляется событиями, читается при перерисовке
+    """
+
+    title: str
+    res_out: str
+    mode: str
+    progress: float = 0.0
+    started: float = field(default_factory=monotonic)
+    fps: float = 0.0
+    speed: float = 0.0
+
+
+@dataclass(slots=True)
+class BatchState:
+    """
+    Счётчики пакета для итоговой строки панели
+    """
+
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
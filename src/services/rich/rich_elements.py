@@ -1,7 +1,26 @@
-from typing import List
+from typing import List, Sequence, Tuple
 
 from rich.box import ROUNDED
 from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+# Подписи путей обработки файла (TranscodeMode)
+MODE_LABELS = {
+    "skip": "копия исходника (перекодирование не требуется)",
+    "remux": "перепаковка (видео без перекодирования)",
+    "encode": "перекодирование",
+}
+
+# Короткие подписи путей для строки задания в общей панели
+MODE_SHORT_LABELS = {
+    "skip": "копия",
+    "remux": "перепак.",
+    "encode": "кодир.",
+}
+
+# Строка задания: (id, имя файла, путь, разрешение цели, прогресс %, прошло сек, fps, скорость ×)
+JobRow = Tuple[int, str, str, str, float, float, float, float]
 
 
 def render_panel(
@@ -13,6 +32,7 @@ def render_panel(
     audio_in: str,
     audio_out: str,
     tail_line: str,
+    mode: str = "encode",
 ) -> Panel:
     """
     Собирает панель с параметрами и «хвостовой» строкой (прогресс/итог)
@@ -21,6 +41,7 @@ def render_panel(
         "Параметры:",
         f"  Исходник: {res_in}, vbit={vbit_in}, audio={audio_in}",
         f"  Цель:     {res_out}, vbit={vbit_out}, audio={audio_out}",
+        f"  Путь:     {MODE_LABELS.get(mode, mode)}",
         tail_line,
     ]
     content = "\n".join(lines)
@@ -35,3 +56,71 @@ def make_bar(percent: float, width: int = 50) -> str:
     filled = int(width * (p / 100.0))
     bar = "█" * filled + "░" * (width - filled)
     return f"[bold green][{bar}] {p:6.2f}%[/bold green]"
+
+
+def render_dashboard(
+    rows: Sequence[JobRow],
+    files_done: int,
+    files_failed: int,
+    files_total: int,
+    bar_width: int,
+) -> Table:
+    """
+    Общая панель: строка на каждое выполняющееся задание и итоговая строка пакета
+    """
+    table = Table(box=ROUNDED, border_style="bright_blue", expand=False)
+    table.add_column("#", justify="right", no_wrap=True)
+    # Колонка имени — единственная сжимаемая: при узком терминале обрезается она, а не прогресс
+    table.add_column("Файл", min_width=8, max_width=40)
+    table.add_column("Путь", no_wrap=True)
+    table.add_column("Цель", no_wrap=True)
+    table.add_column("Прогресс", no_wrap=True, min_width=bar_width + 10)
+    table.add_column("Время", justify="right", no_wrap=True)
+    table.add_column("Скорость", justify="right", no_wrap=True)
+
+    active_progress = 0.0
+    for job_id, title, mode, res_out, progress, elapsed, fps, speed in rows:
+        active_progress += progress
+        table.add_row(
+            str(job_id),
+            Text(title, no_wrap=True, overflow="ellipsis"),
+            MODE_SHORT_LABELS.get(mode, mode),
+            res_out,
+            make_bar(progress, bar_width),
+            format_elapsed(elapsed),
+            format_speed(fps, speed),
+        )
+
+    total_progress = 0.0
+    if files_total:
+        total_progress = (files_done + active_progress / 100.0) / files_total * 100.0
+    failed = f", с ошибкой: {files_failed}" if files_failed else ""
+    table.caption = (
+        f"Активно: {len(rows)} | Готово: {files_done}/{files_total}{failed} | "
+        f"Всего: {min(total_progress, 100.0):.1f}%"
+    )
+    return table
+
+
+def format_speed(fps: float, speed: float) -> str:
+    """
+    Скорость задания по `ffmpeg -progress`: кадров в секунду и кратность реального времени
+    (пусто, пока ffmpeg их не сообщил)
+    """
+    parts = []
+    if fps:
+        parts.append(f"{fps:.0f} к/с")
+    if speed:
+        parts.append(f"×{speed:.2f}")
+    return " ".join(parts)
+
+
+def format_elapsed(seconds: float) -> str:
+    """
+    Время выполнения задания в компактном виде: ММ:СС или Ч:ММ:СС
+    """
+    minutes, sec = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{sec:02d}"
+    return f"{minutes:02d}:{sec:02d}"
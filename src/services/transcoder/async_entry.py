@@ -0,0 +1,145 @@
+import asyncio
+from pathlib import Path
+from time import perf_counter
+
+from components.utils.proc import ChildCpuMeter
+from core.async_messagebus import AsyncMessageBus
+from core.config import EARLY_ABORT_MIN_PROGRESS, EARLY_ABORT_RATIO, OUTPUT_PATH
+from core.messagebus import EventPolicy
+from services.transcoder.events import (OnTranscodingCompleted,
+                                        OnTranscodingProgressEvent)
+
+from .commands import OnTranscoderRun
+from .entry import (abort_to_source, build_output_paths, build_progress_event,
+                    copy_as_is, finalize_output, make_output_dir,
+                    projected_size_exceeded)
+from .ffmpeg_cmd import compile_cmd
+from .metrics import build_job_metrics
+from .progress import FfmpegProgressState, parse_progress_line, with_progress_args
+from .runner import FfmpegError, StderrTail
+
+
+class AsyncTranscoderService:
+    """
+    Перекодирование видео в asyncio: ffmpeg запускается через
+    asyncio.create_subprocess_exec, прогресс (`-progress pipe:1`) читается асинхронно,
+    поэтому один цикл событий обслуживает любое количество заданий без потока на задание.
+
+    Пути skip/remux/encode, досрочная остановка и финализация — как в TranscoderService.
+    Сегментный режим не поддерживается: задание всегда кодируется одним процессом.
+    """
+
+    def __init__(
+        self,
+        bus: AsyncMessageBus,
+        abort_ratio: float = EARLY_ABORT_RATIO,
+        abort_min_progress: float = EARLY_ABORT_MIN_PROGRESS,
+        output_dir: Path = OUTPUT_PATH,
+    ) -> None:
+        self.bus = bus
+        self.abort_ratio = abort_ratio
+        self.abort_min_progress = abort_min_progress
+        self.output_dir = output_dir
+        self.bus.subscribe_command(OnTranscoderRun, self.run)
+        self.bus.set_event_policy(
+            OnTranscodingProgressEvent, EventPolicy(coalesce_key=lambda e: e.job_id)
+        )
+
+    async def run(self, cmd: OnTranscoderRun) -> OnTranscodingCompleted:
+        started = perf_counter()
+        cpu_meter = ChildCpuMeter()
+        result = await self.execute(cmd, cpu_meter)
+        result.src_duration = cmd.output_media_params.duration
+        self.bus.publish(result)
+        self.bus.publish(
+            build_job_metrics(cmd, result, perf_counter() - started, cpu_meter.total)
+        )
+        return result
+
+    async def execute(
+        self, cmd: OnTranscoderRun, cpu_meter: ChildCpuMeter
+    ) -> OnTranscodingCompleted:
+        output_temp, output_final = build_output_paths(cmd.output_name, self.output_dir)
+        src_size = cmd.input_file.stat().st_size
+        mode = cmd.output_media_params.mode
+        make_output_dir(output_final)
+
+        if mode == "skip":
+            return await asyncio.to_thread(copy_as_is, cmd, output_temp, output_final, src_size)
+
+        try:
+            completed = await self._run_ffmpeg(cmd, output_temp, src_size, cpu_meter)
+            if not completed:
+                return await asyncio.to_thread(
+                    abort_to_source, cmd, output_temp, output_final, src_size
+                )
+            ok, msg = await asyncio.to_thread(
+                finalize_output, cmd.input_file, output_temp, output_final
+            )
+            out_size = output_final.stat().st_size
+            return OnTranscodingCompleted(ok, msg, cmd.job_id, src_size, out_size, mode=mode)
+        except (ValueError, TypeError, RuntimeError, OSError) as e:
+            output_temp.unlink(missing_ok=True)
+            return OnTranscodingCompleted(
+                False,
+                str(e),
+                cmd.job_id,
+                src_size,
+                mode=mode,
+                stderr=e.stderr if isinstance(e, FfmpegError) else "",
+            )
+
+    async def _run_ffmpeg(
+        self,
+        cmd: OnTranscoderRun,
+        output_temp: Path,
+        src_size: int,
+        cpu_meter: ChildCpuMeter,
+    ) -> bool:
+        """
+        Запуск ffmpeg и чтение прогресса.
+        Возвращает False, если кодирование остановлено досрочно по прогнозу размера.
+        """
+        args = with_progress_args(
+            compile_cmd(cmd.input_file, output_temp, cmd.output_media_params, cmd.threads)
+        )
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        assert proc.stdout is not None and proc.stderr is not None
+        stderr_tail = StderrTail()
+        stderr_task = asyncio.create_task(_read_tail(proc.stderr, stderr_tail))
+        state = FfmpegProgressState()
+        duration = cmd.output_media_params.duration
+        try:
+            async for raw in proc.stdout:
+                if not parse_progress_line(raw.decode("utf-8", errors="replace"), state):
+                    continue
+                progress = state.percent(duration)
+                cpu_meter.sample(proc.pid)
+                self.bus.publish(build_progress_event(cmd.job_id, progress, state))
+                if projected_size_exceeded(
+                    output_temp, src_size, progress, self.abort_ratio, self.abort_min_progress
+                ):
+                    proc.kill()
+                    await proc.wait()
+                    return False
+            returncode = await proc.wait()
+            await stderr_task
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            stderr_task.cancel()
+
+        if returncode != 0:
+            raise FfmpegError(returncode, stderr_tail.text())
+        return True
+
+
+async def _read_tail(stream: asyncio.StreamReader, tail: StderrTail) -> None:
+    while data := await stream.read(64 * 1024):
+        tail.write(data)
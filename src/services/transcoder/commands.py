@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 from core.commands import Command
 from services.main.models import OutputMediaParams
@@ -9,3 +10,20 @@ from services.main.models import OutputMediaParams
 class OnTranscoderRun(Command):
     input_file: Path
     output_media_params: OutputMediaParams
+    job_id: int = 0
+    # Потоки ffmpeg для задания (0 — на усмотрение ffmpeg)
+    threads: int = 0
+    # Сегментных воркеров (0 — файл кодируется целиком одним процессом)
+    segments: int = 0
+    # Сохранять готовые сегменты при ошибке/прерывании, чтобы продолжить при следующем запуске
+    resumable: bool = False
+    # Путь результата относительно папки output (структура подпапок input); None — имя исходника
+    output_rel: Optional[Path] = None
+    # Оценка времени задания (сек) по модели стоимости планировщика
+    est_cost: float = 0.0
+    # Оценка памяти процесса ffmpeg (байт) — для адаптивного допуска заданий
+    est_memory: int = 0
+
+    @property
+    def output_name(self) -> Path:
+        return self.output_rel or Path(self.input_file.name)
@@ -1,18 +1,27 @@
+import threading
 from pathlib import Path
 from shutil import copy2
-from typing import List, Tuple
+from time import perf_counter
+from typing import Optional, Tuple, Union
 
 import humanfriendly as hf
-from ffmpeg_progress_yield import FfmpegProgress
+from loguru import logger
 
-from core.config import (FFMPEG_BIN, FFMPEG_GLOBAL_ARGS, FFMPEG_X264_PRESET,
-                         OUTPUT_PATH)
-from core.messagebus import AbstractMessageBus
-from services.main.models import OutputMediaParams
-from services.transcoder.events import (OnTranscodingCompleted,
+from components.output_store import KeyedLock, OutputStore, StoredOutput
+from components.utils.proc import ChildCpuMeter
+from core.config import EARLY_ABORT_MIN_PROGRESS, EARLY_ABORT_RATIO, OUTPUT_PATH
+from core.messagebus import AbstractMessageBus, EventPolicy
+from services.transcoder.events import (OnSegmentCompleted,
+                                        OnTranscodingCompleted,
                                         OnTranscodingProgressEvent)
 
 from .commands import OnTranscoderRun
+from .ffmpeg_cmd import compile_cmd
+from .metrics import build_job_metrics
+from .progress import FfmpegProgressState
+from .runner import FfmpegError, FfmpegRunner
+from .segments import (JobCancelled, SegmentsAborted, run_cancellable,
+                       run_segmented)
 
 
 class TranscoderService:
@@ -21,64 +30,269 @@ class TranscoderService:
     - Получение названий временных и конечных файлов
     - Формирование строки параметров
     - Запуск процесса
+    - Досрочная остановка, если прогноз итогового размера больше исходного
+    - Отмена выполняемого задания (cancel)
     - Проверка размера исходного файла,
       если итог больше, то замена на исходный,
       иначе убрать временные суффиксы из названия
     """
 
-    def __init__(self, bus: AbstractMessageBus) -> None:
+    def __init__(
+        self,
+        bus: AbstractMessageBus,
+        abort_ratio: float = EARLY_ABORT_RATIO,
+        abort_min_progress: float = EARLY_ABORT_MIN_PROGRESS,
+        output_dir: Path = OUTPUT_PATH,
+        store: Optional[OutputStore] = None,
+    ) -> None:
         self.bus = bus
+        self.abort_ratio = abort_ratio
+        self.abort_min_progress = abort_min_progress
+        self.output_dir = output_dir
+        # Хранилище результатов: дубликаты и повторные запуски без кодирования
+        self.store = store
+        self._store_keys = KeyedLock()
+        # job_id → признак отмены выполняемого задания
+        self._cancel: dict[int, threading.Event] = {}
+        self._cancel_lock = threading.Lock()
         self.bus.subscribe_command(OnTranscoderRun, self.run)
+        # Важно только последнее значение прогресса каждого задания
+        self.bus.set_event_policy(
+            OnTranscodingProgressEvent, EventPolicy(coalesce_key=lambda e: e.job_id)
+        )
 
     def run(
         self,
         cmd: OnTranscoderRun,
-    ):
-        output_temp, output_final = build_output_paths(cmd.input_file.name)
+    ) -> OnTranscodingCompleted:
+        """
+        Выполняет задание и возвращает событие завершения (оно же публикуется в шину),
+        вслед за ним публикуются метрики задания (OnJobMetrics).
+        Потокобезопасен: состояние задания не хранится в сервисе,
+        поэтому несколько заданий могут выполняться одновременно.
+        """
+        started = perf_counter()
+        cpu_meter = ChildCpuMeter()
+        cancelled = threading.Event()
+        with self._cancel_lock:
+            self._cancel[cmd.job_id] = cancelled
         try:
-            cmd_str = compile_cmd(cmd.input_file, output_temp, cmd.output_media_params)
+            result = self.execute(cmd, cpu_meter, cancelled)
+        finally:
+            with self._cancel_lock:
+                self._cancel.pop(cmd.job_id, None)
+        result.src_duration = cmd.output_media_params.duration
+        wall_time = perf_counter() - started
+        logger.debug(
+            "{0}: оценка {1:.1f} сек, факт {2:.1f} сек", cmd.input_file.name, cmd.est_cost, wall_time
+        )
+        self.bus.publish(result)
+        self.bus.publish(build_job_metrics(cmd, result, wall_time, cpu_meter.total))
+        return result
+
+    def cancel(self, job_id: int) -> None:
+        """
+        Отменить выполняемое задание: ffmpeg останавливается, итоговый файл не создаётся,
+        временные файлы остаются (задание могло перейти другому исполнителю)
+        """
+        with self._cancel_lock:
+            cancelled = self._cancel.get(job_id)
+        if cancelled is not None:
+            cancelled.set()
+
+    def execute(
+        self,
+        cmd: OnTranscoderRun,
+        cpu_meter: ChildCpuMeter,
+        cancelled: Optional[threading.Event] = None,
+    ) -> OnTranscodingCompleted:
+        """
+        Путь skip/remux/encode для одного задания, без публикации итога.
+        Результаты remux/encode берутся из хранилища и сохраняются в него.
+        """
+        if self.store is None or cmd.output_media_params.mode == "skip":
+            return self.transcode(cmd, cpu_meter, cancelled)
+
+        key = self.store.key(
+            cmd.input_file, cmd.output_media_params, self.abort_ratio, self.abort_min_progress
+        )
+        # Дубликат, выполняющийся одновременно, дожидается результата первого задания
+        with self._store_keys.hold(key):
+            stored = self.store.get(key)
+            if stored is not None:
+                return self.from_store(cmd, stored)
+            result = self.transcode(cmd, cpu_meter, cancelled)
+            output_final = build_output_paths(cmd.output_name, self.output_dir)[1]
+            if result.out_size and output_final.exists():
+                self.store.put(key, output_final, result.ok, result.aborted)
+            return result
+
+    def from_store(self, cmd: OnTranscoderRun, stored: StoredOutput) -> OnTranscodingCompleted:
+        """
+        Итоговый файл из хранилища результатов вместо кодирования
+        """
+        output_temp, output_final = build_output_paths(cmd.output_name, self.output_dir)
+        make_output_dir(output_final)
+        self.store.materialize(stored, output_temp, output_final)
+        return OnTranscodingCompleted(
+            stored.ok,
+            f"{output_final.name} ({hf.format_size(stored.size, binary=False)}): "
+            "результат взят из хранилища",
+            cmd.job_id,
+            cmd.input_file.stat().st_size,
+            stored.size,
+            aborted=stored.aborted,
+            mode=cmd.output_media_params.mode,
+            cached=True,
+        )
+
+    def transcode(
+        self,
+        cmd: OnTranscoderRun,
+        cpu_meter: ChildCpuMeter,
+        cancelled: Optional[threading.Event] = None,
+    ) -> OnTranscodingCompleted:
+        """
+        Запуск ffmpeg (или копирование исходника для skip)
+        """
+        output_temp, output_final = build_output_paths(cmd.output_name, self.output_dir)
+        src_size = cmd.input_file.stat().st_size
+        mode = cmd.output_media_params.mode
+        make_output_dir(output_final)
+
+        if mode == "skip":
+            return copy_as_is(cmd, output_temp, output_final, src_size)
+
+        def _on_progress(progress: float, state: Optional[FfmpegProgressState] = None) -> None:
+            self.bus.publish(build_progress_event(cmd.job_id, progress, state))
+
+        def _on_segment(done: int, total: int) -> None:
+            self.bus.publish(OnSegmentCompleted(cmd.job_id, done, total))
 
-            ff = FfmpegProgress(cmd_str)
-            for progress in ff.run_command_with_progress():
-                self.bus.publish(OnTranscodingProgressEvent(progress_value=progress))
+        def _segments_over(out_size: int, progress: float) -> bool:
+            return projected_size_over(
+                output_temp.name,
+                out_size,
+                src_size,
+                progress,
+                self.abort_ratio,
+                self.abort_min_progress,
+            )
 
+        try:
+            if cmd.segments > 0:
+                run_segmented(
+                    cmd.input_file,
+                    output_temp,
+                    cmd.output_media_params,
+                    cmd.segments,
+                    cmd.threads,
+                    _on_progress,
+                    cpu_meter,
+                    cmd.resumable,
+                    _on_segment,
+                    _segments_over,
+                    cancelled,
+                )
+            else:
+                ff = FfmpegRunner(
+                    compile_cmd(cmd.input_file, output_temp, cmd.output_media_params, cmd.threads),
+                    cmd.output_media_params.duration,
+                )
+                progress_iter = run_cancellable(ff, cpu_meter, cancelled)
+                for progress in progress_iter:
+                    _on_progress(progress, ff.state)
+                    if self.should_abort(output_temp, src_size, progress):
+                        # Закрытие генератора останавливает процесс ffmpeg
+                        progress_iter.close()
+                        return abort_to_source(cmd, output_temp, output_final, src_size)
+
+            if cancelled is not None and cancelled.is_set():
+                raise JobCancelled()
             ok, msg = finalize_output(cmd.input_file, output_temp, output_final)
+            out_size = output_final.stat().st_size
+            return OnTranscodingCompleted(ok, msg, cmd.job_id, src_size, out_size, mode=mode)
+        except SegmentsAborted:
+            return abort_to_source(cmd, output_temp, output_final, src_size)
+        except JobCancelled:
+            return OnTranscodingCompleted(
+                False, "Задание отменено", cmd.job_id, src_size, mode=mode
+            )
+        except (ValueError, TypeError, RuntimeError, OSError) as e:
+            output_temp.unlink(missing_ok=True)
+            return OnTranscodingCompleted(
+                False,
+                str(e),
+                cmd.job_id,
+                src_size,
+                mode=mode,
+                stderr=e.stderr if isinstance(e, FfmpegError) else "",
+            )
+
+    def should_abort(self, output_temp: Path, src_size: int, progress: float) -> bool:
+        return projected_size_exceeded(
+            output_temp, src_size, progress, self.abort_ratio, self.abort_min_progress
+        )
 
-            self.bus.publish(OnTranscodingCompleted(ok, msg))
-        except (ValueError, TypeError) as e:
-            output_temp.unlink()
-            self.bus.publish(OnTranscodingCompleted(False, str(e)))
-
-
-def compile_cmd(
-    input_file: Path,
-    output_file: Path,
-    output_media_params: OutputMediaParams,
-) -> List[str]:
-    is_mp4 = output_file.suffix.lower() == ".mp4"
-    w, h = output_media_params.width, output_media_params.height
-    vb = str(output_media_params.video_bitrate_avg)
-    maxrate = str(output_media_params.video_bitrate_max)
-    bufsize = str(output_media_params.video_bitrate_bufsize)
-
-    base = [
-        str(FFMPEG_BIN),
-        "-i", str(input_file),
-        "-c:v", "libx264",
-        "-preset", FFMPEG_X264_PRESET,
-        "-vf", f"scale={w}:{h}:flags=lanczos",
-        "-b:v", vb,
-        "-maxrate", maxrate,
-        "-bufsize", bufsize,
-        "-c:a", output_media_params.audio_codec,
-    ]
-
-    mp4_opts = ["-pix_fmt", "yuv420p", "-movflags", "+faststart"] if is_mp4 else []
-    audio_bitrate = (
-        ["-b:a", str(output_media_params.audio_bitrate_bps)] if output_media_params.audio_bitrate_bps > 0 else []
+
+def build_progress_event(
+    job_id: int, progress: float, state: Optional[FfmpegProgressState] = None
+) -> OnTranscodingProgressEvent:
+    """
+    Событие прогресса с показателями ffmpeg (fps, скорость, битрейт, позиция), если они известны
+    """
+    state = state or FfmpegProgressState()
+    return OnTranscodingProgressEvent(
+        progress, job_id, state.fps, state.speed, state.bitrate, state.out_time
     )
 
-    return [*base, *mp4_opts, *audio_bitrate, *FFMPEG_GLOBAL_ARGS, str(output_file)]
+
+def projected_size_exceeded(
+    output_temp: Path,
+    src_size: int,
+    progress: float,
+    abort_ratio: float,
+    abort_min_progress: float,
+) -> bool:
+    """
+    Прогноз итогового размера по текущему размеру временного файла и проценту прогресса.
+    Решение принимается не раньше abort_min_progress, с запасом abort_ratio.
+    """
+    if abort_ratio <= 0 or progress < abort_min_progress or progress >= 100:
+        return False
+    try:
+        out_size = output_temp.stat().st_size
+    except FileNotFoundError:
+        return False
+    return projected_size_over(
+        output_temp.name, out_size, src_size, progress, abort_ratio, abort_min_progress
+    )
+
+
+def projected_size_over(
+    name: str,
+    out_size: int,
+    src_size: int,
+    progress: float,
+    abort_ratio: float,
+    abort_min_progress: float,
+) -> bool:
+    """
+    То же по уже известному размеру результата (например, сумме сегментов)
+    """
+    if abort_ratio <= 0 or progress < abort_min_progress or progress >= 100:
+        return False
+    projected = out_size * 100.0 / progress
+    if projected > src_size * abort_ratio:
+        logger.info(
+            "{0}: прогноз {1} > исходный {2} на {3:.1f}%, остановка",
+            name,
+            hf.format_size(int(projected), binary=False),
+            hf.format_size(src_size, binary=False),
+            progress,
+        )
+        return True
+    return False
 
 
 def finalize_output(input_file: Path, output_temp: Path, output_final: Path) -> tuple[bool, str]:
@@ -89,8 +303,7 @@ def finalize_output(input_file: Path, output_temp: Path, output_final: Path) ->
     out_size = output_temp.stat().st_size
 
     if out_size > src_size:
-        output_temp.unlink()
-        copy2(input_file, output_final)
+        fallback_to_source(input_file, output_temp, output_final)
         return False, "Итоговый файл больше исходного, заменён исходником"
 
     if output_final.exists():
@@ -101,10 +314,77 @@ def finalize_output(input_file: Path, output_temp: Path, output_final: Path) ->
     return True, f"{output_final.name} ({out_size_fmt})"
 
 
-def build_output_paths(input_file_name: str) -> Tuple[Path, Path]:
+def copy_as_is(
+    cmd: OnTranscoderRun, output_temp: Path, output_final: Path, src_size: int
+) -> OnTranscodingCompleted:
+    """
+    Путь "skip": исходник копируется без запуска ffmpeg
+    """
+    copy_to_output(cmd.input_file, output_temp, output_final)
+    return OnTranscodingCompleted(
+        True,
+        f"{output_final.name}: исходник уже оптимален, скопирован без изменений",
+        cmd.job_id,
+        src_size,
+        src_size,
+        mode=cmd.output_media_params.mode,
+    )
+
+
+def abort_to_source(
+    cmd: OnTranscoderRun, output_temp: Path, output_final: Path, src_size: int
+) -> OnTranscodingCompleted:
+    """
+    Досрочная остановка: вместо итогового файла используется исходник
+    """
+    fallback_to_source(cmd.input_file, output_temp, output_final)
+    return OnTranscodingCompleted(
+        False,
+        "Прогноз размера больше исходного, кодирование остановлено, заменён исходником",
+        cmd.job_id,
+        src_size,
+        src_size,
+        aborted=True,
+        mode=cmd.output_media_params.mode,
+    )
+
+
+def fallback_to_source(input_file: Path, output_temp: Path, output_final: Path) -> None:
+    """
+    Удаляет временный файл и копирует исходник в качестве итогового
+    """
+    output_temp.unlink(missing_ok=True)
+    copy_to_output(input_file, output_temp, output_final)
+
+
+def copy_to_output(src: Path, output_temp: Path, output_final: Path) -> None:
+    """
+    Копирование через временный файл, как и кодирование: прерванное копирование
+    не оставляет в output неполный файл под итоговым именем
+    """
+    try:
+        copy2(src, output_temp)
+        output_temp.replace(output_final)
+    except BaseException:
+        output_temp.unlink(missing_ok=True)
+        raise
+
+
+def build_output_paths(
+    output_name: Union[str, Path], output_dir: Path = OUTPUT_PATH
+) -> Tuple[Path, Path]:
     """
     Строит пути: временный (name + ".tmp" + ext) и финальный (name + ext).
+    output_name может содержать подпапки (структура папки input); папки не создаются —
+    см. make_output_dir
     """
-    final_output = OUTPUT_PATH / input_file_name
+    final_output = output_dir / output_name
     temp_output = final_output.with_name(final_output.stem + ".tmp" + final_output.suffix)
     return temp_output, final_output
+
+
+def make_output_dir(output_final: Path) -> None:
+    """
+    Папка результата (подпапки input) — создаётся только перед записью файла
+    """
+    output_final.parent.mkdir(parents=True, exist_ok=True)
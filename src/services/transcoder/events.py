@@ -1,14 +1,84 @@
 from dataclasses import dataclass
+from typing import Literal
 
 from core.events import Event
+from services.main.models import TranscodeMode
 
 
 @dataclass
 class OnTranscodingProgressEvent(Event):
     progress_value: float
+    job_id: int = 0
+    # Из `ffmpeg -progress` (0 / "" — неизвестно; в сегментном режиме fps и speed — сумма сегментов)
+    fps: float = 0.0
+    # Кратность реального времени
+    speed: float = 0.0
+    bitrate: str = ""
+    # Позиция в выходном файле (сек)
+    out_time: float = 0.0
+
+
+@dataclass
+class OnSegmentCompleted(Event):
+    """
+    Сегментное кодирование: готово segments_done из segments_total сегментов (контрольная точка)
+    """
+
+    job_id: int
+    segments_done: int
+    segments_total: int
 
 
 @dataclass
 class OnTranscodingCompleted(Event):
     ok: bool
     msg: str
+    job_id: int = 0
+    src_size: int = 0
+    out_size: int = 0
+    # Кодирование остановлено досрочно по прогнозу размера
+    aborted: bool = False
+    mode: TranscodeMode = "encode"
+    # Длительность исходника (сек) — для пропускной способности пакета
+    src_duration: float = 0.0
+    # Итоговый файл взят из хранилища результатов (без ffmpeg)
+    cached: bool = False
+    # Ошибка ffmpeg: последние строки его stderr (не более FFMPEG_STDERR_TAIL_BYTES байт)
+    stderr: str = ""
+
+
+# Чем закончилось задание:
+# - encoded / remuxed: результат ffmpeg принят
+# - copied: путь "skip", исходник скопирован без ffmpeg
+# - cached: результат взят из хранилища результатов (дубликат или повторный запуск)
+# - fallback: результат больше исходного, заменён исходником
+# - aborted: остановлено досрочно по прогнозу размера, заменено исходником
+# - failed: ошибка
+JobOutcome = Literal[
+    "encoded", "remuxed", "copied", "cached", "fallback", "aborted", "failed"
+]
+
+
+@dataclass
+class OnJobMetrics(Event):
+    job_id: int
+    file_name: str
+    mode: TranscodeMode
+    outcome: JobOutcome
+    # Время выполнения задания (сек)
+    wall_time: float
+    # Длительность исходника (сек)
+    src_duration: float
+    # Кадров в секунду и кратность реального времени (src_duration / wall_time)
+    encode_fps: float
+    speed: float
+    # Процессорное время дочерних процессов ffmpeg (user + system, сек)
+    cpu_time: float
+    src_bytes: int
+    out_bytes: int
+    # out_bytes / src_bytes
+    ratio: float
+    # Оценка времени задания планировщиком (сек), для сравнения с wall_time
+    est_time: float = 0.0
+    # Пресет x264 (для перекодированных файлов)
+    preset: str = ""
@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import List
+
+from core.config import FFMPEG_BIN, FFMPEG_GLOBAL_ARGS, FFMPEG_X264_PRESET
+from services.main.models import OutputMediaParams
+
+
+def compile_cmd(
+    input_file: Path,
+    output_file: Path,
+    output_media_params: OutputMediaParams,
+    threads: int = 0,
+) -> List[str]:
+    is_mp4 = output_file.suffix.lower() == ".mp4"
+
+    base = [
+        str(FFMPEG_BIN),
+        "-i", str(input_file),
+        *compile_video_args(output_media_params),
+        "-c:a", output_media_params.audio_codec,
+    ]
+
+    pix_fmt = ["-pix_fmt", "yuv420p"] if output_media_params.mode == "encode" else []
+    mp4_opts = [*pix_fmt, "-movflags", "+faststart"] if is_mp4 else []
+    audio_bitrate = compile_audio_bitrate_args(output_media_params)
+    threads_opts = ["-threads", str(threads)] if threads > 0 else []
+
+    return [
+        *base, *mp4_opts, *audio_bitrate, *threads_opts, *FFMPEG_GLOBAL_ARGS, str(output_file)
+    ]
+
+
+def compile_video_args(output_media_params: OutputMediaParams) -> List[str]:
+    """
+    Параметры видеокодека: libx264, масштабирование и ограничения VBV
+    (для remux — копирование видеопотока без перекодирования)
+    """
+    if output_media_params.mode == "remux":
+        return ["-c:v", "copy"]
+
+    w, h = output_media_params.width, output_media_params.height
+    vb = str(output_media_params.video_bitrate_avg)
+    maxrate = str(output_media_params.video_bitrate_max)
+    bufsize = str(output_media_params.video_bitrate_bufsize)
+
+    return [
+        "-c:v", "libx264",
+        "-preset", output_media_params.preset or FFMPEG_X264_PRESET,
+        "-vf", f"scale={w}:{h}:flags=lanczos",
+        "-b:v", vb,
+        "-maxrate", maxrate,
+        "-bufsize", bufsize,
+    ]
+
+
+def compile_audio_bitrate_args(output_media_params: OutputMediaParams) -> List[str]:
+    if output_media_params.audio_bitrate_bps > 0:
+        return ["-b:a", str(output_media_params.audio_bitrate_bps)]
+    return []
+
+
+def compile_split_cmd(input_file: Path, pattern: Path, segment_time: float) -> List[str]:
+    """
+    Деление видеодорожки на сегменты без перекодирования.
+    Муксер segment режет только по ключевым кадрам, поэтому сегменты независимы.
+    """
+    return [
+        str(FFMPEG_BIN),
+        "-i", str(input_file),
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", f"{segment_time:.3f}",
+        "-reset_timestamps", "1",
+        *FFMPEG_GLOBAL_ARGS,
+        str(pattern),
+    ]
+
+
+def compile_segment_cmd(
+    segment_file: Path,
+    output_file: Path,
+    output_media_params: OutputMediaParams,
+    threads: int = 0,
+    is_mp4: bool = False,
+) -> List[str]:
+    """
+    Перекодирование одного сегмента (только видео) с теми же параметрами, что и весь файл
+    """
+    pix_fmt = ["-pix_fmt", "yuv420p"] if is_mp4 else []
+    threads_opts = ["-threads", str(threads)] if threads > 0 else []
+    return [
+        str(FFMPEG_BIN),
+        "-i", str(segment_file),
+        "-an",
+        *compile_video_args(output_media_params),
+        *pix_fmt,
+        *threads_opts,
+        *FFMPEG_GLOBAL_ARGS,
+        str(output_file),
+    ]
+
+
+def compile_concat_cmd(
+    concat_list: Path,
+    input_file: Path,
+    output_file: Path,
+    output_media_params: OutputMediaParams,
+) -> List[str]:
+    """
+    Склейка сегментов через concat demuxer без перекодирования видео
+    и добавление аудио из исходника (аудио кодируется один раз целиком)
+    """
+    is_mp4 = output_file.suffix.lower() == ".mp4"
+    mp4_opts = ["-movflags", "+faststart"] if is_mp4 else []
+    return [
+        str(FFMPEG_BIN),
+        "-f", "concat",
+        "-safe", "0",
+        "-i", str(concat_list),
+        "-i", str(input_file),
+        "-map", "0:v:0",
+        "-map", "1:a:0?",
+        "-c:v", "copy",
+        "-c:a", output_media_params.audio_codec,
+        *compile_audio_bitrate_args(output_media_params),
+        *mp4_opts,
+        *FFMPEG_GLOBAL_ARGS,
+        str(output_file),
+    ]
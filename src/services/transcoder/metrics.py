@@ -0,0 +1,52 @@
+from core.config import FFMPEG_X264_PRESET
+
+from .commands import OnTranscoderRun
+from .events import JobOutcome, OnJobMetrics, OnTranscodingCompleted
+
+
+def job_outcome(result: OnTranscodingCompleted) -> JobOutcome:
+    """
+    Итог задания по событию завершения
+    """
+    if result.cached:
+        return "cached"
+    if result.aborted:
+        return "aborted"
+    if result.mode == "skip":
+        return "copied"
+    if not result.ok:
+        # При замене исходником итоговый файл существует, при ошибке — нет
+        return "fallback" if result.out_size else "failed"
+    return "remuxed" if result.mode == "remux" else "encoded"
+
+
+def build_job_metrics(
+    cmd: OnTranscoderRun,
+    result: OnTranscodingCompleted,
+    wall_time: float,
+    cpu_time: float,
+) -> OnJobMetrics:
+    """
+    Метрики задания: время, скорость кодирования, процессорное время и степень сжатия
+    """
+    params = cmd.output_media_params
+    outcome = job_outcome(result)
+    # Скорость имеет смысл только для заданий, где ffmpeg обработал файл целиком
+    full_run = outcome in ("encoded", "remuxed", "fallback") and wall_time > 0
+    speed = params.duration / wall_time if full_run else 0.0
+    return OnJobMetrics(
+        job_id=cmd.job_id,
+        file_name=cmd.input_file.name,
+        mode=params.mode,
+        outcome=outcome,
+        wall_time=wall_time,
+        src_duration=params.duration,
+        encode_fps=speed * params.fps,
+        speed=speed,
+        cpu_time=cpu_time,
+        src_bytes=result.src_size,
+        out_bytes=result.out_size,
+        ratio=result.out_size / result.src_size if result.src_size else 0.0,
+        est_time=cmd.est_cost,
+        preset=(params.preset or FFMPEG_X264_PRESET) if params.mode == "encode" else "",
+    )
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class FfmpegProgressState:
+    """
+    Текущее состояние из вывода `ffmpeg -progress` (блоки строк key=value,
+    каждый блок завершается строкой progress=continue|end)
+    """
+
+    frame: int = 0
+    fps: float = 0.0
+    bitrate: str = ""
+    total_size: int = 0
+    # Позиция в выходном файле (сек)
+    out_time: float = 0.0
+    speed: float = 0.0
+    progress: str = ""
+
+    @property
+    def is_end(self) -> bool:
+        return self.progress == "end"
+
+    def percent(self, duration: float) -> float:
+        """
+        Процент выполнения по длительности исходника (0, если длительность неизвестна)
+        """
+        if self.is_end:
+            return 100.0
+        if duration <= 0:
+            return 0.0
+        return max(0.0, min(100.0, self.out_time / duration * 100.0))
+
+
+def parse_progress_line(line: str, state: FfmpegProgressState) -> bool:
+    """
+    Обновляет состояние по одной строке key=value.
+    Возвращает True, если строка завершает блок (значения блока согласованы).
+    """
+    key, sep, value = line.strip().partition("=")
+    if not sep:
+        return False
+    value = value.strip()
+    try:
+        if key == "frame":
+            state.frame = int(value)
+        elif key == "fps":
+            state.fps = float(value)
+        elif key == "bitrate":
+            state.bitrate = value
+        elif key == "total_size":
+            state.total_size = int(value)
+        elif key == "out_time_us":
+            state.out_time = int(value) / 1_000_000
+        elif key == "speed":
+            state.speed = float(value.rstrip("x"))
+        elif key == "progress":
+            state.progress = value
+            return True
+    except ValueError:
+        # "N/A" и прочие нечисловые значения пропускаются
+        pass
+    return False
+
+
+def with_progress_args(cmd: List[str], target: str = "pipe:1") -> List[str]:
+    """
+    Добавляет в команду ffmpeg вывод прогресса в машинном формате
+    """
+    return [cmd[0], "-progress", target, "-nostats", *cmd[1:]]
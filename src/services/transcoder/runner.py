@@ -0,0 +1,174 @@
+import os
+import re
+import selectors
+import subprocess
+import threading
+from typing import IO, Iterator, List, Optional
+
+from core.config import FFMPEG_STDERR_TAIL_BYTES
+
+from .progress import FfmpegProgressState, parse_progress_line, with_progress_args
+
+# Байт за одно чтение из канала
+_READ_SIZE = 64 * 1024
+# Длительность ищется в начале stderr (сведения о входных файлах), не дальше этого объёма
+_DURATION_SCAN_BYTES = 64 * 1024
+_DURATION_RE = re.compile(rb"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class StderrTail:
+    """
+    Кольцевой буфер последних max_bytes байт stderr: память задания не растёт
+    с длительностью кодирования
+    """
+
+    def __init__(self, max_bytes: int = FFMPEG_STDERR_TAIL_BYTES) -> None:
+        self.max_bytes = max(1, max_bytes)
+        self._buf = bytearray(self.max_bytes)
+        # Позиция следующей записи и всего записано байт
+        self._pos = 0
+        self._written = 0
+
+    def write(self, data: bytes) -> None:
+        self._written += len(data)
+        if len(data) >= self.max_bytes:
+            self._buf[:] = data[-self.max_bytes :]
+            self._pos = 0
+            return
+        end = self._pos + len(data)
+        if end <= self.max_bytes:
+            self._buf[self._pos : end] = data
+        else:
+            first = self.max_bytes - self._pos
+            self._buf[self._pos :] = data[:first]
+            self._buf[: end - self.max_bytes] = data[first:]
+        self._pos = end % self.max_bytes
+
+    def getvalue(self) -> bytes:
+        if self._written < self.max_bytes:
+            return bytes(self._buf[: self._written])
+        return bytes(self._buf[self._pos :] + self._buf[: self._pos])
+
+    def text(self) -> str:
+        """
+        Содержимое буфера как текст; при переполнении первая (неполная) строка отбрасывается
+        """
+        data = self.getvalue()
+        if self._written > self.max_bytes and b"\n" in data:
+            data = data.partition(b"\n")[2]
+        return data.decode("utf-8", errors="replace").strip()
+
+
+class FfmpegError(RuntimeError):
+    """
+    ffmpeg завершился с ошибкой; stderr — последние строки его вывода (StderrTail)
+    """
+
+    def __init__(self, returncode: int, stderr: str) -> None:
+        self.returncode = returncode
+        self.stderr = stderr
+        last_line = next((line for line in reversed(stderr.splitlines()) if line.strip()), "")
+        msg = f"ffmpeg завершился с кодом {returncode}"
+        super().__init__(f"{msg}: {last_line.strip()}" if last_line else msg)
+
+
+class FfmpegRunner:
+    """
+    Запуск ffmpeg с прогрессом в машинном формате (`-progress pipe:1`, строки key=value):
+
+    - stdout (прогресс) и stderr читаются без блокировки одним потоком через selectors
+      (на Windows каналы не поддерживаются selectors — stderr читается отдельным потоком);
+    - после каждого блока прогресса state содержит кадр, fps, битрейт, позицию и скорость;
+    - от stderr хранятся только последние байты (StderrTail) — для FfmpegError;
+    - duration <= 0 — длительность берётся из сведений о входном файле в stderr.
+    """
+
+    def __init__(
+        self,
+        cmd: List[str],
+        duration: float = 0.0,
+        stderr_bytes: int = FFMPEG_STDERR_TAIL_BYTES,
+    ) -> None:
+        self.cmd = with_progress_args(cmd)
+        self.duration = duration
+        self.state = FfmpegProgressState()
+        self.stderr = StderrTail(stderr_bytes)
+        self.process: Optional[subprocess.Popen] = None
+        self._head = bytearray()
+
+    def run(self) -> Iterator[float]:
+        """
+        Процент выполнения после каждого блока прогресса.
+        Закрытие генератора (close()) останавливает ffmpeg; код возврата не 0 — FfmpegError
+        """
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        blocks = self._read_selectors() if os.name == "posix" else self._read_threaded()
+        try:
+            for _ in blocks:
+                yield self.state.percent(self.duration)
+            returncode = self.process.wait()
+        finally:
+            blocks.close()
+            if self.process.poll() is None:
+                self.process.kill()
+                self.process.wait()
+            self.process.stdout.close()
+            self.process.stderr.close()
+        if returncode != 0:
+            raise FfmpegError(returncode, self.stderr.text())
+
+    def _read_selectors(self) -> Iterator[None]:
+        pending = b""
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.process.stdout, selectors.EVENT_READ)
+            sel.register(self.process.stderr, selectors.EVENT_READ)
+            while sel.get_map():
+                for key, _ in sel.select():
+                    data = os.read(key.fd, _READ_SIZE)
+                    if not data:
+                        sel.unregister(key.fileobj)
+                    elif key.fileobj is self.process.stderr:
+                        self._on_stderr(data)
+                    else:
+                        *lines, pending = (pending + data).split(b"\n")
+                        for line in lines:
+                            if self._on_progress_line(line):
+                                yield
+
+    def _read_threaded(self) -> Iterator[None]:
+        reader = threading.Thread(
+            target=self._drain_stderr, args=(self.process.stderr,), name="ffmpeg-stderr", daemon=True
+        )
+        reader.start()
+        try:
+            for line in self.process.stdout:
+                if self._on_progress_line(line):
+                    yield
+        except GeneratorExit:
+            # Остановка: поток чтения stderr завершится, когда процесс закроет канал
+            self.process.kill()
+            raise
+        finally:
+            reader.join()
+
+    def _drain_stderr(self, stream: IO[bytes]) -> None:
+        while data := stream.read1(_READ_SIZE):
+            self._on_stderr(data)
+
+    def _on_progress_line(self, line: bytes) -> bool:
+        return parse_progress_line(line.decode("utf-8", errors="replace"), self.state)
+
+    def _on_stderr(self, data: bytes) -> None:
+        self.stderr.write(data)
+        if self.duration <= 0 and len(self._head) < _DURATION_SCAN_BYTES:
+            self._head += data
+            match = _DURATION_RE.search(self._head)
+            if match:
+                hours, minutes, seconds = match.groups()
+                self.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+                self._head = bytearray()
@@ -0,0 +1,291 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from shutil import rmtree
+from typing import Callable, Iterator, List, Optional
+
+from loguru import logger
+
+from components.utils.proc import ChildCpuMeter
+from core.config import SEGMENT_MIN_LENGTH, SEGMENTS_PER_WORKER
+from services.main.models import OutputMediaParams
+
+from .ffmpeg_cmd import compile_concat_cmd, compile_segment_cmd, compile_split_cmd
+from .progress import FfmpegProgressState
+from .runner import FfmpegRunner
+
+# Доля общего прогресса, отводимая на склейку и кодирование аудио
+MUX_PROGRESS_SHARE = 5.0
+# Маркер завершённого деления на сегменты (содержит отпечаток исходника и параметров)
+SPLIT_MARKER = "split.done"
+
+
+class SegmentsAborted(Exception):
+    """
+    Кодирование сегментов остановлено досрочно: прогноз размера больше допустимого
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Задание отменено (TranscoderService.cancel): ffmpeg остановлен, итог не нужен
+    """
+
+
+def segment_length(duration: float, workers: int) -> float:
+    """
+    Длина сегмента (сек): несколько сегментов на воркер для выравнивания нагрузки,
+    но не короче SEGMENT_MIN_LENGTH
+    """
+    return max(SEGMENT_MIN_LENGTH, duration / max(1, workers * SEGMENTS_PER_WORKER))
+
+
+def build_chunks_dir(output_temp: Path) -> Path:
+    """
+    Папка сегментов рядом с временным файлом: name.tmp.chunks
+    """
+    return output_temp.with_name(output_temp.stem + ".chunks")
+
+
+def run_segmented(
+    input_file: Path,
+    output_temp: Path,
+    output_media_params: OutputMediaParams,
+    workers: int,
+    threads: int,
+    on_progress: Callable[[float, Optional[FfmpegProgressState]], None],
+    cpu_meter: Optional[ChildCpuMeter] = None,
+    resumable: bool = False,
+    on_segment: Optional[Callable[[int, int], None]] = None,
+    should_abort: Optional[Callable[[int, float], bool]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> None:
+    """
+    Сегментное перекодирование одного файла:
+    - деление видео на сегменты по ключевым кадрам (без перекодирования)
+    - параллельное кодирование сегментов с одинаковыми параметрами (в т.ч. VBV)
+    - склейка через concat demuxer без потерь + аудио из исходника
+
+    Прогресс сегментов взвешивается по их размеру и сводится в общий процент.
+
+    resumable: при ошибке или прерывании папка сегментов сохраняется; при повторном запуске
+    деление пропускается (если исходник и параметры не менялись), а готовые сегменты
+    не кодируются заново. on_segment(готово, всего) вызывается после каждого сегмента.
+
+    should_abort(размер сегментов, процент видео) — досрочная остановка по прогнозу размера:
+    кодирование прекращается, папка сегментов удаляется, выбрасывается SegmentsAborted.
+
+    cancelled установлен — ffmpeg останавливается, выбрасывается JobCancelled;
+    папка сегментов не удаляется (задание могло перейти другому исполнителю).
+    """
+    cpu_meter = cpu_meter or ChildCpuMeter()
+    chunks_dir = build_chunks_dir(output_temp)
+    marker = chunks_dir / SPLIT_MARKER
+    fingerprint = split_fingerprint(input_file, output_media_params)
+    finished = False
+    keep = resumable
+    try:
+        if _read_marker(marker) != fingerprint:
+            rmtree(chunks_dir, ignore_errors=True)
+            chunks_dir.mkdir(parents=True, exist_ok=True)
+            seg_time = segment_length(output_media_params.duration, workers)
+            ff = FfmpegRunner(
+                compile_split_cmd(input_file, chunks_dir / "src_%05d.mkv", seg_time),
+                output_media_params.duration,
+            )
+            for _ in run_cancellable(ff, cpu_meter, cancelled):
+                pass
+            # Маркер пишется последним: без него деление считается незавершённым
+            marker.write_text(fingerprint, encoding="utf-8")
+            logger.debug("{0}: сегменты по ~{1:.0f} сек", input_file.name, seg_time)
+
+        sources = sorted(chunks_dir.glob("src_*.mkv"))
+        if not sources:
+            raise RuntimeError(f"Не удалось разделить файл на сегменты: {input_file}")
+        encoded = [s.with_name(s.name.replace("src_", "enc_", 1)) for s in sources]
+        ready = sum(1 for e in encoded if e.exists())
+        if ready:
+            logger.info(
+                "{0}: продолжение кодирования, готово сегментов {1}/{2}",
+                input_file.name,
+                ready,
+                len(sources),
+            )
+
+        encode_segments(
+            sources,
+            encoded,
+            output_media_params,
+            workers,
+            max(1, threads // workers) if threads else 0,
+            output_temp.suffix.lower() == ".mp4",
+            on_progress,
+            cpu_meter,
+            on_segment,
+            should_abort,
+            cancelled,
+        )
+
+        concat_list = chunks_dir / "concat.txt"
+        concat_list.write_text(
+            "".join(f"file '{_escape_concat_path(p)}'\n" for p in encoded),
+            encoding="utf-8",
+        )
+        video_share = 100.0 - MUX_PROGRESS_SHARE
+        ff = FfmpegRunner(
+            compile_concat_cmd(concat_list, input_file, output_temp, output_media_params),
+            output_media_params.duration,
+        )
+        for progress in run_cancellable(ff, cpu_meter, cancelled):
+            on_progress(video_share + progress * MUX_PROGRESS_SHARE / 100.0, ff.state)
+        finished = True
+    except SegmentsAborted:
+        # Результат заменяется исходником — продолжать нечего
+        finished = True
+        raise
+    except JobCancelled:
+        keep = True
+        raise
+    finally:
+        if finished or not keep:
+            rmtree(chunks_dir, ignore_errors=True)
+
+
+def encode_segments(
+    sources: List[Path],
+    encoded: List[Path],
+    output_media_params: OutputMediaParams,
+    workers: int,
+    threads: int,
+    is_mp4: bool,
+    on_progress: Callable[[float, Optional[FfmpegProgressState]], None],
+    cpu_meter: ChildCpuMeter,
+    on_segment: Optional[Callable[[int, int], None]] = None,
+    should_abort: Optional[Callable[[int, float], bool]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> None:
+    """
+    Параллельное кодирование сегментов в пуле воркеров (каждый сегмент — отдельный процесс ffmpeg).
+    Сегмент кодируется во временный файл и переименовывается по завершении,
+    поэтому существующий enc_*.mkv всегда готов и повторно не кодируется.
+    fps и скорость в прогрессе — сумма по кодируемым сейчас сегментам.
+    Размер для should_abort — готовые сегменты и текущий размер кодируемых.
+    """
+    weights = [max(1, s.stat().st_size) for s in sources]
+    total_weight = sum(weights)
+    video_share = 100.0 - MUX_PROGRESS_SHARE
+    done = [100.0 if e.exists() else 0.0 for e in encoded]
+    finished = sum(1 for d in done if d)
+    # Размер готовых сегментов
+    done_size = sum(e.stat().st_size for e in encoded if e.exists())
+    # Сегмент → состояние его процесса ffmpeg, пока он кодируется
+    running: dict[int, FfmpegProgressState] = {}
+    parts = [e.with_name(e.stem + ".part" + e.suffix) for e in encoded]
+    lock = threading.Lock()
+    # Досрочная остановка: остальные воркеры прекращают кодирование
+    stop = threading.Event()
+
+    def _encode(i: int) -> None:
+        nonlocal finished, done_size
+        if stop.is_set():
+            return
+        if cancelled is not None and cancelled.is_set():
+            raise JobCancelled()
+        cmd = compile_segment_cmd(sources[i], parts[i], output_media_params, threads, is_mp4)
+        # Длительность сегмента — из сведений о входном файле в stderr
+        ff = FfmpegRunner(cmd)
+        progress_iter = run_cancellable(ff, cpu_meter, cancelled)
+        try:
+            for progress in progress_iter:
+                with lock:
+                    done[i] = progress
+                    running[i] = ff.state
+                    total = sum(d * w for d, w in zip(done, weights)) / total_weight
+                    state = FfmpegProgressState(
+                        fps=sum(s.fps for s in running.values()),
+                        speed=sum(s.speed for s in running.values()),
+                    )
+                    size = done_size + sum(_size(parts[j]) for j in running)
+                on_progress(total * video_share / 100.0, state)
+                if stop.is_set():
+                    progress_iter.close()
+                    return
+                if should_abort and should_abort(size, total):
+                    stop.set()
+                    progress_iter.close()
+                    raise SegmentsAborted()
+        finally:
+            with lock:
+                running.pop(i, None)
+        parts[i].replace(encoded[i])
+        with lock:
+            finished += 1
+            done_size += _size(encoded[i])
+            count = finished
+        if on_segment:
+            on_segment(count, len(sources))
+
+    todo = [i for i, e in enumerate(encoded) if not e.exists()]
+    with ThreadPoolExecutor(workers, thread_name_prefix="segment") as pool:
+        # list() пробрасывает первое исключение воркера
+        list(pool.map(_encode, todo))
+
+
+def split_fingerprint(input_file: Path, output_media_params: OutputMediaParams) -> str:
+    """
+    Отпечаток исходника и параметров кодирования: сегменты, готовые для другого исходника
+    или с другими параметрами, не используются
+    """
+    st = input_file.stat()
+    params = asdict(output_media_params)
+    # Пресет выбирается при каждом запуске (--deadline) и на совместимость сегментов не влияет
+    params.pop("preset", None)
+    return f"{st.st_size}:{st.st_mtime_ns}:{json.dumps(params, sort_keys=True)}"
+
+
+def _read_marker(marker: Path) -> Optional[str]:
+    try:
+        return marker.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def run_cancellable(
+    ff: FfmpegRunner,
+    cpu_meter: ChildCpuMeter,
+    cancelled: Optional[threading.Event] = None,
+) -> Iterator[float]:
+    """
+    Прогресс ffmpeg с замером CPU; cancelled установлен — ffmpeg останавливается (JobCancelled)
+    """
+    progress_iter = ff.run()
+    try:
+        for progress in progress_iter:
+            _sample_cpu(ff, cpu_meter)
+            if cancelled is not None and cancelled.is_set():
+                raise JobCancelled()
+            yield progress
+    finally:
+        # Закрытие генератора останавливает процесс ffmpeg
+        progress_iter.close()
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _sample_cpu(ff: FfmpegRunner, cpu_meter: ChildCpuMeter) -> None:
+    if ff.process is not None:
+        cpu_meter.sample(ff.process.pid)
+
+
+def _escape_concat_path(path: Path) -> str:
+    """
+    Экранирование пути для списка concat demuxer
+    """
+    return path.resolve().as_posix().replace("'", "'\\''")
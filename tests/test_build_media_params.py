@@ -0,0 +1,19 @@
+from components.build_media_params import near_decision_threshold
+from services.main.models import SrcMediaInfo
+
+
+def make_info(video_bitrate: int, audio_codec: str, audio_bitrate: int) -> SrcMediaInfo:
+    return SrcMediaInfo(1280, 720, 30.0, video_bitrate, audio_codec, audio_bitrate, 60.0)
+
+
+def test_aac_bitrate_near_copy_threshold() -> None:
+    assert near_decision_threshold(make_info(5_000_000, "aac", 127_000), 0.02)
+    assert not near_decision_threshold(make_info(5_000_000, "aac", 96_000), 0.02)
+    assert not near_decision_threshold(make_info(5_000_000, "opus", 127_000), 0.02)
+
+
+def test_video_bitrate_near_fast_path_threshold() -> None:
+    # Порог быстрого пути для 720p: 0.02 бит на пиксель * FAST_PATH_BPP_RATIO (1.1)
+    threshold = int(1280 * 720 * 30 * 0.022)
+    assert near_decision_threshold(make_info(threshold - 5_000, "opus", 0), 0.02)
+    assert not near_decision_threshold(make_info(threshold // 2, "opus", 0), 0.02)
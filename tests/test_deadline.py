@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from components.deadline import DeadlinePlanner, SpeedModel
+from services.main.models import OutputMediaParams
+from services.transcoder.commands import OnTranscoderRun
+
+PRESETS = ["veryfast", "fast", "medium", "slow"]
+
+
+def make_cmd(job_id: int, mode: str = "encode") -> OnTranscoderRun:
+    params = OutputMediaParams(
+        1280, 720, 2_000_000, 3_000_000, 4_000_000, "aac", 128_000, 600.0, 30.0, mode
+    )
+    return OnTranscoderRun(Path(f"/in/{job_id}.mp4"), params, job_id)
+
+
+def make_planner(tmp_path: Path, jobs_at_slowest: float) -> DeadlinePlanner:
+    """
+    Срок, в который помещается jobs_at_slowest заданий с самым медленным пресетом
+    """
+    model = SpeedModel(tmp_path / "speed.json")
+    planner = DeadlinePlanner(1.0, PRESETS, 1, model)
+    job_time = planner._job_time(make_cmd(0), PRESETS[-1], 1.0)
+    planner.deadline_at += job_time * jobs_at_slowest
+    return planner
+
+
+def test_slowest_preset_when_batch_fits(tmp_path: Path) -> None:
+    planner = make_planner(tmp_path, 3.5)
+    for job_id in (1, 2, 3):
+        planner.add(make_cmd(job_id))
+    assert planner.assign(make_cmd(1)) == "slow"
+
+
+def test_expected_files_count_towards_deadline(tmp_path: Path) -> None:
+    planner = make_planner(tmp_path, 3.5)
+    planner.expect(50)
+    for job_id in (1, 2, 3):
+        planner.add(make_cmd(job_id))
+    # 47 файлов ещё не проанализированы — на самом медленном пресете пакет не успевает
+    assert planner.assign(make_cmd(1)) == "veryfast"
+
+
+def test_discarded_expected_files_not_counted(tmp_path: Path) -> None:
+    planner = make_planner(tmp_path, 3.5)
+    planner.expect(50)
+    for _ in range(47):
+        planner.discard_expected()
+    for job_id in (1, 2, 3):
+        planner.add(make_cmd(job_id))
+    assert planner.assign(make_cmd(1)) == "slow"
+
+
+def test_queue_totals_follow_assign(tmp_path: Path) -> None:
+    planner = make_planner(tmp_path, 1.5)
+    for job_id in range(1, 11):
+        planner.add(make_cmd(job_id))
+    planner.add(make_cmd(11, mode="remux"))
+    assert planner.assign(make_cmd(1)) == "veryfast"
+    for job_id in range(2, 11):
+        planner.assign(make_cmd(job_id))
+        planner.finish(job_id, False)
+    planner.assign(make_cmd(11, mode="remux"))
+    planner.finish(1, False)
+    planner.finish(11, False)
+    # Очередь пуста: остался только запускаемый файл
+    assert planner._rest_time("slow", 1.0) == 0.0
+    assert planner.assign(make_cmd(12)) == "slow"
@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from components.job_journal import JobJournal
+
+
+@pytest.fixture
+def journal(tmp_path: Path) -> Iterator[JobJournal]:
+    journal = JobJournal(tmp_path / "jobs.sqlite")
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    path = tmp_path / "in.mp4"
+    path.write_bytes(b"\0" * 1024)
+    return path
+
+
+@pytest.fixture
+def output(tmp_path: Path) -> Path:
+    path = tmp_path / "out.mp4"
+    path.write_bytes(b"\0" * 100)
+    return path
+
+
+def test_finalized(journal: JobJournal, source: Path, output: Path) -> None:
+    journal.queue([source])
+    assert not journal.is_finalized(source, output)
+    journal.start_encoding(source, None)
+    journal.finish(source, True)
+    assert journal.is_finalized(source, output)
+    assert journal.get(source).state == "finalized"
+
+
+def test_finalized_requires_output(journal: JobJournal, source: Path, output: Path) -> None:
+    journal.queue([source])
+    journal.finish(source, True)
+    output.unlink()
+    assert not journal.is_finalized(source, output)
+
+
+def test_finalized_source_changed(journal: JobJournal, source: Path, output: Path) -> None:
+    journal.queue([source])
+    journal.finish(source, True)
+    source.write_bytes(b"\1" * 2048)
+    assert not journal.is_finalized(source, output)
+
+
+def test_failed_is_not_finalized(journal: JobJournal, source: Path, output: Path) -> None:
+    journal.queue([source])
+    journal.finish(source, False, "ошибка")
+    assert not journal.is_finalized(source, output)
+    assert journal.get(source).error == "ошибка"
+
+
+def test_queue_skips_missing(journal: JobJournal, source: Path, tmp_path: Path) -> None:
+    missing = tmp_path / "missing.mp4"
+    journal.queue([missing, source])
+    assert journal.get(missing) is None
+    assert journal.get(source).state == "queued"
+
+
+def test_requeue_keeps_checkpoint_of_unchanged_source(
+    journal: JobJournal, source: Path, tmp_path: Path
+) -> None:
+    chunks = tmp_path / "in.tmp.chunks"
+    journal.queue([source])
+    journal.start_encoding(source, chunks)
+    journal.checkpoint(source, 3, 8)
+
+    # Прерванный запуск: при следующем файл снова ставится в очередь
+    journal.queue([source])
+    record = journal.get(source)
+    assert record.state == "queued"
+    assert (record.chunks_dir, record.segments_done) == (str(chunks), 3)
+    assert journal.resumable_dirs() == {chunks}
+
+
+def test_requeue_resets_checkpoint_of_changed_source(
+    journal: JobJournal, source: Path, tmp_path: Path
+) -> None:
+    journal.queue([source])
+    journal.start_encoding(source, tmp_path / "in.tmp.chunks")
+    journal.checkpoint(source, 3, 8)
+
+    st = source.stat()
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    journal.queue([source])
+    record = journal.get(source)
+    assert (record.chunks_dir, record.segments_done) == ("", 0)
+    assert journal.resumable_dirs() == set()
+
+
+def test_finish_releases_chunks_dir(journal: JobJournal, source: Path, tmp_path: Path) -> None:
+    journal.queue([source])
+    journal.start_encoding(source, tmp_path / "in.tmp.chunks")
+    journal.finish(source, True)
+    assert journal.resumable_dirs() == set()
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from services.cluster.leases import LeaseQueue
+from services.main.models import OutputMediaParams
+from services.transcoder.commands import OnTranscoderRun
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cmd(job_id: int) -> OnTranscoderRun:
+    params = OutputMediaParams(1280, 720, 2_000_000, 3_000_000, 4_000_000, "aac", 128_000)
+    return OnTranscoderRun(Path(f"/in/{job_id}.mp4"), params, job_id)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def queue(clock: FakeClock) -> LeaseQueue:
+    return LeaseQueue(ttl=30.0, max_attempts=2, clock=clock)
+
+
+def test_renew_extends_lease(queue: LeaseQueue, clock: FakeClock) -> None:
+    queue.put(make_cmd(1))
+    lease = queue.lease("w1", timeout=0)
+    clock.now += 20
+    assert queue.renew(lease.lease_id)
+    clock.now += 20
+    assert queue.expire() == ([], [])
+    assert queue.complete(lease.lease_id) is lease.job
+
+
+def test_expired_lease_requeued_first_and_result_rejected(
+    queue: LeaseQueue, clock: FakeClock
+) -> None:
+    queue.put(make_cmd(1))
+    queue.put(make_cmd(2))
+    lease = queue.lease("w1", timeout=0)
+    clock.now += 31
+    expired, exhausted = queue.expire()
+    assert [e.lease_id for e in expired] == [lease.lease_id]
+    assert exhausted == []
+    assert lease.job.attempts == 1
+    # Итог и продление прежнего воркера больше не принимаются
+    assert not queue.renew(lease.lease_id)
+    assert queue.complete(lease.lease_id) is None
+    # Задание истёкшей аренды выдаётся раньше остальных
+    again = queue.lease("w2", timeout=0)
+    assert again.job is lease.job
+    assert again.lease_id != lease.lease_id
+    assert queue.complete(again.lease_id) is lease.job
+
+
+def test_attempts_exhausted(queue: LeaseQueue, clock: FakeClock) -> None:
+    queue.put(make_cmd(1))
+    for _ in range(2):
+        queue.lease("w1", timeout=0)
+        clock.now += 31
+        expired, exhausted = queue.expire()
+        assert len(expired) == 1
+    assert [job.cmd.job_id for job in exhausted] == [1]
+    assert queue.lease("w1", timeout=0) is None
+
+
+def test_release_does_not_count_attempt(queue: LeaseQueue) -> None:
+    queue.put(make_cmd(1))
+    lease = queue.lease("w1", timeout=0)
+    assert queue.release(lease.lease_id)
+    assert lease.job.attempts == 0
+    assert queue.lease("w2", timeout=0).job is lease.job
+
+
+def test_complete_twice(queue: LeaseQueue) -> None:
+    queue.put(make_cmd(1))
+    lease = queue.lease("w1", timeout=0)
+    assert queue.complete(lease.lease_id) is lease.job
+    assert queue.complete(lease.lease_id) is None
+    assert not queue.renew(lease.lease_id)
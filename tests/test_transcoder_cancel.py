@@ -0,0 +1,50 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from core.messagebus import MessageBus
+from services.main.models import OutputMediaParams
+from services.transcoder import ffmpeg_cmd
+from services.transcoder.commands import OnTranscoderRun
+from services.transcoder.entry import TranscoderService
+from services.transcoder.events import OnTranscodingProgressEvent
+
+FAKE_FFMPEG = Path(__file__).resolve().parent.parent / "src" / "benchmarks" / "fake_ffmpeg.py"
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="заглушка ffmpeg запускается как скрипт")
+
+
+@pytest.fixture
+def slow_ffmpeg(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Кодирование 60 сек «исходника» в реальном времени: задание не завершится само
+    monkeypatch.setattr(ffmpeg_cmd, "FFMPEG_BIN", FAKE_FFMPEG)
+    monkeypatch.setenv("FAKE_FFMPEG_SPEED", "1")
+    monkeypatch.setenv("FAKE_FFMPEG_RATE", "10")
+
+
+def test_cancel_stops_ffmpeg_and_skips_finalize(slow_ffmpeg: None, tmp_path: Path) -> None:
+    source = tmp_path / "in.mp4"
+    source.write_bytes(b"\0" * 1024)
+    output_dir = tmp_path / "out"
+    params = OutputMediaParams(1280, 720, 2_000_000, 3_000_000, 4_000_000, "aac", 128_000, 60.0)
+    cmd = OnTranscoderRun(source, params, job_id=7)
+
+    bus = MessageBus()
+    service = TranscoderService(bus, abort_ratio=0, output_dir=output_dir)
+    started = threading.Event()
+    bus.subscribe_event(OnTranscodingProgressEvent, lambda e: started.set())
+    threading.Thread(
+        target=lambda: started.wait(10) and service.cancel(cmd.job_id), daemon=True
+    ).start()
+    try:
+        result = bus.publish(cmd)
+    finally:
+        bus.close()
+
+    assert started.is_set()
+    assert not result.ok
+    assert result.msg == "Задание отменено"
+    assert result.out_size == 0
+    assert not (output_dir / "in.mp4").exists()
@@ -0,0 +1,48 @@
+import threading
+from pathlib import Path
+from queue import Empty, Queue
+
+import pytest
+
+from components.watcher import FolderWatcher
+
+
+@pytest.fixture(params=[False, True], ids=["inotify", "polling"])
+def watch(request: pytest.FixtureRequest, tmp_path: Path):
+    watcher = FolderWatcher(
+        tmp_path, {".mp4"}, settle_time=0.2, poll_interval=0.05, force_polling=request.param
+    )
+    found: Queue = Queue()
+    thread = threading.Thread(target=lambda: [found.put(p) for p in watcher], daemon=True)
+    thread.start()
+    yield found
+    watcher.stop()
+    thread.join(5)
+
+
+def _next(found: Queue) -> Path:
+    return found.get(timeout=5)
+
+
+def _none(found: Queue) -> None:
+    with pytest.raises(Empty):
+        found.get(timeout=0.6)
+
+
+def test_file_reported_once(watch: Queue, tmp_path: Path) -> None:
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"\0" * 100)
+    (tmp_path / "a.txt").write_bytes(b"\0")
+    assert _next(watch) == path
+    _none(watch)
+
+
+def test_readded_file_reported_again(watch: Queue, tmp_path: Path) -> None:
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"\0" * 100)
+    assert _next(watch) == path
+    path.unlink()
+    # Удаление должно быть замечено до появления нового файла (режим опроса)
+    _none(watch)
+    path.write_bytes(b"\1" * 100)
+    assert _next(watch) == path